@@ -0,0 +1,71 @@
+'''
+Benchmark of proving multi-digit decimal arithmetic: the time to prove
+evaluations of the sum, product and order of random numerals versus
+their number of digits, via DecimalSequence.add_eval, mult_eval and
+less_eval.
+
+DecimalSequence.evaluations (the memo of proven evaluations) is
+cleared before each measurement so the steps are derived again
+('--warm' keeps it to time recalls).
+
+Run with proveit installed (or on the PYTHONPATH), with its theories
+built:
+    python benchmarks/decimal_arithmetic.py --digits 10 50 100 200
+'''
+
+import argparse
+import random
+import time
+
+
+def random_numeral_int(num_digits, rng):
+    if num_digits == 1:
+        return rng.randint(1, 9)
+    return rng.randint(10**(num_digits - 1), 10**num_digits - 1)
+
+
+def run(digit_counts, ops, repeat, warm, seed):
+    from proveit import defaults
+    from proveit.numbers.numerals.decimals import DecimalSequence
+    defaults.sideeffect_automation = False
+    rng = random.Random(seed)
+    evaluators = {'add': DecimalSequence.add_eval,
+                  'mult': DecimalSequence.mult_eval,
+                  'less': DecimalSequence.less_eval}
+    for num_digits in digit_counts:
+        for op in ops:
+            timings = []
+            for _ in range(repeat):
+                num1 = random_numeral_int(num_digits, rng)
+                num2 = random_numeral_int(num_digits, rng)
+                if op == 'less' and num1 > num2:
+                    num1, num2 = num2, num1
+                elif op == 'less' and num1 == num2:
+                    num2 += 1
+                if not warm:
+                    DecimalSequence.evaluations.clear()
+                start = time.perf_counter()
+                evaluators[op](num1, num2)
+                timings.append(time.perf_counter() - start)
+            print("%4s, %4d digits: %.3f s (best of %d), %.3f s (mean)"
+                  % (op, num_digits, min(timings), repeat,
+                     sum(timings) / len(timings)))
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(
+        description='Measure multi-digit decimal evaluation time.')
+    parser.add_argument('--digits', type=int, nargs='+',
+                        default=[2, 5, 10, 20, 50, 100],
+                        help='numbers of digits of the operands')
+    parser.add_argument('--ops', nargs='+', choices=('add', 'mult', 'less'),
+                        default=['add', 'mult', 'less'],
+                        help='the operations to evaluate')
+    parser.add_argument('--repeat', type=int, default=3,
+                        help='number of random operand pairs per size')
+    parser.add_argument('--warm', action='store_true',
+                        help='keep remembered evaluations between runs')
+    parser.add_argument('--seed', type=int, default=0,
+                        help='seed of the random operands')
+    args = parser.parse_args()
+    run(args.digits, args.ops, args.repeat, args.warm, args.seed)
@@ -0,0 +1,124 @@
+'''
+Benchmark of ordered_dependency_nodes, which orders the nodes of a
+dependency DAG so that requirements come after their dependents (used
+for proof step enumeration, expression display and make_expression).
+
+Synthetic graphs:
+  chain: n nodes, each requiring the next (deep, no sharing).
+  ladder: node i requires nodes i+1 and i+2 (the number of paths grows
+          exponentially with n -- heavy sharing).
+  wide: node i requires each of the nodes i+1, ..., i+width.
+The 'exprs' kind orders the sub-expressions of nested Function
+applications that use the previous level twice, f(e, e), via
+Expression.expr_info (the same traversal used by make_expression).
+
+'--legacy' also times the former breadth-first traversal that visits
+each node once per path (only feasible for small ladders).
+
+Run with proveit installed (or on the PYTHONPATH):
+    python benchmarks/dependency_order.py --kind ladder --size 2000
+'''
+
+import argparse
+import time
+
+
+def legacy_ordered_dependency_nodes(root_node, requirements_fn):
+    '''
+    The former implementation, for comparison.
+    '''
+    queue = [root_node]
+    nodes_with_repeats = []
+    while len(queue) > 0:
+        next_node = queue.pop(0)
+        nodes_with_repeats.append(next_node)
+        queue.extend(requirements_fn(next_node))
+    visited = set()
+    enumerated_nodes = []
+    for node in reversed(nodes_with_repeats):
+        if node in visited:
+            continue
+        enumerated_nodes.insert(0, node)
+        visited.add(node)
+    return enumerated_nodes
+
+
+def make_graph(kind, size, width):
+    '''
+    Return the root node and requirements function of a synthetic
+    graph.
+    '''
+    if kind == 'chain':
+        def requirements(i):
+            return (i + 1,) if i + 1 < size else ()
+    elif kind == 'ladder':
+        def requirements(i):
+            return tuple(j for j in (i + 1, i + 2) if j < size)
+    elif kind == 'wide':
+        def requirements(i):
+            return tuple(range(i + 1, min(i + 1 + width, size)))
+    else:
+        raise ValueError("Unknown kind of graph: '%s'" % kind)
+    return 0, requirements
+
+
+def make_expr_graph(size):
+    '''
+    Return the root Expression and requirements function of nested
+    Function applications, f(e, e), with 'size' levels.
+    '''
+    from proveit import Variable, Function
+    f, x = Variable('f'), Variable('x')
+    expr = x
+    for _ in range(size):
+        expr = Function(f, (expr, expr))
+    return expr, lambda _expr: _expr._sub_expressions
+
+
+def time_it(order_fn, root, requirements, repeat):
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        nodes = order_fn(root, requirements)
+        timings.append(time.perf_counter() - start)
+    return min(timings), len(nodes)
+
+
+def run(kind, size, width, repeat, legacy):
+    from proveit._core_._dependency_graph import ordered_dependency_nodes
+    if kind == 'exprs':
+        root, requirements = make_expr_graph(size)
+    else:
+        root, requirements = make_graph(kind, size, width)
+    best, num_nodes = time_it(ordered_dependency_nodes, root,
+                              requirements, repeat)
+    print("%s, size %d: %d nodes ordered in %.4f s (best of %d)"
+          % (kind, size, num_nodes, best, repeat))
+    if legacy:
+        legacy_best, _ = time_it(legacy_ordered_dependency_nodes, root,
+                                 requirements, repeat)
+        print("  legacy traversal: %.4f s (%.1fx)"
+              % (legacy_best, legacy_best / best))
+        assert (ordered_dependency_nodes(root, requirements) ==
+                legacy_ordered_dependency_nodes(root, requirements))
+    return best
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(
+        description='Measure dependency-graph ordering time.')
+    parser.add_argument('--kind', choices=('chain', 'ladder', 'wide',
+                                           'exprs'),
+                        default='ladder',
+                        help='the kind of graph to order')
+    parser.add_argument('--size', type=int, default=2000,
+                        help='number of nodes (or levels for exprs)')
+    parser.add_argument('--width', type=int, default=10,
+                        help='number of requirements per node for wide')
+    parser.add_argument('--repeat', type=int, default=5,
+                        help='number of timed repetitions')
+    parser.add_argument('--legacy', action='store_true',
+                        help='also time the former traversal and check '
+                        'that the orders agree')
+    args = parser.parse_args()
+    run(args.kind, args.size, args.width, args.repeat, args.legacy)
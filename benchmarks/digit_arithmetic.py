@@ -0,0 +1,81 @@
+'''
+Benchmark of evaluating many small numeric sums and products, e.g.
+Add(num(3), num(4)).evaluation(), which rely upon the single-digit
+theorems (add_a_b, mult_a_b) of proveit.numbers.numerals.decimals.
+
+The evaluations are timed in bulk, reporting throughput.  '--lookup'
+also times obtaining the single-digit theorems alone, via the preloaded
+tables (digit_add_fact, digit_mult_fact) versus a theory attribute
+look-up per theorem (the former approach).
+
+Run with proveit installed (or on the PYTHONPATH), with its theories
+built:
+    python benchmarks/digit_arithmetic.py --count 10000
+'''
+
+import argparse
+import random
+import time
+
+
+def time_evaluations(op, operand_pairs):
+    from proveit.numbers import Add, Mult, num
+    op_class = {'add': Add, 'mult': Mult}[op]
+    start = time.perf_counter()
+    for _a, _b in operand_pairs:
+        op_class(num(_a), num(_b)).evaluation()
+    return time.perf_counter() - start
+
+
+def time_lookups(op, operand_pairs):
+    import proveit.numbers.numerals.decimals
+    from proveit.numbers.numerals.decimals import (
+        digit_add_fact, digit_mult_fact)
+    theorems = proveit.numbers.numerals.decimals
+    table_fn = {'add': digit_add_fact, 'mult': digit_mult_fact}[op]
+    start = time.perf_counter()
+    for _a, _b in operand_pairs:
+        table_fn(_a, _b)
+    table_time = time.perf_counter() - start
+    start = time.perf_counter()
+    for _a, _b in operand_pairs:
+        theorems.__getattr__('%s_%d_%d' % (op, _a, _b))
+    getattr_time = time.perf_counter() - start
+    return table_time, getattr_time
+
+
+def run(count, ops, max_operand, lookup, seed):
+    rng = random.Random(seed)
+    for op in ops:
+        operand_pairs = [(rng.randint(0, max_operand),
+                          rng.randint(0, max_operand))
+                         for _ in range(count)]
+        elapsed = time_evaluations(op, operand_pairs)
+        print("%4s: %d evaluations in %.3f s (%.0f per second)"
+              % (op, count, elapsed, count / elapsed))
+        if lookup:
+            digit_pairs = [(_a % 10, _b % 10) for _a, _b in operand_pairs]
+            table_time, getattr_time = time_lookups(op, digit_pairs)
+            print("      theorem look-ups: table %.4f s, "
+                  "theory attribute %.4f s (%.1fx)"
+                  % (table_time, getattr_time,
+                     getattr_time / table_time))
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(
+        description='Measure the throughput of small numeric evaluations.')
+    parser.add_argument('--count', type=int, default=10000,
+                        help='number of random evaluations per operation')
+    parser.add_argument('--ops', nargs='+', choices=('add', 'mult'),
+                        default=['add', 'mult'],
+                        help='the operations to evaluate')
+    parser.add_argument('--max_operand', type=int, default=9,
+                        help='largest operand (above 9 uses multi-digit '
+                        'evaluation)')
+    parser.add_argument('--lookup', action='store_true',
+                        help='also time the single-digit theorem look-ups')
+    parser.add_argument('--seed', type=int, default=0,
+                        help='seed of the random operands')
+    args = parser.parse_args()
+    run(args.count, args.ops, args.max_operand, args.lookup, args.seed)
@@ -0,0 +1,89 @@
+'''
+Microbenchmark of Expression construction throughput.
+
+Builds deep, alternating Add/Mult expression trees (or, with
+'--kind functions', trees of Function applications that only require
+the Prove-It core) and reports how many Expression objects are
+constructed per second.  Each repetition starts from cleared
+"meaning"/"style" tables so that the cost of interning new
+expressions is what is measured; '--reuse' measures the cost of
+reconstructing expressions that are already interned.
+
+Run with proveit installed (or on the PYTHONPATH):
+    python benchmarks/expr_construction.py --depth 200 --repeat 5
+'''
+
+import argparse
+import time
+
+
+def make_tree_builder(kind):
+    '''
+    Return a function that builds a tree of the given depth and
+    the number of Expression objects such a tree constructs.
+    '''
+    from proveit import Variable, Function
+    x, y, f, g = (Variable(_) for _ in ('x', 'y', 'f', 'g'))
+    if kind == 'add_mult':
+        from proveit.numbers import Add, Mult
+
+        def build(depth):
+            expr = x
+            for k in range(depth):
+                if k % 2 == 0:
+                    expr = Add(expr, y)
+                else:
+                    expr = Mult(x, expr)
+            return expr
+        # Each level makes an operand ExprTuple and the operation.
+        return build, 2
+    elif kind == 'functions':
+        def build(depth):
+            expr = x
+            for k in range(depth):
+                expr = Function(f if k % 2 == 0 else g, (expr, y))
+            return expr
+        return build, 2
+    raise ValueError("Unknown kind of tree: '%s'" % kind)
+
+
+def run(kind, depth, width, repeat, reuse):
+    from proveit._core_._unique_data import clear_unique_data
+    build, exprs_per_level = make_tree_builder(kind)
+    timings = []
+    trees = []
+    for _ in range(repeat):
+        if not reuse:
+            trees = []
+            clear_unique_data()
+        start = time.perf_counter()
+        # Keep the trees alive (the interning tables only hold weak
+        # references) so they may be reused by the next repetition.
+        built = [build(depth) for _ in range(width)]
+        timings.append(time.perf_counter() - start)
+        trees = built
+    num_exprs = depth * width * exprs_per_level
+    best = min(timings)
+    print("%s trees, depth %d, width %d: best %.4f s of %d; "
+          "%.0f expressions/s" % (kind, depth, width, best, repeat,
+                                  num_exprs / best))
+    return best
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(
+        description='Measure Expression construction throughput.')
+    parser.add_argument('--kind', choices=('add_mult', 'functions'),
+                        default='add_mult',
+                        help='the kind of expression tree to build')
+    parser.add_argument('--depth', type=int, default=200,
+                        help='depth of each expression tree')
+    parser.add_argument('--width', type=int, default=20,
+                        help='number of trees built per repetition')
+    parser.add_argument('--repeat', type=int, default=5,
+                        help='number of timed repetitions')
+    parser.add_argument('--reuse', action='store_true',
+                        help='do not clear the interning tables between '
+                        'repetitions')
+    args = parser.parse_args()
+    run(args.kind, args.depth, args.width, args.repeat, args.reuse)
@@ -0,0 +1,87 @@
+'''
+Benchmark of the time to import Prove-It modules, measured with
+'python -X importtime' in fresh interpreters.
+
+Reports the best total import time for each module over the
+repetitions (including the interpreter's own start-up imports) and the
+slowest modules imported along the way (by cumulative time, in the
+last repetition).  With '--max_ms', exits with a non-zero status if
+any of the modules takes longer to import, for catching import-time
+regressions (e.g., a module-level import of IPython or
+urllib.request).
+
+Run with proveit installed (or on the PYTHONPATH):
+    python benchmarks/import_time.py proveit proveit.logic --top 15
+'''
+
+import argparse
+import os
+import subprocess
+import sys
+
+
+def import_times(module_name):
+    '''
+    Import the module in a fresh interpreter and return a list of
+    (module name, self time in us, cumulative time in us, depth)
+    tuples, in the order reported by -X importtime.
+    '''
+    env = dict(os.environ)
+    env.pop('PYTHONPROFILEIMPORTTIME', None)
+    result = subprocess.run(
+        [sys.executable, '-X', 'importtime', '-c',
+         'import %s' % module_name],
+        stderr=subprocess.PIPE, stdout=subprocess.DEVNULL,
+        universal_newlines=True, env=env)
+    if result.returncode != 0:
+        raise RuntimeError("Failed to import %s:\n%s"
+                           % (module_name, result.stderr))
+    times = []
+    for line in result.stderr.splitlines():
+        if not line.startswith('import time:'):
+            continue
+        self_us, cumulative_us, name = line[len('import time:'):].split('|')
+        if not self_us.strip().isdigit():
+            continue  # the header
+        depth = (len(name) - len(name.lstrip())) // 2
+        times.append((name.strip(), int(self_us), int(cumulative_us),
+                      depth))
+    return times
+
+
+def run(module_names, repeat, top, max_ms):
+    exceeded = []
+    for module_name in module_names:
+        best_us = None
+        for _ in range(repeat):
+            times = import_times(module_name)
+            total_us = sum(cumulative_us for _, _, cumulative_us, depth
+                           in times if depth == 0)
+            if best_us is None or total_us < best_us:
+                best_us = total_us
+        print("%s: %.1f ms (best of %d)"
+              % (module_name, best_us / 1000, repeat))
+        slowest = sorted(times, key=lambda entry: -entry[2])[:top]
+        for name, self_us, cumulative_us, _ in slowest:
+            print("  %8.1f ms cumulative, %7.1f ms self: %s"
+                  % (cumulative_us / 1000, self_us / 1000, name))
+        if max_ms is not None and best_us / 1000 > max_ms:
+            exceeded.append(module_name)
+    if len(exceeded) > 0:
+        print("Exceeded %.1f ms: %s" % (max_ms, ', '.join(exceeded)))
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(
+        description='Measure the time to import Prove-It modules.')
+    parser.add_argument('modules', nargs='*', default=['proveit'],
+                        help='the modules to import')
+    parser.add_argument('--repeat', type=int, default=5,
+                        help='number of fresh interpreters per module')
+    parser.add_argument('--top', type=int, default=10,
+                        help='number of the slowest imports to list')
+    parser.add_argument('--max_ms', type=float, default=None,
+                        help='fail if an import takes longer (in ms)')
+    args = parser.parse_args()
+    run(args.modules, args.repeat, args.top, args.max_ms)
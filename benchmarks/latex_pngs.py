@@ -0,0 +1,57 @@
+'''
+Benchmark of generating expression pngs one at a time (a latex and a
+dvipng run per expression, as TheoryFolderStorage._generate_png does)
+versus in batches (see proveit._core_._png_batch): the LaTeX of many
+expressions compiled as the pages of one document, split by a single
+dvipng run, with several batches compiled concurrently.
+
+The expressions are sums of a varying number of subscripted variables.
+Nothing is stored; only the png generation is timed.  Requires latex
+and dvipng.
+
+Run with proveit installed (or on the PYTHONPATH):
+    python benchmarks/latex_pngs.py --count 100 --batch-size 32
+'''
+
+import argparse
+import time
+
+
+def run(count, batch_size, workers):
+    from proveit import defaults
+    from proveit._core_._png_batch import generate_pngs
+    from proveit._core_._theory_storage import TheoryFolderStorage
+
+    def config_latex_tool(lt):
+        pass # the default packages
+
+    latex_configs = [(' + '.join('x_{%d}' % _j for _j in range(_k % 7 + 1)) +
+                      ' = y_{%d}' % _k, config_latex_tool)
+                     for _k in range(count)]
+    start = time.perf_counter()
+    single_pngs = [TheoryFolderStorage._generate_png(latex, config_fn)
+                   for latex, config_fn in latex_configs]
+    single_time = time.perf_counter() - start
+    defaults.png_batch_size = batch_size
+    defaults.png_workers = workers
+    start = time.perf_counter()
+    batched_pngs = generate_pngs(latex_configs,
+                                 TheoryFolderStorage._generate_png)
+    batched_time = time.perf_counter() - start
+    num_same = sum(_a == _b for _a, _b in zip(single_pngs, batched_pngs))
+    print("one at a time: %d pngs in %.2f s" % (count, single_time))
+    print("batched:       %d pngs in %.2f s (%d identical)"
+          % (count, batched_time, num_same))
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(
+        description='Measure one-at-a-time versus batched png generation.')
+    parser.add_argument('--count', type=int, default=50,
+                        help='number of expressions')
+    parser.add_argument('--batch-size', type=int, default=32,
+                        help='maximum number of expressions per document')
+    parser.add_argument('--workers', type=int, default=None,
+                        help='number of concurrent batches (default: CPUs)')
+    args = parser.parse_args()
+    run(args.count, args.batch_size, args.workers)
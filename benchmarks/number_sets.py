@@ -0,0 +1,74 @@
+'''
+Benchmark of readily_provable_number_set on sums and products of many
+variables that are assumed to be in various standard number sets, e.g.
+Add(x_1, ..., x_n) under the assumptions x_1 in NaturalPos, ...,
+x_n in RealNonNeg.
+
+Each measurement is made "cold" (after clearing
+NumberOperation.readily_provable_number_sets) and "warm" (repeating the
+query with the remembered results).
+
+Run with proveit installed (or on the PYTHONPATH), with its theories
+built:
+    python benchmarks/number_sets.py --sizes 10 50 100
+'''
+
+import argparse
+import random
+import time
+
+
+def make_query(op, size, rng):
+    from proveit import Variable
+    from proveit.logic import InSet
+    from proveit.numbers import (Add, Mult, NaturalPos, Natural,
+                                 RealPos, RealNonNeg)
+    op_class = {'add': Add, 'mult': Mult}[op]
+    variables = [Variable('x_{%d}' % _k, 'x_%d' % _k)
+                 for _k in range(1, size + 1)]
+    number_sets = (NaturalPos, Natural, RealPos, RealNonNeg)
+    assumptions = [InSet(var, rng.choice(number_sets))
+                   for var in variables]
+    return op_class(*variables), assumptions
+
+
+def run(sizes, ops, repeat, seed):
+    from proveit import defaults
+    from proveit.numbers import readily_provable_number_set
+    from proveit.numbers.number_operation import NumberOperation
+    rng = random.Random(seed)
+    for size in sizes:
+        for op in ops:
+            expr, assumptions = make_query(op, size, rng)
+            cold_timings, warm_timings = [], []
+            for _ in range(repeat):
+                with defaults.temporary() as temp_defaults:
+                    temp_defaults.assumptions = assumptions
+                    NumberOperation.readily_provable_number_sets.clear()
+                    start = time.perf_counter()
+                    number_set = readily_provable_number_set(expr)
+                    cold_timings.append(time.perf_counter() - start)
+                    start = time.perf_counter()
+                    readily_provable_number_set(expr)
+                    warm_timings.append(time.perf_counter() - start)
+            print("%4s, %4d operands in %s: cold %.4f s, warm %.6f s "
+                  "(best of %d)" % (op, size, number_set, min(cold_timings),
+                                    min(warm_timings), repeat))
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(
+        description='Measure readily_provable_number_set on large '
+        'sums and products.')
+    parser.add_argument('--sizes', type=int, nargs='+',
+                        default=[5, 10, 20, 50, 100],
+                        help='numbers of operands')
+    parser.add_argument('--ops', nargs='+', choices=('add', 'mult'),
+                        default=['add', 'mult'],
+                        help='the operations to query')
+    parser.add_argument('--repeat', type=int, default=3,
+                        help='number of timed repetitions')
+    parser.add_argument('--seed', type=int, default=0,
+                        help='seed of the random number sets')
+    args = parser.parse_args()
+    run(args.sizes, args.ops, args.repeat, args.seed)
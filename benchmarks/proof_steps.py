@@ -0,0 +1,98 @@
+'''
+Benchmark of building a long chained proof.
+
+Proves x_0 < x_n by applying transitivity pairwise from the left
+across a chain of assumptions x_0 < x_1, x_1 < x_2, ..., x_{n-1} < x_n
+(as TransitiveRelation.apply_transitivities does when the chain is not
+streamlined).  Each application adds proof steps that require the
+previous ones, so the time per block of steps reveals whether adding a
+step (checking for a useless self-dependent proof, counting the steps
+of competing proofs, ...) depends upon the length of the proof so far.
+
+Run with proveit installed (or on the PYTHONPATH), with its theories
+built:
+    python benchmarks/proof_steps.py --length 10000 --block 1000
+
+'--sets_only' measures just the maintenance of the transitive
+requirement sets (see Proof._requirement_sets) for the same chain
+shape (each transitivity step requires the previous step and an
+assumption) along with the step counts and useless-proof checks,
+which doesn't require the theories to be built.
+'''
+
+import argparse
+import time
+
+
+def run(length, block, side_effects):
+    from proveit import defaults, Variable
+    from proveit.numbers import Less
+    if not side_effects:
+        defaults.sideeffect_automation = False
+    xs = [Variable('x_{%d}' % k, latex_format=r'x_{%d}' % k)
+          for k in range(length + 1)]
+    chain = [Less(xs[k], xs[k + 1]) for k in range(length)]
+    defaults.assumptions = chain
+    start = time.perf_counter()
+    block_start = start
+    relation = chain[0].prove()
+    for k in range(1, length):
+        relation = relation.apply_transitivity(chain[k])
+        if (k + 1) % block == 0:
+            now = time.perf_counter()
+            print("steps %d-%d: %.3f s (%d proof steps so far)"
+                  % (k + 2 - block, k + 1, now - block_start,
+                     relation.proof().num_steps()))
+            block_start = now
+    total = time.perf_counter() - start
+    print("%d-link chain: %.3f s total, %d proof steps"
+          % (length, total, relation.proof().num_steps()))
+    return total
+
+
+def run_sets(length, block):
+    from proveit._core_._shared_bitset import SharedBitset
+    singleton = SharedBitset.singleton
+    # Bit indices of the steps and truths (as _BitIndices allocates
+    # them): the assumption x_k < x_{k+1} and the conclusion
+    # x_0 < x_{k+1} of each link.
+    start = time.perf_counter()
+    block_start = start
+    requirements = truths = SharedBitset.EMPTY
+    for k in range(length):
+        assumption_requirements = singleton(2 * k)
+        assumption_truths = singleton(2 * k)
+        # Useless-proof check of the new step.
+        assert (2 * k + 1) not in truths
+        assert (2 * k + 1) not in assumption_truths
+        requirements = singleton(2 * k + 1).union(
+            requirements, assumption_requirements)
+        truths = singleton(2 * k + 1).union(truths, assumption_truths)
+        num_steps = len(requirements)
+        if (k + 1) % block == 0:
+            now = time.perf_counter()
+            print("steps %d-%d: %.3f s (%d proof steps so far)"
+                  % (k + 2 - block, k + 1, now - block_start, num_steps))
+            block_start = now
+    total = time.perf_counter() - start
+    print("%d-link chain requirement sets: %.3f s total, %d proof steps"
+          % (length, total, len(requirements)))
+    return total
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(
+        description='Measure the cost of building a long chained proof.')
+    parser.add_argument('--length', type=int, default=10000,
+                        help='number of links in the chain')
+    parser.add_argument('--block', type=int, default=1000,
+                        help='report the time of each block of links')
+    parser.add_argument('--side_effects', action='store_true',
+                        help='leave side-effect automation enabled')
+    parser.add_argument('--sets_only', action='store_true',
+                        help='only maintain the requirement sets')
+    args = parser.parse_args()
+    if args.sets_only:
+        run_sets(args.length, args.block)
+    else:
+        run(args.length, args.block, args.side_effects)
@@ -0,0 +1,95 @@
+'''
+Benchmark of eager versus deferred side-effect derivation
+(defaults.defer_sideeffects; see proveit._core_._side_effect_queue).
+
+The workload assumes that each of many variables is in a random
+standard number set and then proves that some of them are real
+numbers.  With eager side-effects, every assumption's consequences are
+derived up front; with deferred side-effects, they are queued and
+derived (within the budget) only when a look-up of known facts may
+benefit.  The time of making the assumptions and of the proofs is
+reported separately along with SideEffectQueue.stats() (how many of
+the derived facts were used).
+
+Each mode is run in a fresh interpreter so that facts derived in one
+mode don't carry over to the other.
+
+Run with proveit installed (or on the PYTHONPATH), with its theories
+built:
+    python benchmarks/side_effects.py --size 50 --budget 10
+'''
+
+import argparse
+import json
+import random
+import subprocess
+import sys
+import time
+
+
+def run_mode(size, num_queries, deferred, budget, seed):
+    from proveit import defaults, Variable, SideEffectQueue
+    from proveit._core_.proof import Assumption
+    from proveit.logic import InSet
+    from proveit.numbers import (NaturalPos, Natural, Integer, RealPos,
+                                 RealNonNeg, Real)
+    rng = random.Random(seed)
+    variables = [Variable('x_{%d}' % _k, 'x_%d' % _k)
+                 for _k in range(1, size + 1)]
+    number_sets = (NaturalPos, Natural, Integer, RealPos, RealNonNeg)
+    assumptions = [InSet(var, rng.choice(number_sets)) for var in variables]
+    defaults.defer_sideeffects = deferred
+    if budget is not None:
+        defaults.sideeffect_budget = budget
+    defaults.assumptions = assumptions
+    start = time.perf_counter()
+    Assumption.make_assumptions()
+    assume_time = time.perf_counter() - start
+    start = time.perf_counter()
+    for var in rng.sample(variables, min(num_queries, size)):
+        InSet(var, Real).prove()
+    prove_time = time.perf_counter() - start
+    return {'assume_time': assume_time, 'prove_time': prove_time,
+            'stats': SideEffectQueue.stats()}
+
+
+def run(size, num_queries, budget, seed):
+    for deferred in (False, True):
+        args = [sys.executable, __file__, '--size', str(size),
+                '--queries', str(num_queries), '--seed', str(seed),
+                '--single']
+        if deferred:
+            args.append('--deferred')
+            if budget is not None:
+                args += ['--budget', str(budget)]
+        output = subprocess.run(args, stdout=subprocess.PIPE, check=True,
+                                universal_newlines=True).stdout
+        result = json.loads(output.splitlines()[-1])
+        print("%8s: assumptions %.3f s, proofs %.3f s, %s"
+              % ('deferred' if deferred else 'eager',
+                 result['assume_time'], result['prove_time'],
+                 result['stats']))
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(
+        description='Measure eager versus deferred side-effects.')
+    parser.add_argument('--size', type=int, default=50,
+                        help='number of assumed memberships')
+    parser.add_argument('--queries', type=int, default=5,
+                        help='number of memberships to prove')
+    parser.add_argument('--budget', type=int, default=None,
+                        help='side-effect budget per drain when deferred '
+                        '(default: defaults.sideeffect_budget)')
+    parser.add_argument('--seed', type=int, default=0,
+                        help='seed of the random number sets')
+    parser.add_argument('--deferred', action='store_true',
+                        help=argparse.SUPPRESS)
+    parser.add_argument('--single', action='store_true',
+                        help=argparse.SUPPRESS)
+    args = parser.parse_args()
+    if args.single:
+        print(json.dumps(run_mode(args.size, args.queries, args.deferred,
+                                  args.budget, args.seed)))
+    else:
+        run(args.size, args.queries, args.budget, args.seed)
@@ -0,0 +1,109 @@
+'''
+Benchmark of loading the common expressions, axioms, and theorems of
+theories: one at a time (as importing each name from a theory package
+does), via Theory.preload without a snapshot, and via Theory.preload
+from the snapshots written by Theory.write_snapshot.
+
+The Theory tables and caches are cleared (Theory._clear_) before each
+measurement.
+
+Run with proveit installed (or on the PYTHONPATH), with its theories
+built:
+    python benchmarks/theory_preload.py proveit.logic proveit.numbers
+'''
+
+import argparse
+import os
+import time
+
+
+def theories_of(theory_names, include_sub_theories):
+    from proveit._core_.theory import Theory
+    for theory_name in theory_names:
+        theory = Theory.get_theory(theory_name)
+        yield theory
+        if include_sub_theories:
+            yield from _sub_theories(theory)
+
+
+def _sub_theories(theory):
+    for sub_theory in theory.generate_sub_theories():
+        yield sub_theory
+        yield from _sub_theories(sub_theory)
+
+
+def load_one_at_a_time(theories):
+    for theory in theories:
+        for name in theory.get_common_expression_names():
+            theory.get_common_expr(name)
+        for name in theory.get_axiom_names():
+            theory.get_axiom(name)
+        for name in theory.get_theorem_names():
+            theory.get_theorem(name)
+
+
+def fresh_theories(theory_names, include_sub_theories):
+    import importlib
+    from proveit._core_.theory import Theory
+    Theory._clear_()
+    # Re-establish the root theory paths.
+    for root_name in {name.split('.')[0] for name in theory_names}:
+        root_module = importlib.import_module(root_name)
+        Theory(os.path.dirname(root_module.__file__))
+    return list(theories_of(theory_names, include_sub_theories))
+
+
+def run(theory_names, include_sub_theories, repeat):
+    from proveit._core_._theory_snapshot import SNAPSHOT_FILENAME
+    theories = fresh_theories(theory_names, include_sub_theories)
+    for theory in theories:
+        theory.write_snapshot()
+    print("%d theories (%d bytes of snapshots)"
+          % (len(theories),
+             sum(os.path.getsize(os.path.join(theory._storage.pv_it_dir,
+                                              SNAPSHOT_FILENAME))
+                 for theory in theories)))
+
+    def preload(theories):
+        for theory in theories:
+            theory.preload()
+        # Now each name is readily available.
+        load_one_at_a_time(theories)
+
+    def preload_without_snapshots(theories):
+        for theory in theories:
+            filename = os.path.join(theory._storage.pv_it_dir,
+                                    SNAPSHOT_FILENAME)
+            os.rename(filename, filename + '.bak')
+        try:
+            preload(theories)
+        finally:
+            for theory in theories:
+                filename = os.path.join(theory._storage.pv_it_dir,
+                                        SNAPSHOT_FILENAME)
+                os.rename(filename + '.bak', filename)
+
+    for label, load_fn in (('one at a time', load_one_at_a_time),
+                           ('preload, no snapshots',
+                            preload_without_snapshots),
+                           ('preload from snapshots', preload)):
+        timings = []
+        for _ in range(repeat):
+            theories = fresh_theories(theory_names, include_sub_theories)
+            start = time.perf_counter()
+            load_fn(theories)
+            timings.append(time.perf_counter() - start)
+        print("%s: %.3f s (best of %d)" % (label, min(timings), repeat))
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(
+        description='Measure the time to load theories.')
+    parser.add_argument('theories', nargs='+',
+                        help='names of the theories to load')
+    parser.add_argument('--no_sub_theories', action='store_true',
+                        help='do not include the sub-theories')
+    parser.add_argument('--repeat', type=int, default=3,
+                        help='number of timed repetitions')
+    args = parser.parse_args()
+    run(args.theories, not args.no_sub_theories, args.repeat)
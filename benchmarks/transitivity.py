@@ -0,0 +1,72 @@
+'''
+Benchmark of proving orderings via transitivity among many known
+Less/LessEq relations: a chain x_1 < x_2 <= x_3 < ... of assumptions
+(with random strong/weak links) and queries relating random pairs of
+the chain, e.g. x_3 < x_40.
+
+Queries are answered via TransitiveClosureIndex chains fed to
+TransitiveRelation.apply_transitivities.  '--lookup' also times
+TransitiveClosureIndex.find_chain alone (cold, i.e., after clearing
+the remembered closures, and warm).
+
+Run with proveit installed (or on the PYTHONPATH), with its theories
+built:
+    python benchmarks/transitivity.py --size 200 --queries 50
+'''
+
+import argparse
+import random
+import time
+
+
+def run(size, num_queries, lookup, seed):
+    from proveit import defaults, Variable
+    from proveit._core_.proof import Assumption
+    from proveit.numbers import Less, LessEq, Real
+    from proveit.logic import InSet
+    from proveit.relation.transitive_closure import TransitiveClosureIndex
+    rng = random.Random(seed)
+    variables = [Variable('x_{%d}' % _k, 'x_%d' % _k)
+                 for _k in range(1, size + 1)]
+    links = [rng.choice((Less, LessEq))(_a, _b)
+             for _a, _b in zip(variables[:-1], variables[1:])]
+    defaults.assumptions = ([InSet(var, Real) for var in variables] +
+                            links)
+    # Prove the assumptions (recording the links in the index).
+    Assumption.make_assumptions()
+    pairs = []
+    for _ in range(num_queries):
+        i, j = sorted(rng.sample(range(size), 2))
+        pairs.append((variables[i], variables[j]))
+
+    if lookup:
+        for label in ('cold', 'warm'):
+            if label == 'cold':
+                TransitiveClosureIndex._closures.clear()
+            start = time.perf_counter()
+            for _a, _b in pairs:
+                TransitiveClosureIndex.find_chain(LessEq, _a, _b)
+            print("find_chain (%s): %d queries in %.4f s"
+                  % (label, num_queries, time.perf_counter() - start))
+
+    start = time.perf_counter()
+    for _a, _b in pairs:
+        LessEq(_a, _b).prove()
+    elapsed = time.perf_counter() - start
+    print("%d orderings proven over a chain of %d in %.3f s (%.1f ms each)"
+          % (num_queries, size, elapsed, 1000 * elapsed / num_queries))
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(
+        description='Measure proving orderings via transitivity.')
+    parser.add_argument('--size', type=int, default=100,
+                        help='number of variables in the chain')
+    parser.add_argument('--queries', type=int, default=20,
+                        help='number of random orderings to prove')
+    parser.add_argument('--lookup', action='store_true',
+                        help='also time the chain look-ups alone')
+    parser.add_argument('--seed', type=int, default=0,
+                        help='seed of the random chain and queries')
+    args = parser.parse_args()
+    run(args.size, args.queries, args.lookup, args.seed)
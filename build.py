@@ -23,6 +23,10 @@ from IPython.lib.latextools import LaTeXTool
 import base64
 import datetime
 import tarfile
+import ast
+import json
+import hashlib
+import textwrap
 # import urllib#Comment out for Python 3
 import urllib.request  # Comment in for Python 3
 import zmq  # to catch ZMQError which randomly occurs when starting a Jupyter kernel
@@ -739,12 +743,400 @@ def sure_you_want_to_extract(paths):
     if response == "": return False
     return response[0].upper()=='Y'  
 
+# Incremental builds: a notebook is only re-executed when its
+# fingerprint changes.  The fingerprint hashes the code cells of the
+# notebook along with the stored hashes of the common expressions,
+# axioms, and theorems that it imports (and of the Python sources of
+# the packages it imports anything else from).  Fingerprints are
+# recorded after successful executions, in the directory of this
+# 'build.py' (with paths relative to it) regardless of where it is run.
+BUILD_DIR = os.path.dirname(os.path.realpath(__file__))
+FINGERPRINTS_FILENAME = os.path.join(BUILD_DIR, '__pv_it',
+                                     'build_fingerprints.json')
+SPECIAL_NAMES_FILENAME = 'name_to_expr_and_obj_hashes.txt'
+SPECIAL_FOLDERS = ('common', 'axioms', 'theorems')
+
+
+def _build_relpath(path):
+    return os.path.relpath(os.path.abspath(path), BUILD_DIR)
+
+
+def _sha256_of_file(filename):
+    if not os.path.isfile(filename):
+        return ''
+    with open(filename, 'rb') as f:
+        return hashlib.sha256(f.read()).hexdigest()
+
+
+def theory_path_of_notebook(notebook_path):
+    '''
+    Return the path of the theory that contains the given notebook
+    (in its '_theory_nbs_' or '__pv_it' folder or directly), or None.
+    '''
+    path = os.path.dirname(os.path.abspath(notebook_path))
+    while True:
+        if os.path.isdir(os.path.join(path, '_theory_nbs_')):
+            return path
+        parent = os.path.dirname(path)
+        if parent == path:
+            return None
+        path = parent
+
+
+def parse_code_cell(source):
+    '''
+    Parse the Python code of a notebook code cell, ignoring magic
+    and shell-command lines.  Raises SyntaxError if it cannot be parsed.
+    '''
+    if source.lstrip().startswith('%%'):
+        return ast.Module(body=[], type_ignores=[])  # cell magic
+    lines = [line for line in source.splitlines()
+             if not line.lstrip().startswith(('%', '!'))]
+    return ast.parse(textwrap.dedent('\n'.join(lines)))
+
+
+class NotebookImports:
+    '''
+    Resolves the imports of notebook code cells to the package
+    directories of Prove-It or of the theories being built.
+    '''
+
+    def __init__(self, theory_map):
+        # Map theory/module names to their paths for resolving imports.
+        self.module_paths = {name: os.path.abspath(path) for name, path
+                             in theory_map.items()}
+        self.module_paths['proveit'] = os.path.dirname(
+            os.path.abspath(proveit.__file__))
+
+    def imports(self, source, notebook_dir):
+        '''
+        Return (path, names) pairs for the imports of a code cell where
+        'names' is None for 'import module' statements, or return None
+        if the cell cannot be parsed.
+        '''
+        try:
+            tree = parse_code_cell(source)
+        except SyntaxError:
+            if 'import' in source:
+                return None
+            return [] # an error cell without imports
+        imports = []
+        for node in ast.walk(tree):
+            if isinstance(node, ast.Import):
+                for alias in node.names:
+                    if alias.name == 'proveit':
+                        continue  # the standard notebook preamble
+                    path = self.module_path(alias.name)
+                    if path is not None:
+                        imports.append((path, None))
+            elif isinstance(node, ast.ImportFrom):
+                if node.level > 0:
+                    path = notebook_dir
+                    for _ in range(node.level - 1):
+                        path = os.path.dirname(path)
+                    if node.module is not None:
+                        path = os.path.join(path, *node.module.split('.'))
+                    path = self.existing_module_path(path)
+                else:
+                    path = self.module_path(node.module)
+                if path is not None:
+                    imports.append(
+                        (path, [alias.name for alias in node.names]))
+        return imports
+
+    def module_path(self, module):
+        '''
+        Return the package directory of the given module if it is
+        part of Prove-It or the theories being built, otherwise None.
+        '''
+        parts = module.split('.')
+        for k in range(len(parts), 0, -1):
+            prefix = '.'.join(parts[:k])
+            if prefix in self.module_paths:
+                return self.existing_module_path(
+                    os.path.join(self.module_paths[prefix], *parts[k:]))
+        return None
+
+    @staticmethod
+    def existing_module_path(path):
+        if os.path.isdir(path):
+            return path
+        if os.path.isfile(path + '.py'):
+            return os.path.dirname(path)
+        return None
+
+
+class NotebookFingerprints:
+    '''
+    Computes, records (in FINGERPRINTS_FILENAME), and compares
+    notebook fingerprints for incremental builds.  With 'dry_run',
+    the invalidated notebooks are reported rather than yielded for
+    execution.
+    '''
+
+    def __init__(self, theory_map, dry_run=False,
+                 filename=FINGERPRINTS_FILENAME):
+        self.filename = filename
+        self.dry_run = dry_run
+        self.notebook_imports = NotebookImports(theory_map)
+        self.source_digests = dict()
+        # Inputs (e.g., special names files) that would be changed
+        # by invalidated notebooks of a dry run.
+        self.dirty_inputs = set()
+        self.num_invalidated = 0
+        self.fingerprints = dict()
+        if os.path.isfile(filename):
+            with open(filename, 'r') as f:
+                self.fingerprints = json.load(f)
+
+    def stale_notebooks(self, notebook_paths):
+        '''
+        Yield the notebooks whose fingerprints have changed since
+        they were last executed (or report them if this is a dry run).
+        '''
+        for notebook_path in notebook_paths:
+            if not self.is_stale(notebook_path):
+                print("\tUp to date:", notebook_path)
+                continue
+            self.num_invalidated += 1
+            if self.dry_run:
+                print("Invalidated:", notebook_path)
+                self.dirty_inputs.update(self._outputs(notebook_path))
+            else:
+                yield notebook_path
+
+    def is_stale(self, notebook_path):
+        entry = self.fingerprints.get(self._key(notebook_path))
+        if entry is None:
+            return True
+        if not self.dirty_inputs.isdisjoint(entry['inputs']):
+            return True
+        fingerprint, _ = self.fingerprint(notebook_path)
+        return fingerprint is None or fingerprint != entry['fingerprint']
+
+    def record(self, notebook_path):
+        '''
+        Record the fingerprint of a successfully executed notebook.
+        '''
+        fingerprint, inputs = self.fingerprint(notebook_path)
+        key = self._key(notebook_path)
+        if fingerprint is None:
+            self.fingerprints.pop(key, None)
+        else:
+            self.fingerprints[key] = {'fingerprint': fingerprint,
+                                      'inputs': sorted(inputs)}
+        self._save()
+
+    def fingerprint(self, notebook_path):
+        '''
+        Return the fingerprint of the notebook and the set of labels of
+        its inputs.  The fingerprint is None if the imports of the
+        notebook could not be determined.
+        '''
+        with open(notebook_path, encoding='utf8') as f:
+            nb = nbformat.reads(f.read(), as_version=4)
+        sources = [cell['source'] for cell in nb.cells
+                   if cell.cell_type == 'code']
+        inputs = dict()
+        # Everything depends upon the core (the Python sources of
+        # the 'proveit' package outside of its sub-theories).
+        proveit_path = self.notebook_imports.module_paths['proveit']
+        inputs['src:' + _build_relpath(proveit_path)] = (
+            self._source_digest(proveit_path))
+        notebook_dir = os.path.dirname(os.path.abspath(notebook_path))
+        for source in sources:
+            imports = self.notebook_imports.imports(source, notebook_dir)
+            if imports is None:
+                return None, None
+            for path, names in imports:
+                self._add_import_inputs(inputs, path, names)
+        theory_path = theory_path_of_notebook(notebook_path)
+        if theory_path is not None:
+            self._add_theory_inputs(inputs, notebook_path, theory_path)
+        hasher = hashlib.sha256()
+        hasher.update(json.dumps(sources).encode('utf8'))
+        for label in sorted(inputs.keys()):
+            hasher.update(('%s=%s\n' % (label, inputs[label])).encode('utf8'))
+        return hasher.hexdigest(), set(inputs.keys())
+
+    def _key(self, notebook_path):
+        return _build_relpath(notebook_path)
+
+    def _save(self):
+        os.makedirs(os.path.dirname(self.filename) or '.', exist_ok=True)
+        tmp_filename = self.filename + '.tmp'
+        with open(tmp_filename, 'w') as f:
+            json.dump(self.fingerprints, f, indent=0, sort_keys=True)
+        os.replace(tmp_filename, self.filename)
+
+    def _outputs(self, notebook_path):
+        '''
+        Return the input labels of other notebooks that may be changed
+        by executing the given notebook.
+        '''
+        theory_path = theory_path_of_notebook(notebook_path)
+        base, ext = os.path.splitext(os.path.basename(notebook_path))
+        folder = {'common': 'common', 'axioms': 'axioms',
+                  'theorems': 'theorems'}.get(base)
+        if theory_path is None or folder is None:
+            return set()
+        return {self._special_names_label(theory_path, folder)}
+
+    def _add_import_inputs(self, inputs, path, names):
+        '''
+        Add inputs for importing the given names (or everything if
+        names is None or includes '*') from the package at the given
+        path.
+        '''
+        if os.path.isdir(os.path.join(path, '_theory_nbs_')):
+            package_paths = list(find_theory_paths(path))
+        else:
+            package_paths = [path]
+        if names is None or '*' in names:
+            for package_path in package_paths:
+                inputs['src:' + _build_relpath(package_path)] = (
+                    self._source_digest(package_path))
+                for folder in SPECIAL_FOLDERS:
+                    self._add_special_names_input(inputs, package_path,
+                                                  folder)
+            return
+        special_names = dict()
+        for package_path in package_paths:
+            for folder in SPECIAL_FOLDERS:
+                for name, obj_hash in self._read_special_names(
+                        package_path, folder).items():
+                    special_names.setdefault(
+                        name, (package_path, folder, obj_hash))
+        for name in names:
+            if name in special_names:
+                package_path, folder, obj_hash = special_names[name]
+                inputs['%s:%s' % (self._special_names_label(
+                    package_path, folder), name)] = obj_hash
+            else:
+                # Not a stored special expression (e.g., a class).
+                for package_path in package_paths:
+                    inputs['src:' + _build_relpath(package_path)] = (
+                        self._source_digest(package_path))
+
+    def _add_theory_inputs(self, inputs, notebook_path, theory_path):
+        '''
+        Add inputs that notebooks of a theory have beyond their
+        imports, depending upon the kind of notebook.
+        '''
+        notebook_name = os.path.basename(notebook_path)
+        if notebook_name in ('theory.ipynb', 'theorems.ipynb'):
+            # These display the statements and proof status.
+            for folder in SPECIAL_FOLDERS:
+                self._add_special_names_input(inputs, theory_path, folder)
+            inputs['sub_theories:' + _build_relpath(theory_path)] = (
+                _sha256_of_file(os.path.join(theory_path,
+                                             '_sub_theories_.txt')))
+            inputs['proofs:' + _build_relpath(theory_path)] = (
+                self._proofs_digest(theory_path))
+        elif notebook_name == 'thm_proof.ipynb':
+            theorem_name = os.path.basename(os.path.dirname(notebook_path))
+            special_names = self._read_special_names(theory_path, 'theorems')
+            inputs['%s:%s' % (self._special_names_label(
+                theory_path, 'theorems'), theorem_name)] = special_names.get(
+                    theorem_name, '')
+            # The axioms and theorems used by the recorded proof.
+            if theorem_name in special_names:
+                theory = Theory(theory_path)
+                stored_theorem = theory.get_stored_theorem(
+                    theory.name + '.' + theorem_name)
+                for folder, used_names in (
+                        ('axioms', stored_theorem.read_used_axioms()),
+                        ('theorems', stored_theorem.read_used_theorems())):
+                    for used_name in used_names:
+                        module, name = used_name.rsplit('.', 1)
+                        path = self.notebook_imports.module_path(module)
+                        if path is None:
+                            continue
+                        inputs['%s:%s' % (self._special_names_label(
+                            path, folder), name)] = (
+                                self._read_special_names(path, folder).get(
+                                    name, ''))
+            # Presumption files.
+            proof_dir = os.path.dirname(notebook_path)
+            for filename in sorted(os.listdir(proof_dir)):
+                if not filename.endswith('.ipynb'):
+                    full_filename = os.path.join(proof_dir, filename)
+                    inputs['file:' + _build_relpath(full_filename)] = (
+                        _sha256_of_file(full_filename))
+
+    def _proofs_digest(self, theory_path):
+        '''
+        Digest the recorded proof status of the theorems of a theory.
+        '''
+        hasher = hashlib.sha256()
+        theorems_dir = os.path.join(theory_path, '__pv_it', 'theorems')
+        for obj_hash in sorted(self._read_special_names(
+                theory_path, 'theorems').values()):
+            hash_dir = os.path.join(theorems_dir, obj_hash)
+            for filename in ('proof.pv_it', 'used_axioms.txt',
+                             'used_theorems.txt'):
+                hasher.update(_sha256_of_file(
+                    os.path.join(hash_dir, filename)).encode('utf8'))
+        return hasher.hexdigest()
+
+    @staticmethod
+    def _special_names_label(theory_path, folder):
+        return 'names:' + _build_relpath(
+            os.path.join(theory_path, '__pv_it', folder))
+
+    def _add_special_names_input(self, inputs, theory_path, folder):
+        inputs[self._special_names_label(theory_path, folder)] = (
+            _sha256_of_file(os.path.join(theory_path, '__pv_it', folder,
+                                         SPECIAL_NAMES_FILENAME)))
+
+    @staticmethod
+    def _read_special_names(theory_path, folder):
+        '''
+        Return a dictionary mapping stored special names of the given
+        folder ('common', 'axioms', or 'theorems') to object hashes.
+        '''
+        filename = os.path.join(theory_path, '__pv_it', folder,
+                                SPECIAL_NAMES_FILENAME)
+        special_names = dict()
+        if os.path.isfile(filename):
+            with open(filename, 'r') as f:
+                for line in f.readlines():
+                    name, _, obj_hash = line.split()
+                    special_names[name] = obj_hash
+        return special_names
+
+    def _source_digest(self, package_path):
+        '''
+        Digest the Python sources of a package, excluding those of its
+        sub-theories (which are tracked separately).
+        '''
+        if package_path in self.source_digests:
+            return self.source_digests[package_path]
+        hasher = hashlib.sha256()
+        for dirpath, dirnames, filenames in os.walk(package_path):
+            dirnames[:] = sorted(
+                dirname for dirname in dirnames
+                if dirname not in ('__pv_it', '_theory_nbs_', '__pycache__')
+                and not os.path.isdir(os.path.join(dirpath, dirname,
+                                                   '_theory_nbs_')))
+            for filename in sorted(filenames):
+                if filename.endswith('.py'):
+                    full_filename = os.path.join(dirpath, filename)
+                    hasher.update(os.path.relpath(
+                        full_filename, package_path).encode('utf8'))
+                    hasher.update(_sha256_of_file(
+                        full_filename).encode('utf8'))
+        digest = self.source_digests[package_path] = hasher.hexdigest()
+        return digest
+
+
 def mpi_build(
         notebook_paths,
         no_latex=False,
         git_clear=True,
         no_execute=False,
-        export_to_html=True):
+        export_to_html=True,
+        fingerprints=None):
     try:
         from mpi4py import MPI
         comm = MPI.COMM_WORLD
@@ -755,6 +1147,17 @@ def mpi_build(
 
     assert export_to_html or not no_execute, "Nothing to do, in that case??"
 
+    if fingerprints is not None and fingerprints.dry_run:
+        # Just report the invalidated notebooks.
+        if rank == 0:
+            for _ in fingerprints.stale_notebooks(notebook_paths):
+                pass
+        return
+    if fingerprints is not None and rank == 0:
+        # Incremental build: skip notebooks whose fingerprints are
+        # unchanged.
+        notebook_paths = fingerprints.stale_notebooks(notebook_paths)
+
     # Set of notebooks that should be attempted after prerequisites
     # have been satisfied (e.g., other common expression notebooks):
     retry_notebooks = set()
@@ -846,6 +1249,8 @@ def mpi_build(
     def successful_execution_notification(notebook_path):
         nonlocal count
         count += 1
+        if fingerprints is not None:
+            fingerprints.record(notebook_path)
         common_filename = 'common.ipynb'
         if notebook_path[-len(common_filename):] == common_filename:
             theory = Theory(notebook_path)
@@ -953,6 +1358,419 @@ def mpi_build(
         print("Finished executing %d notebooks" % count)
 
 
+def defined_common_names(notebook_path):
+    '''
+    Return the names assigned at the top level of a common expressions
+    notebook (i.e., the names of its common expressions).
+    '''
+    with open(notebook_path, encoding='utf8') as f:
+        nb = nbformat.reads(f.read(), as_version=4)
+    names = set()
+    for cell in nb.cells:
+        if cell.cell_type != 'code':
+            continue
+        try:
+            tree = parse_code_cell(cell.source)
+        except SyntaxError:
+            continue
+        for node in tree.body:
+            if isinstance(node, (ast.Assign, ast.AnnAssign)):
+                targets = (node.targets if isinstance(node, ast.Assign)
+                           else [node.target])
+                for target in targets:
+                    for sub_node in ast.walk(target):
+                        if isinstance(sub_node, ast.Name):
+                            names.add(sub_node.id)
+    return names
+
+
+def notebook_dependency_graph(notebook_paths, theory_map):
+    '''
+    Return a dictionary mapping each of the given notebooks to the set
+    of the given notebooks that must be executed before it:
+        * a 'common' notebook depends on the 'common' notebooks that
+          define common expressions that it imports;
+        * a 'theory' notebook depends on the 'theory' notebooks of its
+          sub-theories (listed in _sub_theories_.txt).
+    Other notebooks of a single build stage are independent.
+    '''
+    notebook_imports = NotebookImports(theory_map)
+    dependencies = {notebook_path: set() for notebook_path in notebook_paths}
+    # Map theory paths to their common/theory notebooks being built.
+    notebook_of_theory = {'common.ipynb': dict(), 'theory.ipynb': dict()}
+    for notebook_path in notebook_paths:
+        notebook_name = os.path.basename(notebook_path)
+        theory_path = theory_path_of_notebook(notebook_path)
+        if notebook_name in notebook_of_theory and theory_path is not None:
+            notebook_of_theory[notebook_name][theory_path] = notebook_path
+
+    common_notebooks = notebook_of_theory['common.ipynb']
+    common_names = {theory_path: defined_common_names(notebook_path)
+                    for theory_path, notebook_path in common_notebooks.items()}
+    for theory_path, notebook_path in common_notebooks.items():
+        notebook_dir = os.path.dirname(os.path.abspath(notebook_path))
+        with open(notebook_path, encoding='utf8') as f:
+            nb = nbformat.reads(f.read(), as_version=4)
+        for cell in nb.cells:
+            if cell.cell_type != 'code':
+                continue
+            for path, names in (notebook_imports.imports(
+                    cell.source, notebook_dir) or []):
+                if os.path.isdir(os.path.join(path, '_theory_nbs_')):
+                    package_paths = [os.path.abspath(_) for _
+                                     in find_theory_paths(path)]
+                else:
+                    package_paths = [path]
+                for package_path in package_paths:
+                    if (package_path == theory_path or
+                            package_path not in common_names):
+                        continue
+                    if (names is None or '*' in names or not
+                            common_names[package_path].isdisjoint(names)):
+                        dependencies[notebook_path].add(
+                            common_notebooks[package_path])
+
+    for theory_path, notebook_path in (
+            notebook_of_theory['theory.ipynb'].items()):
+        sub_theories_txt = os.path.join(theory_path, '_sub_theories_.txt')
+        if not os.path.isfile(sub_theories_txt):
+            continue
+        with open(sub_theories_txt, 'r') as f:
+            for sub_theory in f.read().split():
+                sub_theory_path = os.path.join(theory_path, sub_theory)
+                if sub_theory_path in notebook_of_theory['theory.ipynb']:
+                    dependencies[notebook_path].add(
+                        notebook_of_theory['theory.ipynb'][sub_theory_path])
+    return dependencies
+
+
+# The kernel of a local pool worker process (see pool_build) and the
+# finalizer that shuts it down.
+_pool_worker_processor = None
+_pool_worker_finalizer = None
+
+
+def _pool_worker_init(working_dir, python_path):
+    '''
+    Initialize a local pool worker process with the working directory
+    and Python path of the build (which are not inherited when worker
+    processes are spawned rather than forked).
+    '''
+    import signal
+    os.chdir(working_dir)
+    sys.path[:] = python_path
+    signal.signal(signal.SIGTERM, _pool_worker_terminated)
+
+
+def _pool_worker_terminated(signum, frame):
+    '''
+    Shut down the kernel of a local pool worker process and exit right
+    away when pool_build terminates the worker (see _terminate_pool).
+    '''
+    if _pool_worker_finalizer is not None:
+        _pool_worker_finalizer()
+    os._exit(1)
+
+
+def _pool_execute_notebook(notebook_path, save_notebook, no_latex,
+                           no_execute, export_to_html):
+    '''
+    Execute a notebook in a local pool worker process, starting and
+    recycling a kernel for the worker.  Only the arguments are used
+    (not the state of the parent process) so this works whether the
+    worker was forked or spawned.  Return the duration and an error
+    message (or None).
+    '''
+    global _pool_worker_processor, _pool_worker_finalizer
+    from multiprocessing.util import Finalize
+    start_time = time.time()
+    try:
+        if _pool_worker_processor is None:
+            execute_processor = RecyclingExecutePreprocessor(
+                kernel_name='python3', timeout=-1)
+            kernel_context = execute_processor.setup_kernel()
+            kernel_context.__enter__()
+            # Shut down the kernel when the worker exits.
+            _pool_worker_finalizer = Finalize(
+                execute_processor, kernel_context.__exit__,
+                args=(None, None, None), exitpriority=10)
+            _pool_worker_processor = execute_processor
+        execute_and_maybe_export_notebook(
+            _pool_worker_processor, notebook_path,
+            save_notebook=save_notebook, no_latex=no_latex,
+            no_execute=no_execute, git_clear=False,
+            export_to_html=export_to_html)
+    except Exception as e:
+        return time.time() - start_time, str(e) or repr(e)
+    return time.time() - start_time, None
+
+
+def _terminate_pool(executor):
+    '''
+    Stop the local pool of pool_build without waiting for the notebooks
+    being executed: cancel the pending ones and terminate the workers
+    (which shut down their kernels; see _pool_worker_terminated).
+    '''
+    processes = list((executor._processes or dict()).values())
+    executor.shutdown(wait=False, cancel_futures=True)
+    for process in processes:
+        process.terminate()
+
+
+def pool_build(
+        notebook_paths,
+        jobs,
+        theory_map,
+        no_latex=False,
+        git_clear=True,
+        no_execute=False,
+        export_to_html=True,
+        fingerprints=None,
+        save_notebook=False):
+    '''
+    Build the notebooks with a local pool of 'jobs' worker processes
+    (each recycling its own kernel), executing notebooks as soon as
+    the notebooks they depend upon (see notebook_dependency_graph) are
+    done.  Ready notebooks that start the longest chains of dependents
+    are executed first.  As in mpi_build, a common expression notebook
+    that fails to import from another theory's common expressions
+    (that haven't been built yet) is retried once those are built.
+    A critical-path timing summary is reported at the end.
+    '''
+    import heapq
+    import multiprocessing
+    from concurrent.futures import (ProcessPoolExecutor, FIRST_COMPLETED,
+                                    wait)
+    notebook_paths = list(notebook_paths)
+    dependencies = notebook_dependency_graph(notebook_paths, theory_map)
+    dependents = {notebook_path: set() for notebook_path in notebook_paths}
+    for notebook_path, prerequisites in dependencies.items():
+        for prerequisite in prerequisites:
+            dependents[prerequisite].add(notebook_path)
+
+    # Topological order (raising an exception for cyclic dependencies).
+    order = []
+    num_unmet = {notebook_path: len(dependencies[notebook_path])
+                 for notebook_path in notebook_paths}
+    ready = [notebook_path for notebook_path in notebook_paths
+             if num_unmet[notebook_path] == 0]
+    while len(ready) > 0:
+        notebook_path = ready.pop()
+        order.append(notebook_path)
+        for dependent in dependents[notebook_path]:
+            num_unmet[dependent] -= 1
+            if num_unmet[dependent] == 0:
+                ready.append(dependent)
+    if len(order) < len(notebook_paths):
+        cyclic = sorted(notebook_path for notebook_path in notebook_paths
+                        if num_unmet[notebook_path] > 0)
+        raise Exception("Cyclic dependency among %s detected" % cyclic)
+
+    # Length of the longest chain of dependents (to prioritize).
+    chain_length = dict()
+    for notebook_path in reversed(order):
+        chain_length[notebook_path] = 1 + max(
+            (chain_length[dependent] for dependent
+             in dependents[notebook_path]), default=0)
+
+    to_execute = set(notebook_paths)
+    if fingerprints is not None:
+        # Incremental build: execute notebooks whose fingerprints
+        # changed as well as anything that depends upon them.
+        to_execute = set()
+        for notebook_path in order:
+            if (not dependencies[notebook_path].isdisjoint(to_execute) or
+                    fingerprints.is_stale(notebook_path)):
+                to_execute.add(notebook_path)
+            else:
+                print("\tUp to date:", notebook_path)
+
+    index = {notebook_path: k for k, notebook_path
+             in enumerate(notebook_paths)}
+    num_unmet = {notebook_path: len(dependencies[notebook_path] & to_execute)
+                 for notebook_path in to_execute}
+    ready = [(-chain_length[notebook_path], index[notebook_path],
+              notebook_path) for notebook_path in to_execute
+             if num_unmet[notebook_path] == 0]
+    heapq.heapify(ready)
+
+    common_notebook_name = 'common.ipynb'
+    # Map theory names to their common expression notebooks that
+    # are to be executed:
+    common_notebook_of_theory = {
+        Theory(notebook_path).name: notebook_path for notebook_path
+        in to_execute if notebook_path.endswith(common_notebook_name)}
+    # Set of theories for which a notebook was successfully executed:
+    successful_execution_theories = set()
+    # Map theories of unsuccessfully executed common expression
+    # notebooks to the theory whose common expression notebook
+    # must be executed first:
+    retry_prerequisite = dict()
+    # Map the retry_prerequisite values that have not been satisfied
+    # to the notebooks waiting on them:
+    unmet_prerequisites = dict()
+    # Map notebooks being executed to the
+    # successful_execution_theories when they were started:
+    successful_when_started = dict()
+
+    def should_retry_after_failed_execution(notebook_path, orig_err_msg):
+        '''
+        Return True if the failed notebook should be retried after a
+        prerequisite has been satisfied, queueing it up to be retried.
+        Raise an exception if it can't be satisfied.
+        '''
+        if not notebook_path.endswith(common_notebook_name):
+            # Only retry for common expression notebooks.
+            return False
+        theory = Theory(notebook_path)
+        import_failure_filename = os.path.join(
+            theory._theory_folder_storage('common').path,
+            'import_failure.txt')
+        if not os.path.isfile(import_failure_filename):
+            return False
+        with open(import_failure_filename, 'r') as f:
+            failed_import = f.read().strip()
+        if (failed_import in retry_prerequisite and
+                retry_prerequisite[failed_import] == theory.name):
+            raise Exception("Cyclic dependency between %s and %s common "
+                            "expression notebooks detected" %
+                            (failed_import, theory.name))
+        if failed_import in successful_execution_theories:
+            if failed_import in successful_when_started[notebook_path]:
+                # The prerequisite was already satisfied so trying
+                # again won't help.
+                return False
+            # The prerequisite was satisfied while this was being
+            # executed; retry right away.
+            heapq.heappush(ready, (-chain_length[notebook_path],
+                                   index[notebook_path], notebook_path))
+        elif failed_import in common_notebook_of_theory:
+            retry_prerequisite[theory.name] = failed_import
+            unmet_prerequisites.setdefault(failed_import, []).append(
+                notebook_path)
+        else:
+            # Unable to satisfy the prerequisite because it isn't
+            # queued up.
+            return False
+        print("\tFailure to execute %s, but we may retry "
+              "after satisfying prerequisites" % notebook_path)
+        return True
+
+    def successful_execution_notification(notebook_path):
+        if git_clear and not no_execute:
+            git_clear_notebook(notebook_path)
+        if fingerprints is not None:
+            fingerprints.record(notebook_path)
+        for dependent in dependents[notebook_path] & to_execute:
+            num_unmet[dependent] -= 1
+            if num_unmet[dependent] == 0:
+                heapq.heappush(ready, (-chain_length[dependent],
+                                       index[dependent], dependent))
+        if notebook_path.endswith(common_notebook_name):
+            theory_name = Theory(notebook_path).name
+            successful_execution_theories.add(theory_name)
+            for to_retry in unmet_prerequisites.pop(theory_name, []):
+                retry_prerequisite.pop(Theory(to_retry).name, None)
+                heapq.heappush(ready, (-chain_length[to_retry],
+                                       index[to_retry], to_retry))
+
+    durations = dict()
+    build_start_time = time.time()
+    # Spawn the workers on all platforms so they never rely upon state
+    # inherited from this process by forking.
+    with ProcessPoolExecutor(
+            max_workers=jobs,
+            mp_context=multiprocessing.get_context('spawn'),
+            initializer=_pool_worker_init,
+            initargs=(os.getcwd(), list(sys.path))) as executor:
+        running = dict()  # map futures to notebook paths
+        while len(ready) > 0 or len(running) > 0:
+            while len(ready) > 0 and len(running) < jobs:
+                _, _, notebook_path = heapq.heappop(ready)
+                successful_when_started[notebook_path] = set(
+                    successful_execution_theories)
+                future = executor.submit(
+                    _pool_execute_notebook, notebook_path,
+                    save_notebook, no_latex, no_execute, export_to_html)
+                running[future] = notebook_path
+            done, _ = wait(running.keys(), return_when=FIRST_COMPLETED)
+            for future in done:
+                notebook_path = running.pop(future)
+                duration, err_msg = future.result()
+                durations[notebook_path] = (
+                    durations.get(notebook_path, 0) + duration)
+                if err_msg is None:
+                    successful_execution_notification(notebook_path)
+                elif not should_retry_after_failed_execution(notebook_path,
+                                                             err_msg):
+                    _terminate_pool(executor)
+                    raise Exception("Error while executing %s:\n%s"
+                                    % (notebook_path, err_msg))
+        if len(unmet_prerequisites) > 0:
+            # Notebooks are still waiting on prerequisites that
+            # could not be satisfied.
+            waiting = sorted(notebook_path for notebook_paths
+                             in unmet_prerequisites.values()
+                             for notebook_path in notebook_paths)
+            raise Exception("Unable to satisfy the prerequisites of %s"
+                            % waiting)
+    report_critical_path(durations, dependencies,
+                         time.time() - build_start_time, jobs)
+
+
+def report_critical_path(durations, dependencies, wall_time, jobs):
+    '''
+    Report the total and critical-path execution times of notebooks
+    given their durations and dependencies.
+    '''
+    print("Finished executing %d notebooks with %d jobs in %0.2f seconds"
+          % (len(durations), jobs, wall_time))
+    if len(durations) == 0:
+        return
+    # Longest (by duration) chain of dependencies ending at each
+    # executed notebook.
+    path_time, path_prev = dict(), dict()
+
+    def critical_time(notebook_path):
+        if notebook_path not in path_time:
+            prev = max((prerequisite for prerequisite
+                        in dependencies[notebook_path]
+                        if prerequisite in durations),
+                       key=critical_time, default=None)
+            path_prev[notebook_path] = prev
+            path_time[notebook_path] = durations[notebook_path] + (
+                0 if prev is None else critical_time(prev))
+        return path_time[notebook_path]
+    end = max(durations.keys(), key=critical_time)
+    critical_path = []
+    while end is not None:
+        critical_path.append(end)
+        end = path_prev[end]
+    total_time = sum(durations.values())
+    print("\tTotal notebook execution time: %0.2f seconds" % total_time)
+    print("\tCritical path: %0.2f seconds (%d notebooks); "
+          "achieved speedup %0.2f of at most %0.2f"
+          % (path_time[critical_path[0]], len(critical_path),
+             total_time / wall_time if wall_time > 0 else 1,
+             total_time / path_time[critical_path[0]]
+             if path_time[critical_path[0]] > 0 else 1))
+    for notebook_path in reversed(critical_path):
+        print("\t\t%0.2f s\t%s" % (durations[notebook_path], notebook_path))
+
+
+def build_notebooks(notebook_paths, jobs=1, theory_map=None, **kwargs):
+    '''
+    Build notebooks via a local process pool when jobs > 1 (unless this
+    is a dry run) or via mpi_build otherwise.
+    '''
+    fingerprints = kwargs.get('fingerprints', None)
+    if jobs > 1 and (fingerprints is None or not fingerprints.dry_run):
+        pool_build(notebook_paths, jobs, theory_map,
+                   save_notebook=save_notebooks, **kwargs)
+    else:
+        mpi_build(notebook_paths, **kwargs)
+
+
 def notebook_path_generator(top_level_paths, notebook_filename):
     for path in top_level_paths:
         for theory_path in find_theory_paths(path):
@@ -1047,6 +1865,25 @@ if __name__ == '__main__':
         default="",
         help=("extract (with the same limitations as with --download) "
               "from the specified tar file"))
+    parser.add_argument(
+        '--storage_format',
+        dest='storage_format',
+        type=str,
+        default="",
+        choices=("", "directories", "packed"),
+        help=("convert the __pv_it directories of the theories to the "
+              "given storage format, 'directories' (a unique_rep.pv_it "
+              "file per hash directory) or 'packed' (a single packed "
+              "file per folder), instead of building"))
+    parser.add_argument(
+        '--snapshots',
+        dest='snapshots',
+        action='store_const',
+        const=True,
+        default=False,
+        help=("write the snapshot of each theory for Theory.preload "
+              "instead of building (snapshots are also written after "
+              "building the 'theorems' notebooks)"))
     parser.add_argument(
         '--save_notebooks',
         dest='save_notebooks',
@@ -1136,6 +1973,32 @@ if __name__ == '__main__':
         default=False,
         help=('build expression and proof notebooks, including sub-expressions '
               'and sub-proofs (--essential is disabled)'))
+    parser.add_argument(
+        '--jobs',
+        dest='jobs',
+        type=int,
+        default=1,
+        help=("number of notebooks to execute at once using a local pool "
+              "of kernels (instead of MPI), respecting dependencies between "
+              "notebooks; a critical-path timing summary is reported"))
+    parser.add_argument(
+        '--incremental',
+        dest='incremental',
+        action='store_const',
+        const=True,
+        default=False,
+        help=("only execute notebooks whose code or imported common "
+              "expressions, axioms, theorems, or Python sources changed "
+              "since they were last executed successfully (fingerprints "
+              "are stored in %s)" % FINGERPRINTS_FILENAME))
+    parser.add_argument(
+        '--dry_run',
+        dest='dry_run',
+        action='store_const',
+        const=True,
+        default=False,
+        help=("report the notebooks that an --incremental build would "
+              "execute without executing anything"))
     parser.add_argument('--nolatex', dest='nolatex', action='store_const',
                         const=True, default=False,
                         help='speed execution by skipping LaTeX generation')
@@ -1187,6 +2050,8 @@ if __name__ == '__main__':
         nranks = comm.Get_size()
     except BaseException:
         rank, nranks = 0, 1
+    if args.jobs > 1 and nranks > 1:
+        raise ValueError("Use either --jobs or MPI, not both")
 
     if args.clean:
         # clean all of the __pv_it directories that may be auto-generated
@@ -1211,14 +2076,32 @@ if __name__ == '__main__':
                 else:
                     os.remove(sub_path)
             '''
+    elif args.storage_format != '':
+        # convert the __pv_it directories to the requested format
+        if rank == 0:
+            print("Converting '__pv_it' directories to the '%s' storage "
+                  "format..." % args.storage_format)
+            for theory_path in theory_paths:
+                Theory(theory_path).set_storage_format(args.storage_format)
+    elif args.snapshots:
+        if rank == 0:
+            print("Writing theory snapshots...")
+            for theory_path in theory_paths:
+                Theory(theory_path).write_snapshot()
     elif not args.download and args.tar == '':
         if (args.build_commons or args.build_axioms or args.build_theorems or 
                 args.build_theories or args.build_demos or args.build_theorem_proofs or
                 args.build_dependencies or args.build_expr_and_proofs):
             # Disable --essential if anything more specific is requested.
             args.build_essential = False
+        fingerprints = None
+        if args.dry_run or (args.incremental and not args.noexecute):
+            # A dry run never executes (or exports) anything, even with
+            # --noexecute.
+            fingerprints = NotebookFingerprints(theory_map,
+                                                dry_run=args.dry_run)
         if args.build_commons or args.build_all or args.build_essential:
-            if rank == 0:
+            if rank == 0 and not args.dry_run:
                 # First remove the __pv_it/common/name_to_hash.txt files to make
                 # sure we are using the correct version of the common expressions.
                 for path in paths:
@@ -1230,17 +2113,27 @@ if __name__ == '__main__':
             if nranks > 1:
                 comm.barrier()
 
-            mpi_build(notebook_path_generator(paths, '_theory_nbs_/common.ipynb'),
+            build_notebooks(notebook_path_generator(paths, '_theory_nbs_/common.ipynb'),
                       no_latex=args.nolatex, git_clear=not args.nogitclear,
-                      no_execute=args.noexecute, export_to_html=True)
+                      no_execute=args.noexecute, export_to_html=True,
+                      fingerprints=fingerprints,
+                      jobs=args.jobs, theory_map=theory_map)
         if args.build_axioms or args.build_all or args.build_essential:
-            mpi_build(notebook_path_generator(paths, '_theory_nbs_/axioms.ipynb'),
+            build_notebooks(notebook_path_generator(paths, '_theory_nbs_/axioms.ipynb'),
                       no_latex=args.nolatex, git_clear=not args.nogitclear,
-                      no_execute=args.noexecute, export_to_html=True)
+                      no_execute=args.noexecute, export_to_html=True,
+                      fingerprints=fingerprints,
+                      jobs=args.jobs, theory_map=theory_map)
         if args.build_theorems or args.build_all or args.build_essential:
-            mpi_build(notebook_path_generator(paths, '_theory_nbs_/theorems.ipynb'),
+            build_notebooks(notebook_path_generator(paths, '_theory_nbs_/theorems.ipynb'),
                       no_latex=args.nolatex, git_clear=not args.nogitclear,
-                      no_execute=args.noexecute, export_to_html=True)
+                      no_execute=args.noexecute, export_to_html=True,
+                      fingerprints=fingerprints,
+                      jobs=args.jobs, theory_map=theory_map)
+            if rank == 0 and not args.dry_run and not args.noexecute:
+                # Snapshot the updated theories for Theory.preload.
+                for theory_path in theory_paths:
+                    Theory(theory_path).write_snapshot()
         if (args.build_theories or args.build_axioms or args.build_theorems
                 or args.build_all or args.build_essential):
             # Update the theory after updating axioms/theorems so all the
@@ -1248,9 +2141,11 @@ if __name__ == '__main__':
             # (which should update with updates to theories) and guide.ipynb
             # (because somebody has to).
             theory_nb_gen = notebook_path_generator(paths, '_theory_nbs_/theory.ipynb')
-            mpi_build(itertools.chain(theory_nb_gen, ('index.ipynb', 'guide.ipynb')),
+            build_notebooks(itertools.chain(theory_nb_gen, ('index.ipynb', 'guide.ipynb')),
                       no_latex=args.nolatex, git_clear=not args.nogitclear,
-                      no_execute=args.noexecute, export_to_html=True)
+                      no_execute=args.noexecute, export_to_html=True,
+                      fingerprints=fingerprints,
+                      jobs=args.jobs, theory_map=theory_map)
         if args.build_demos or args.build_all:
             # Build demonstration and 'extra' notebooks.
             def extra_notebook_gen():
@@ -1272,41 +2167,57 @@ if __name__ == '__main__':
             notebook_paths = itertools.chain(
                 notebook_path_generator(paths, '_theory_nbs_/demonstrations.ipynb'),
                 extra_notebook_gen())
-            mpi_build(notebook_paths,
+            build_notebooks(notebook_paths,
                       no_latex=args.nolatex, git_clear=not args.nogitclear,
-                      no_execute=args.noexecute, export_to_html=True)
+                      no_execute=args.noexecute, export_to_html=True,
+                      fingerprints=fingerprints,
+                      jobs=args.jobs, theory_map=theory_map)
                             
         if args.build_theorem_proofs or args.build_all:
-            mpi_build(theoremproof_path_generator(paths),
+            build_notebooks(theoremproof_path_generator(paths),
                       no_latex=args.nolatex, git_clear=not args.nogitclear,
-                      no_execute=args.noexecute, export_to_html=True)
+                      no_execute=args.noexecute, export_to_html=True,
+                      fingerprints=fingerprints,
+                      jobs=args.jobs, theory_map=theory_map)
             # Rebuild the theorem notebooks after the theorem proofs
             # so they will indicate an updated status of theorems.
-            mpi_build(notebook_path_generator(paths, '_theory_nbs_/theorems.ipynb'),
+            build_notebooks(notebook_path_generator(paths, '_theory_nbs_/theorems.ipynb'),
                       no_latex=args.nolatex, git_clear=not args.nogitclear,
-                      no_execute=args.noexecute, export_to_html=True)
+                      no_execute=args.noexecute, export_to_html=True,
+                      fingerprints=fingerprints,
+                      jobs=args.jobs, theory_map=theory_map)
 
         # This seems to be necessary to rerun these after rerunning the
         # theorem notebooks, though it shouldn't be.  Why?
         if args.build_demos or args.build_all:
-            mpi_build(notebook_path_generator(paths, '_theory_nbs_/demonstrations.ipynb'),
+            build_notebooks(notebook_path_generator(paths, '_theory_nbs_/demonstrations.ipynb'),
                       no_latex=args.nolatex, git_clear=not args.nogitclear,
-                      no_execute=args.noexecute, export_to_html=True)
+                      no_execute=args.noexecute, export_to_html=True,
+                      fingerprints=fingerprints,
+                      jobs=args.jobs, theory_map=theory_map)
         if args.build_theorem_proofs or args.build_all:
-            mpi_build(theoremproof_path_generator(paths),
+            build_notebooks(theoremproof_path_generator(paths),
                       no_latex=args.nolatex, git_clear=not args.nogitclear,
-                      no_execute=args.noexecute, export_to_html=True)
+                      no_execute=args.noexecute, export_to_html=True,
+                      fingerprints=fingerprints,
+                      jobs=args.jobs, theory_map=theory_map)
 
 
         if args.build_dependencies or args.build_all:
-            mpi_build(database_notebook_path_generator(paths, ('dependencies',)),
+            build_notebooks(database_notebook_path_generator(paths, ('dependencies',)),
                       no_latex=args.nolatex, git_clear=not args.nogitclear,
-                      no_execute=args.noexecute, export_to_html=True)
+                      no_execute=args.noexecute, export_to_html=True,
+                      fingerprints=fingerprints,
+                      jobs=args.jobs, theory_map=theory_map)
         if args.build_expr_and_proofs or args.build_all:
             filebases = ('expr', 'common_expr', 'axiom_expr', 'theorem_expr', 'proof')
-            mpi_build(database_notebook_path_generator(paths, filebases),
+            build_notebooks(database_notebook_path_generator(paths, filebases),
                       no_latex=args.nolatex, git_clear=False,
-                      no_execute=args.noexecute, export_to_html=True)
+                      no_execute=args.noexecute, export_to_html=True,
+                      fingerprints=fingerprints,
+                      jobs=args.jobs, theory_map=theory_map)
+        if fingerprints is not None and fingerprints.dry_run and rank == 0:
+            print("%d notebooks invalidated" % fingerprints.num_invalidated)
 
 
     tar_file = args.tar
@@ -29,7 +29,8 @@ from ._core_ import (
     UnusableProof, ProofFailure,
     ModusPonensFailure, InstantiationFailure, GeneralizationFailure,
     UnsatisfiedPrerequisites,
-    StyleOptions, maybe_fenced_string, maybe_fenced_latex, maybe_fenced)
+    StyleOptions, maybe_fenced_string, maybe_fenced_latex, maybe_fenced,
+    ProveProfile, SideEffectQueue, KnowledgeRegistry)
 
 # @prover and @equality_prover are useful decorators for many
 # Expression class methods:
@@ -56,7 +57,12 @@ from .relation import (
 # register Prove-It specific IPython magic:
 # %begin_axioms, %end_axioms, %begin_theorems, %end_theorems, %begin_proof, and %display_assignment
 # from . import _core_.magics
-from . import magics
+# IPython is slow to import, so only do this when running in IPython;
+# otherwise, 'magics' is imported upon first access (see below).
+if 'IPython' in sys.modules:
+    from IPython import get_ipython
+    if get_ipython() is not None:
+        from . import magics
 
 # So we can reset back to the basics.
 from .decorators import (_equality_prover_fn_to_tenses,
@@ -84,8 +90,19 @@ def reset():
     _equality_prover_name_to_tenses.clear()
     _equality_prover_name_to_tenses.update(
         _basic_equality_prover_name_to_tenses)
+    magics = sys.modules.get('proveit.magics')
     if hasattr(magics, 'prove_it_magic'):
         magics.prove_it_magic.reset()
+    number_operation = sys.modules.get('proveit.numbers.number_operation')
+    if number_operation is not None:
+        number_operation.NumberOperation.readily_provable_number_sets.clear()
+    transitive_closure = sys.modules.get(
+        'proveit.relation.transitive_closure')
+    if transitive_closure is not None:
+        transitive_closure.TransitiveClosureIndex._clear_()
+    deci = sys.modules.get('proveit.numbers.numerals.decimals.deci')
+    if deci is not None:
+        deci._clear_remembered_facts()
     from proveit._core_._unique_data import clear_unique_data
     clear_unique_data()
     # Regenerate the Theory for this package.
@@ -98,10 +115,42 @@ def reset():
                 isinstance(val, UnsetCommonExpressionPlaceholder)):
             proveit_module.__dict__.pop(key)
 
+def memory_report(collect_garbage=True):
+    '''
+    Return a dictionary reporting the number of entries in the
+    "meaning"/"style" data tables and the expression caches that
+    grow with a Prove-It session.  By default, garbage is collected
+    first so released entries are not counted.
+    '''
+    import gc
+    from ._core_.expression import Expression
+    from ._core_.judgment import Judgment
+    from ._core_._unique_data import unique_data_sizes
+    from ._core_._theory_storage import TheoryFolderStorage
+    from ._core_.proof import Instantiation
+    from ._core_._side_effect_queue import SideEffectQueue
+    from ._core_._knowledge import KnowledgeRegistry
+    if collect_garbage:
+        gc.collect()
+    report = unique_data_sizes()
+    report.update({
+        'labeled_to_canonical_meaning_data': len(
+            Expression.labeled_to_canonical_meaning_data),
+        'expr_to_canonical_form': len(Expression.expr_to_canonical_form),
+        'canonical_form_to_exprs': len(Expression.canonical_form_to_exprs),
+        'expr_to_judgments': len(Judgment.expr_to_judgments),
+        'made_expressions': len(TheoryFolderStorage.made_expressions),
+        'preloaded_unique_reps': len(
+            TheoryFolderStorage.preloaded_unique_reps),
+        'instantiations': len(Instantiation.instantiations),
+        'pending_side_effects': SideEffectQueue.num_pending()})
+    return report
+
 # KEEP THE FOLLOWING IN __init__.py FOR THEORY PACKAGES.
 #  Make additions above, or add to sys.modules[__name__].__dict__ below.
 # This allows us to import common expression, axioms, and theorems of
 # the theory package directly from the package.
 import sys
 from proveit._core_.theory import TheoryPackage
-sys.modules[__name__] = TheoryPackage(__name__, __file__, locals())
+sys.modules[__name__] = TheoryPackage(__name__, __file__, locals(),
+                                      lazy_attrs={'magics': '.magics'})
@@ -26,6 +26,9 @@ from .expression import (
 from .judgment import Judgment, as_expression, as_expressions
 from .defaults import (defaults, USE_DEFAULTS, InvalidAssumptions,
                        SimplificationDirectives)
+from ._profiling import ProveProfile
+from ._side_effect_queue import SideEffectQueue
+from ._knowledge import KnowledgeRegistry
 from .theory import Theory, TheoryException
 from .proof import (Proof, Assumption, Axiom, Theorem, ModusPonens,
                     Deduction, Instantiation, Generalization)
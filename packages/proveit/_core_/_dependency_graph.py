@@ -16,21 +16,34 @@ def ordered_dependency_nodes(root_node, requirements_fn):
     will only depend upon nodes that come later in the list (the root node
     will necessarily come first).
     '''
-    # nodes_with_repeats allows duplicate dependent nodes in a first pass.
-    # Remove the duplicates in a second pass below.
-    queue = [root_node]
-    nodes_with_repeats = []
-    while len(queue) > 0:
-        next_node = queue.pop(0)
-        nodes_with_repeats.append(next_node)
-        queue.extend(requirements_fn(next_node))
-    # Second pass: remove duplicates.  Requirements should always come later
-    # (presenting the graph in a way that guarantees that it is acyclic).
-    visited = set()
-    enumerated_nodes = []
-    for node in reversed(nodes_with_repeats):
-        if node in visited:
-            continue
-        enumerated_nodes.insert(0, node)
-        visited.add(node)
+    # This is the order of the last appearance of each node in a
+    # breadth-first traversal over all paths from the root node: a node
+    # last appears after all of its dependents have appeared.  That is
+    # the order of Kahn's algorithm with a first-in-first-out queue,
+    # which visits each node (and calls requirements_fn) just once
+    # rather than once per path.
+
+    # First pass: collect the requirements of each node and count the
+    # number of times each node is required.
+    requirements = {root_node: tuple(requirements_fn(root_node))}
+    num_dependents = {root_node: 0}
+    discovered = [root_node]
+    for node in discovered:
+        for requirement in requirements[node]:
+            if requirement in num_dependents:
+                num_dependents[requirement] += 1
+            else:
+                num_dependents[requirement] = 1
+                requirements[requirement] = tuple(
+                    requirements_fn(requirement))
+                discovered.append(requirement)
+
+    # Second pass: a node is enumerated once its last dependent has
+    # been enumerated.
+    enumerated_nodes = [root_node]
+    for node in enumerated_nodes:
+        for requirement in requirements[node]:
+            num_dependents[requirement] -= 1
+            if num_dependents[requirement] == 0:
+                enumerated_nodes.append(requirement)
     return enumerated_nodes
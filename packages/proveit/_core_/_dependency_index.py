@@ -0,0 +1,589 @@
+'''
+An indexed store of the dependencies among stored axioms and theorems.
+
+The __pv_it folders record which axioms/theorems each proven theorem
+uses (used_axioms.txt, used_theorems.txt, and used_by folders) and
+whether its proof is complete (empty 'complete' files).  Walking these
+one theorem at a time is slow for library-wide queries, so the same
+information is mirrored in an SQLite database per root theory
+(__pv_it/dependency_index.db).  It is maintained by
+StoredTheorem._recordProof and StoredTheorem.remove_proof (which also
+write and remove the 'complete' files through it), and is rebuilt from
+the __pv_it folders if it is missing.
+
+The __pv_it files remain the authority: they may change without going
+through this index (e.g., via a 'git pull' or from another checkout).
+A stamp of each theorem's files (their modification times and sizes)
+is stored with its entries and updated in the same transaction as any
+write to them.  The first time a theory is touched by a query in a
+process (or all theories, for queries of dependents), the theorems
+whose stamps no longer match are re-indexed from their files.
+
+Statements are identified by their full names (theory.name).  The
+uses of a theorem are indexed under the root theory of that theorem.
+'''
+
+import hashlib
+import os
+import sqlite3
+
+# Increment when the schema changes to force a rebuild.
+SCHEMA_VERSION = 3
+
+INDEX_FILENAME = 'dependency_index.db'
+
+# The files of a theorem's __pv_it folder that the index mirrors.
+_SOURCE_FILENAMES = ('proof.pv_it', 'used_axioms.txt', 'used_theorems.txt',
+                     'eliminated_axioms.txt', 'eliminated_theorems.txt',
+                     'complete')
+
+_SCHEMA = '''
+CREATE TABLE IF NOT EXISTS meta (
+    key TEXT PRIMARY KEY, value TEXT);
+CREATE TABLE IF NOT EXISTS proven (
+    theorem TEXT PRIMARY KEY, theory TEXT NOT NULL,
+    complete INTEGER NOT NULL DEFAULT 0);
+CREATE INDEX IF NOT EXISTS proven_by_theory ON proven (theory);
+CREATE TABLE IF NOT EXISTS theorem_stamps (
+    theorem TEXT PRIMARY KEY, theory TEXT NOT NULL, stamp TEXT NOT NULL);
+CREATE INDEX IF NOT EXISTS theorem_stamps_by_theory
+    ON theorem_stamps (theory);
+CREATE TABLE IF NOT EXISTS uses (
+    theorem TEXT NOT NULL, used TEXT NOT NULL, kind TEXT NOT NULL,
+    PRIMARY KEY (theorem, kind, used));
+CREATE INDEX IF NOT EXISTS uses_by_used ON uses (used);
+CREATE TABLE IF NOT EXISTS eliminated (
+    theorem TEXT NOT NULL, name TEXT NOT NULL, kind TEXT NOT NULL,
+    PRIMARY KEY (theorem, kind, name));
+'''
+
+
+class DependencyIndex:
+    '''
+    The dependency index of one root theory.  Use
+    DependencyIndex.of_root(root_name) or DependencyIndex.of_stmt(name)
+    to obtain it.
+    '''
+
+    # Map root theory directories to DependencyIndex objects.
+    _indices = dict()
+
+    @staticmethod
+    def _clear_():
+        for index in DependencyIndex._indices.values():
+            index.close()
+        DependencyIndex._indices.clear()
+
+    @staticmethod
+    def of_root(root_name):
+        '''
+        Return the DependencyIndex of the root theory with the given
+        name.
+        '''
+        from .theory import Theory, TheoryException
+        if root_name not in Theory._rootTheoryPaths:
+            raise TheoryException("Theory root '%s' is unknown" % root_name)
+        directory = Theory._rootTheoryPaths[root_name]
+        index = DependencyIndex._indices.get(directory)
+        if index is None:
+            index = DependencyIndex(root_name, directory)
+            DependencyIndex._indices[directory] = index
+        return index
+
+    @staticmethod
+    def of_stmt(full_name):
+        '''
+        Return the DependencyIndex of the root theory of the axiom or
+        theorem with the given full name.
+        '''
+        return DependencyIndex.of_root(full_name.split('.', 1)[0])
+
+    @staticmethod
+    def _group_by_root(names):
+        '''
+        Map DependencyIndex objects to the subset of the given names
+        of statements in their root theories.
+        '''
+        index_to_names = dict()
+        for name in names:
+            index_to_names.setdefault(DependencyIndex.of_stmt(name),
+                                      []).append(name)
+        return index_to_names
+
+    @staticmethod
+    def _known_indices():
+        '''
+        Yield the DependencyIndex of each known root theory.  These
+        are where the dependents of a statement may be indexed.
+        '''
+        from .theory import Theory
+        for root_name in list(Theory._rootTheoryPaths.keys()):
+            yield DependencyIndex.of_root(root_name)
+
+    def __init__(self, root_name, directory):
+        self.root_name = root_name
+        self.directory = directory
+        self.filename = os.path.join(directory, '__pv_it', INDEX_FILENAME)
+        self._connection = None
+        # Names of the theories validated against their files in this
+        # process (see _validate), and whether all of them were.
+        self._validated = set()
+        self._all_validated = False
+
+    def close(self):
+        if self._connection is not None:
+            self._connection.close()
+            self._connection = None
+
+    def _connect(self):
+        '''
+        Return the database connection, creating the database (and
+        building it from the __pv_it folders) as needed.
+        '''
+        if self._connection is not None:
+            return self._connection
+        # Autocommit mode; writes are grouped in explicit transactions.
+        connection = sqlite3.connect(self.filename, timeout=60,
+                                     isolation_level=None)
+        self._connection = connection
+        if self._schema_version() != SCHEMA_VERSION:
+            self.rebuild(only_if_needed=True)
+        return connection
+
+    def _schema_version(self):
+        try:
+            row = self._connection.execute(
+                "SELECT value FROM meta WHERE key = 'schema_version'"
+            ).fetchone()
+        except sqlite3.OperationalError:
+            return None # no meta table yet
+        return None if row is None else int(row[0])
+
+    def _theory(self, theory_name):
+        '''
+        Return the Theory of this root theory with the given name, or
+        None if it no longer exists.
+        '''
+        from .theory import Theory
+        path = os.path.join(self.directory, *theory_name.split('.')[1:])
+        if not os.path.isdir(path):
+            return None
+        return Theory(path)
+
+    def _theories(self):
+        '''
+        Return the theories of this root theory.
+        '''
+        from .theory import Theory
+        theories = []
+        to_process = [Theory.get_theory(self.root_name)]
+        while len(to_process) > 0:
+            theory = to_process.pop()
+            theories.append(theory)
+            to_process.extend(theory.generate_sub_theories())
+        return theories
+
+    def _transaction(self):
+        return _Transaction(self._connection)
+
+    def rebuild(self, only_if_needed=False):
+        '''
+        Rebuild the index from the used_axioms.txt, used_theorems.txt,
+        eliminated_*.txt and 'complete' files of the theorems of each
+        theory in this root theory.  If only_if_needed is True, skip
+        this if the index has already been built (e.g., by another
+        process).
+        '''
+        connection = self._connection
+        if connection is None:
+            # Connecting builds the index if needed.
+            self._connect()
+            if only_if_needed:
+                return
+            connection = self._connection
+        from ._theory_storage import StoredTheorem
+        theories = self._theories()
+        with self._transaction():
+            if only_if_needed and self._schema_version() == SCHEMA_VERSION:
+                return  # another process beat us to it
+            # Recreate the tables in case the schema changed.
+            for table in ('meta', 'proven', 'uses', 'eliminated',
+                          'theory_stamps', 'theorem_stamps'):
+                connection.execute('DROP TABLE IF EXISTS %s' % table)
+            for statement in _SCHEMA.split(';'):
+                if statement.strip() != '':
+                    connection.execute(statement)
+            for theory in theories:
+                for name in theory.get_theorem_names():
+                    self._index_theorem(StoredTheorem(theory, name))
+            connection.execute(
+                "INSERT OR REPLACE INTO meta (key, value) "
+                "VALUES ('schema_version', ?)", (str(SCHEMA_VERSION),))
+        self._validated.update(theory.name for theory in theories)
+        self._all_validated = True
+
+    def _validate(self, theory_names):
+        '''
+        The first time each of the given theories (names) is used in
+        this process, re-index its theorems whose files have changed
+        (or that were added or removed) since they were indexed.
+        '''
+        from ._theory_storage import StoredTheorem
+        connection = self._connect()
+        for theory_name in theory_names:
+            if theory_name in self._validated:
+                continue
+            self._validated.add(theory_name)
+            indexed_stamps = dict(connection.execute(
+                "SELECT theorem, stamp FROM theorem_stamps "
+                "WHERE theory = ?", (theory_name,)))
+            theory = self._theory(theory_name)
+            changed = []
+            if theory is not None:
+                for name in theory.get_theorem_names():
+                    stored_theorem = StoredTheorem(theory, name)
+                    stamp = _theorem_stamp(stored_theorem)
+                    if indexed_stamps.pop(str(stored_theorem),
+                                          None) != stamp:
+                        changed.append(stored_theorem)
+            if len(changed) == 0 and len(indexed_stamps) == 0:
+                continue
+            with self._transaction():
+                for stored_theorem in changed:
+                    self._index_theorem(stored_theorem)
+                for theorem in indexed_stamps:
+                    # This theorem no longer exists.
+                    self._delete_proof(theorem)
+                    connection.execute(
+                        "DELETE FROM theorem_stamps WHERE theorem = ?",
+                        (theorem,))
+
+    def _validate_all(self):
+        '''
+        Validate all of the theories of this root theory (see
+        _validate), including ones that no longer exist.
+        '''
+        if self._all_validated:
+            return
+        connection = self._connect()
+        theory_names = {theory.name for theory in self._theories()}
+        theory_names.update(row[0] for row in connection.execute(
+            "SELECT DISTINCT theory FROM theorem_stamps"))
+        self._validate(theory_names)
+        self._all_validated = True
+
+    def _validate_stmts(self, names):
+        '''
+        Validate the theories of the given statements (full names).
+        '''
+        self._validate({name.rsplit('.', 1)[0] for name in names})
+
+    def _index_theorem(self, stored_theorem):
+        '''
+        Replace the index entries of the given StoredTheorem with those
+        read from its __pv_it folder, along with its stamp.
+        '''
+        theorem = str(stored_theorem)
+        self._delete_proof(theorem)
+        if stored_theorem.has_proof():
+            self._insert_proof(
+                theorem,
+                stored_theorem.read_used_axioms(),
+                stored_theorem.read_used_theorems(),
+                stored_theorem.read_eliminated_axioms(),
+                stored_theorem.read_eliminated_theorems(),
+                complete=stored_theorem.is_complete())
+        self._connection.execute(
+            "INSERT OR REPLACE INTO theorem_stamps (theorem, theory, stamp) "
+            "VALUES (?, ?, ?)", (theorem, stored_theorem.theory.name,
+                                 _theorem_stamp(stored_theorem)))
+
+    def _stamp(self, theorems):
+        '''
+        Record the current stamps of the files of the given theorems
+        (full names) of this root theory.  Called within the
+        transaction that updates their entries, after their files have
+        been written.
+        '''
+        from .theory import Theory, TheoryException
+        for theorem in theorems:
+            try:
+                stored_theorem = Theory.get_stored_theorem(theorem)
+            except (KeyError, TheoryException):
+                continue # the theorem was removed
+            self._connection.execute(
+                "INSERT OR REPLACE INTO theorem_stamps "
+                "(theorem, theory, stamp) VALUES (?, ?, ?)",
+                (theorem, theorem.rsplit('.', 1)[0],
+                 _theorem_stamp(stored_theorem)))
+
+    def _insert_proof(self, theorem, used_axioms, used_theorems,
+                      eliminated_axioms, eliminated_theorems,
+                      complete=False):
+        connection = self._connection
+        connection.execute(
+            "INSERT OR REPLACE INTO proven (theorem, theory, complete) "
+            "VALUES (?, ?, ?)",
+            (theorem, theorem.rsplit('.', 1)[0], int(complete)))
+        for kind, names in (('axiom', used_axioms),
+                            ('theorem', used_theorems)):
+            connection.executemany(
+                "INSERT OR IGNORE INTO uses (theorem, used, kind) "
+                "VALUES (?, ?, ?)", [(theorem, name, kind) for name in names])
+        for kind, names in (('axiom', eliminated_axioms),
+                            ('theorem', eliminated_theorems)):
+            connection.executemany(
+                "INSERT OR IGNORE INTO eliminated (theorem, name, kind) "
+                "VALUES (?, ?, ?)", [(theorem, name, kind) for name in names])
+
+    def _delete_proof(self, theorem):
+        connection = self._connection
+        for table in ('proven', 'uses', 'eliminated'):
+            connection.execute('DELETE FROM %s WHERE theorem = ?' % table,
+                               (theorem,))
+
+    def record_proof(self, theorem, used_axioms, used_theorems,
+                     eliminated_axioms=(), eliminated_theorems=()):
+        '''
+        Record the axioms and theorems (full names) used by the proof
+        of the given theorem (full name) of this root theory, replacing
+        any previous record.  Returns the names of the theorems that
+        are newly complete as a result (see propagate_completion).
+        The files of the proof must already be written.
+        '''
+        self._validate_stmts([theorem])
+        with self._transaction():
+            self._delete_proof(theorem)
+            self._insert_proof(theorem, used_axioms, used_theorems,
+                               eliminated_axioms, eliminated_theorems)
+            self._stamp([theorem])
+        return DependencyIndex.propagate_completion(theorem)
+
+    def remove_proof(self, stored_theorem):
+        '''
+        Remove the record of the proof of the given StoredTheorem of
+        this root theory along with its proof files (see
+        StoredTheorem._remove_proof_files).  Returns the names of the
+        theorems that were complete but are no longer complete as a
+        result (the theorem and its direct/indirect dependents), whose
+        'complete' files are removed.
+        '''
+        theorem = str(stored_theorem)
+        self._validate_stmts([theorem])
+        was_complete = self.is_complete(theorem)
+        with self._transaction():
+            self._delete_proof(theorem)
+            stored_theorem._remove_proof_files()
+            self._stamp([theorem])
+        if not was_complete:
+            return []
+        no_longer_complete = [theorem]
+        for index, names in DependencyIndex._group_by_root(
+                DependencyIndex.all_dependents(theorem)).items():
+            no_longer_complete.extend(index._mark_incomplete(names))
+        return no_longer_complete
+
+    def _mark_incomplete(self, theorems):
+        '''
+        Mark the given theorems of this root theory as incomplete
+        (removing their 'complete' files), returning those that were
+        complete.
+        '''
+        from ._theory_storage import StoredTheorem
+        self._validate_stmts(theorems)
+        with self._transaction():
+            complete = self._select_complete(theorems)
+            self._connection.executemany(
+                "UPDATE proven SET complete = 0 WHERE theorem = ?",
+                [(name,) for name in complete])
+            StoredTheorem._mark_completions(complete, False)
+            self._stamp(complete)
+        return complete
+
+    def _select_complete(self, theorems):
+        '''
+        Return the given theorems of this root theory that are
+        complete.
+        '''
+        complete = []
+        for name in theorems:
+            row = self._connection.execute(
+                "SELECT complete FROM proven WHERE theorem = ?",
+                (name,)).fetchone()
+            if row is not None and row[0]:
+                complete.append(name)
+        return complete
+
+    def has_proof(self, theorem):
+        '''
+        Return True iff a proof of the given theorem of this root
+        theory is recorded.
+        '''
+        self._validate_stmts([theorem])
+        return self._connection.execute(
+            "SELECT 1 FROM proven WHERE theorem = ?",
+            (theorem,)).fetchone() is not None
+
+    def is_complete(self, theorem):
+        '''
+        Return True iff the given theorem of this root theory has a
+        complete proof.
+        '''
+        self._validate_stmts([theorem])
+        return len(self._select_complete([theorem])) == 1
+
+    def theorem_info(self, theorem):
+        '''
+        Return (has_proof, used axioms, used theorems, eliminated
+        axioms, eliminated theorems) of the given theorem of this
+        root theory.  The statements are sorted lists of full names.
+        '''
+        has_proof = self.has_proof(theorem)
+        connection = self._connection
+        used = {'axiom': [], 'theorem': []}
+        for name, kind in connection.execute(
+                "SELECT used, kind FROM uses WHERE theorem = ? "
+                "ORDER BY used", (theorem,)):
+            used[kind].append(name)
+        eliminated = {'axiom': [], 'theorem': []}
+        for name, kind in connection.execute(
+                "SELECT name, kind FROM eliminated WHERE theorem = ? "
+                "ORDER BY name", (theorem,)):
+            eliminated[kind].append(name)
+        return (has_proof, used['axiom'], used['theorem'],
+                eliminated['axiom'], eliminated['theorem'])
+
+    def _direct_dependents(self, names):
+        '''
+        Return the theorems of this root theory that directly use any
+        of the given statements.
+        '''
+        self._validate_all()
+        connection = self._connection
+        dependents = set()
+        for name in names:
+            dependents.update(row[0] for row in connection.execute(
+                "SELECT theorem FROM uses WHERE used = ?", (name,)))
+        return dependents
+
+    def _dependents_closure(self, names):
+        '''
+        Return the theorems of this root theory that use any of the
+        given statements directly or indirectly (via theorems of this
+        root theory).
+        '''
+        self._validate_all()
+        connection = self._connection
+        dependents = set()
+        for name in names:
+            dependents.update(row[0] for row in connection.execute(
+                "WITH RECURSIVE dependents(name) AS ("
+                "  SELECT theorem FROM uses WHERE used = ?"
+                "  UNION"
+                "  SELECT uses.theorem FROM uses JOIN dependents"
+                "    ON uses.used = dependents.name"
+                ") SELECT name FROM dependents", (name,)))
+        return dependents
+
+    @staticmethod
+    def direct_dependents(name):
+        '''
+        Return the set of theorems (full names) that directly use the
+        axiom or theorem with the given full name.
+        '''
+        dependents = set()
+        for index in DependencyIndex._known_indices():
+            dependents.update(index._direct_dependents([name]))
+        return dependents
+
+    @staticmethod
+    def all_dependents(name):
+        '''
+        Return the set of theorems (full names) that use the axiom or
+        theorem with the given full name directly or indirectly.
+        '''
+        indices = list(DependencyIndex._known_indices())
+        dependents = set()
+        to_process = {name}
+        while len(to_process) > 0:
+            new_dependents = set()
+            for index in indices:
+                new_dependents.update(index._dependents_closure(to_process))
+            # Dependents in other root theories are followed in the
+            # next round.
+            to_process = new_dependents - dependents
+            dependents.update(new_dependents)
+        return dependents
+
+    @staticmethod
+    def propagate_completion(theorem):
+        '''
+        Mark the given theorem (full name) as complete if it has a proof
+        and all of the theorems it uses are complete, and propagate
+        this to its dependents that may become complete as a result.
+        Returns the names of the theorems that are newly complete, whose
+        'complete' files are written.
+        '''
+        from ._theory_storage import StoredTheorem
+        newly_complete = []
+        to_check = [theorem]
+        while len(to_check) > 0:
+            name = to_check.pop()
+            index = DependencyIndex.of_stmt(name)
+            has_proof, _, used_theorems, _, _ = index.theorem_info(name)
+            if not has_proof or index.is_complete(name):
+                continue
+            if not all(DependencyIndex.of_stmt(used).is_complete(used)
+                       for used in used_theorems):
+                continue
+            with index._transaction():
+                index._connection.execute(
+                    "UPDATE proven SET complete = 1 WHERE theorem = ?",
+                    (name,))
+                StoredTheorem._mark_completions([name], True)
+                index._stamp([name])
+            newly_complete.append(name)
+            to_check.extend(DependencyIndex.direct_dependents(name))
+        return newly_complete
+
+
+def _theorem_stamp(stored_theorem):
+    '''
+    Return a digest of the modification times and sizes of the indexed
+    files of the given StoredTheorem.
+    '''
+    digest = hashlib.blake2b(digest_size=16)
+    for filename in _SOURCE_FILENAMES:
+        try:
+            stat = os.stat(os.path.join(stored_theorem.path, filename))
+        except OSError:
+            digest.update(b'-')
+            continue
+        digest.update(('%s:%d:%d' % (filename, stat.st_mtime_ns,
+                                     stat.st_size)).encode('utf-8'))
+    return digest.hexdigest()
+
+
+class _Transaction:
+    '''
+    Context manager for a write transaction that takes the database
+    lock up front (so concurrent builds wait rather than fail).
+    Nested uses join the outer transaction.
+    '''
+
+    def __init__(self, connection):
+        self.connection = connection
+
+    def __enter__(self):
+        self.nested = self.connection.in_transaction
+        if not self.nested:
+            self.connection.execute('BEGIN IMMEDIATE')
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        if self.nested:
+            return
+        if exc_type is None:
+            self.connection.execute('COMMIT')
+        else:
+            self.connection.execute('ROLLBACK')
@@ -0,0 +1,139 @@
+'''
+A central record of when proven facts become known.  Every new proof
+records its judgment here (after the expression-specific
+_record_as_proven bookkeeping such as Equals.known_equalities or
+InClass.known_memberships), which advances a monotonically increasing
+epoch:
+    * KnowledgeRegistry.epoch advances with every recorded fact and
+      with any other change that may affect what is provable (e.g.,
+      enabling a proof or changing simplification directives; see
+      Expression._forget_failed_attempts).  It is the one epoch that
+      provability caches (failed attempts, remembered instantiations)
+      are validated against.
+    * KnowledgeRegistry.advanced_epoch is the epoch of the last such
+      change other than a recorded fact (see KnowledgeRegistry.advance).
+    * KnowledgeRegistry.class_epoch(SomeClass) is the epoch when a fact
+      that is an instance of SomeClass (e.g., InClass, Equals, or
+      TransitiveRelation) was last recorded.
+A cache of results that only depend upon certain kinds of facts can
+store the relevant epochs along with each result and validate it in
+O(1) by comparing them.  Alternatively, KnowledgeRegistry.subscribe
+registers a callback to be called with each newly recorded judgment
+(optionally restricted to a class of facts).
+'''
+
+from collections import defaultdict
+
+
+class KnowledgeRegistry:
+    '''
+    Epochs and subscriptions for recorded facts, as class-level state.
+    '''
+
+    # Advanced with each recorded fact, with other changes to what is
+    # provable, and when Prove-It is reset.  It never goes backward,
+    # so stale epochs are never mistaken for current ones.
+    epoch = 0
+
+    # The epoch of the last change to what is provable other than a
+    # recorded fact (see advance), or of the last reset.
+    advanced_epoch = 0
+
+    # Map Expression classes to the epoch when a fact of that class
+    # was last recorded.
+    _class_epochs = dict()
+
+    # The epoch when the known facts were last cleared: the epoch of
+    # a class without a fact recorded since then.
+    _cleared_epoch = 0
+
+    # Map each type of fact to the Expression classes in its method
+    # resolution order.
+    _expr_classes = dict()
+
+    # Map Expression classes (or None for all facts) to lists of
+    # callbacks.
+    _subscribers = defaultdict(list)
+
+    @staticmethod
+    def _clear_():
+        '''
+        Forget the per-class epochs when the known facts are cleared,
+        advancing the epoch (and every class epoch along with it) so
+        that everything recorded before is invalidated.  Subscriptions
+        are kept.
+        '''
+        KnowledgeRegistry.epoch += 1
+        KnowledgeRegistry._cleared_epoch = KnowledgeRegistry.epoch
+        KnowledgeRegistry.advanced_epoch = KnowledgeRegistry.epoch
+        KnowledgeRegistry._class_epochs.clear()
+
+    @staticmethod
+    def advance():
+        '''
+        Advance the epoch for a change that may affect what is
+        provable other than a newly recorded fact.
+        '''
+        KnowledgeRegistry.epoch += 1
+        KnowledgeRegistry.advanced_epoch = KnowledgeRegistry.epoch
+
+    @staticmethod
+    def record(judgment):
+        '''
+        Record the newly proven judgment, advancing the epochs of its
+        expression classes and notifying subscribers.  Called for each
+        new Proof.
+        '''
+        from .expression.expr import Expression
+        KnowledgeRegistry.epoch += 1
+        epoch = KnowledgeRegistry.epoch
+        expr = judgment.expr
+        expr_classes = KnowledgeRegistry._expr_classes.get(type(expr))
+        if expr_classes is None:
+            expr_classes = tuple(cls for cls in type(expr).__mro__
+                                 if issubclass(cls, Expression))
+            KnowledgeRegistry._expr_classes[type(expr)] = expr_classes
+        class_epochs = KnowledgeRegistry._class_epochs
+        for cls in expr_classes:
+            class_epochs[cls] = epoch
+        subscribers = KnowledgeRegistry._subscribers
+        if len(subscribers) > 0:
+            for callback in subscribers.get(None, ()):
+                callback(judgment)
+            for cls in expr_classes:
+                for callback in subscribers.get(cls, ()):
+                    callback(judgment)
+
+    @staticmethod
+    def class_epoch(expr_class):
+        '''
+        Return the epoch when a fact that is an instance of the given
+        Expression class was last recorded (or when the known facts
+        were last cleared if none was recorded since).
+        '''
+        return KnowledgeRegistry._class_epochs.get(
+            expr_class, KnowledgeRegistry._cleared_epoch)
+
+    @staticmethod
+    def subscribe(callback, expr_class=None):
+        '''
+        Call callback(judgment) whenever a new fact is recorded that is
+        an instance of the given Expression class (or any fact if
+        expr_class is None).  Return the callback (for unsubscribe).
+        '''
+        KnowledgeRegistry._subscribers[expr_class].append(callback)
+        return callback
+
+    @staticmethod
+    def unsubscribe(callback, expr_class=None):
+        '''
+        Stop calling the callback that was subscribed for the given
+        Expression class.
+        '''
+        callbacks = KnowledgeRegistry._subscribers.get(expr_class)
+        if callbacks is None or callback not in callbacks:
+            raise ValueError("%s is not subscribed for %s"
+                             % (callback, expr_class))
+        callbacks.remove(callback)
+        if len(callbacks) == 0:
+            del KnowledgeRegistry._subscribers[expr_class]
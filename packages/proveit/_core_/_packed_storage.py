@@ -0,0 +1,294 @@
+'''
+An alternative to storing each 'unique_rep.pv_it' file in its own
+hash directory of a __pv_it folder.  With the 'packed' storage
+format, all of the unique representations of a folder are appended to
+a single 'unique_reps.pack' file with a 'unique_reps.idx' file that
+maps each hash id to an (offset, length) entry of the pack.  The pack
+is read via mmap so that retrieving a unique representation is a
+dictionary lookup plus a slice.
+
+The pack and the index are append-only (except when compacted via
+'clean') so that concurrent readers never see a partially written
+record: a record is written to the pack before its index entry and
+an index entry is only trusted if it lies within the pack.  Appending
+and compacting hold an exclusive lock on the pack.
+'''
+
+import os
+import mmap
+
+DIRECTORIES_FORMAT = 'directories'
+PACKED_FORMAT = 'packed'
+STORAGE_FORMATS = (DIRECTORIES_FORMAT, PACKED_FORMAT)
+
+# Name of the file, within a __pv_it directory, that indicates the
+# storage format of the theory.  When absent, the format of the root
+# theory is used (or 'directories' for a root theory).
+STORAGE_FORMAT_FILENAME = 'storage_format.txt'
+
+PACK_FILENAME = 'unique_reps.pack'
+INDEX_FILENAME = 'unique_reps.idx'
+
+try:
+    import fcntl
+except ImportError:
+    fcntl = None  # No file locking (e.g., on Windows).
+
+
+class PackedUniqueReps:
+    '''
+    Manages the 'unique_reps.pack' and 'unique_reps.idx' files of
+    one folder of a __pv_it directory.
+    '''
+
+    def __init__(self, path):
+        self.path = path
+        self.pack_filename = os.path.join(path, PACK_FILENAME)
+        self.index_filename = os.path.join(path, INDEX_FILENAME)
+        # Map hash ids to (offset, length) of the pack.
+        self._index = dict()
+        # Number of bytes of the index file that have been read.
+        self._index_pos = 0
+        self._pack_file = None
+        self._mmap = None
+
+    def __contains__(self, hash_id):
+        return self.read(hash_id) is not None
+
+    def hash_ids(self):
+        '''
+        Return the hash ids of all of the stored unique
+        representations.
+        '''
+        self._refresh_index()
+        return list(self._index.keys())
+
+    def read(self, hash_id):
+        '''
+        Return the unique representation string stored for the given
+        hash id, or None if there is no such entry.
+        '''
+        entry = self._index.get(hash_id)
+        if entry is None:
+            # Another process may have appended to the pack.
+            self._refresh_index()
+            entry = self._index.get(hash_id)
+            if entry is None:
+                return None
+        offset, length = entry
+        data = self._mapped(offset + length)
+        if data is None:
+            return None
+        return data[offset:offset + length].decode('utf-8')
+
+    def append(self, hash_id, unique_rep):
+        '''
+        Append the unique representation for the given hash id to
+        the pack and record its index entry.
+        '''
+        encoded = unique_rep.encode('utf-8')
+        with self._locked_pack() as pack_file:
+            pack_file.seek(0, os.SEEK_END)
+            offset = pack_file.tell()
+            pack_file.write(encoded)
+            pack_file.flush()
+            # Write the index entry with a single write so
+            # readers never see a partial line.
+            with open(self.index_filename, 'a') as index_file:
+                index_file.write('%s %d %d\n' % (hash_id, offset,
+                                                 len(encoded)))
+        self._index[hash_id] = (offset, len(encoded))
+
+    def compact(self, hash_ids_to_keep):
+        '''
+        Rewrite the pack and index, keeping only the entries of the
+        given hash ids.  The pack stays locked throughout so that no
+        entry appended meanwhile is lost.
+        '''
+        with self._locked_pack():
+            self._refresh_index()
+            kept = [(hash_id, self.read(hash_id)) for hash_id
+                    in self._index.keys() if hash_id in hash_ids_to_keep]
+            self.close()
+            tmp_pack_filename = self.pack_filename + '.tmp'
+            tmp_index_filename = self.index_filename + '.tmp'
+            offset = 0
+            index = dict()
+            with open(tmp_pack_filename, 'wb') as pack_file, \
+                    open(tmp_index_filename, 'w') as index_file:
+                for hash_id, unique_rep in kept:
+                    encoded = unique_rep.encode('utf-8')
+                    pack_file.write(encoded)
+                    index_file.write('%s %d %d\n' % (hash_id, offset,
+                                                     len(encoded)))
+                    index[hash_id] = (offset, len(encoded))
+                    offset += len(encoded)
+            # Remove the old index first so that it is never paired
+            # with the new pack.
+            if os.path.isfile(self.index_filename):
+                os.remove(self.index_filename)
+            os.replace(tmp_pack_filename, self.pack_filename)
+            os.replace(tmp_index_filename, self.index_filename)
+            self._index = index
+            self._index_pos = os.path.getsize(self.index_filename)
+
+    def _locked_pack(self):
+        '''
+        Open the pack for appending, holding an exclusive lock on it
+        until the returned file is closed.  If the pack was replaced
+        (compacted) while waiting for the lock, lock the new one.
+        '''
+        if not os.path.isdir(self.path):
+            os.makedirs(self.path, exist_ok=True)
+        while True:
+            pack_file = open(self.pack_filename, 'ab')
+            if fcntl is None:
+                return pack_file
+            fcntl.flock(pack_file, fcntl.LOCK_EX)
+            try:
+                if (os.fstat(pack_file.fileno()).st_ino ==
+                        os.stat(self.pack_filename).st_ino):
+                    return pack_file
+            except FileNotFoundError:
+                pass
+            pack_file.close() # releases the lock
+
+    def close(self):
+        '''
+        Release the memory map and file handle of the pack.
+        '''
+        if self._mmap is not None:
+            self._mmap.close()
+            self._mmap = None
+        if self._pack_file is not None:
+            self._pack_file.close()
+            self._pack_file = None
+        self._index.clear()
+        self._index_pos = 0
+
+    def _refresh_index(self):
+        '''
+        Read any index entries that were appended since the last
+        read.
+        '''
+        if not os.path.isfile(self.index_filename):
+            return
+        with open(self.index_filename, 'r') as index_file:
+            if index_file.seek(0, os.SEEK_END) < self._index_pos:
+                # The index was compacted by another process.
+                self.close()
+            index_file.seek(self._index_pos)
+            for line in index_file:
+                if not line.endswith('\n'):
+                    break  # partially written; get it next time
+                hash_id, offset, length = line.split()
+                self._index[hash_id] = (int(offset), int(length))
+                self._index_pos += len(line)
+
+    def _mapped(self, min_size):
+        '''
+        Return the memory map of the pack, remapping it if it is
+        smaller than 'min_size' bytes (the pack may have grown).
+        Return None if the pack is not that large.
+        '''
+        if self._mmap is not None and len(self._mmap) >= min_size:
+            return self._mmap
+        if not os.path.isfile(self.pack_filename):
+            return None
+        if os.path.getsize(self.pack_filename) < min_size:
+            return None
+        if self._mmap is not None:
+            self._mmap.close()
+        if self._pack_file is not None:
+            self._pack_file.close()
+        self._pack_file = open(self.pack_filename, 'rb')
+        self._mmap = mmap.mmap(self._pack_file.fileno(), 0,
+                               access=mmap.ACCESS_READ)
+        return self._mmap
+
+
+def read_storage_format(pv_it_dir):
+    '''
+    Return the storage format recorded in the given __pv_it
+    directory, or None if it is not recorded.
+    '''
+    filename = os.path.join(pv_it_dir, STORAGE_FORMAT_FILENAME)
+    if not os.path.isfile(filename):
+        return None
+    with open(filename, 'r') as f:
+        storage_format = f.read().strip()
+    if storage_format not in STORAGE_FORMATS:
+        raise ValueError("Unknown storage format, '%s', in %s"
+                         % (storage_format, filename))
+    return storage_format
+
+
+def write_storage_format(pv_it_dir, storage_format):
+    '''
+    Record the storage format in the given __pv_it directory.
+    '''
+    if storage_format not in STORAGE_FORMATS:
+        raise ValueError("'storage_format' must be one of %s"
+                         % str(STORAGE_FORMATS))
+    with open(os.path.join(pv_it_dir, STORAGE_FORMAT_FILENAME), 'w') as f:
+        f.write(storage_format + '\n')
+
+
+def migrate_folder(folder_path, storage_format):
+    '''
+    Convert one folder of a __pv_it directory to the given storage
+    format, moving 'unique_rep.pv_it' files into the pack or out of
+    it.  Hash directories that become empty are removed.  Return the
+    number of unique representations that were moved.
+    '''
+    packed = PackedUniqueReps(folder_path)
+    count = 0
+    if storage_format == PACKED_FORMAT:
+        for hash_id in sorted(os.listdir(folder_path)):
+            hash_path = os.path.join(folder_path, hash_id)
+            unique_rep_filename = os.path.join(hash_path, 'unique_rep.pv_it')
+            if not os.path.isfile(unique_rep_filename):
+                continue
+            with open(unique_rep_filename, 'r') as f:
+                unique_rep = f.read()
+            if packed.read(hash_id) is None:
+                packed.append(hash_id, unique_rep)
+            os.remove(unique_rep_filename)
+            if len(os.listdir(hash_path)) == 0:
+                os.rmdir(hash_path)
+            count += 1
+    else:
+        for hash_id in packed.hash_ids():
+            hash_path = os.path.join(folder_path, hash_id)
+            os.makedirs(hash_path, exist_ok=True)
+            with open(os.path.join(hash_path, 'unique_rep.pv_it'),
+                      'w') as f:
+                f.write(packed.read(hash_id))
+            count += 1
+        packed.close()
+        for filename in (packed.pack_filename, packed.index_filename):
+            if os.path.isfile(filename):
+                os.remove(filename)
+    packed.close()
+    return count
+
+
+def migrate_pv_it_dir(pv_it_dir, storage_format):
+    '''
+    Convert every folder of the given __pv_it directory to the
+    given storage format and record the format.  Return the number
+    of unique representations that were moved.
+    '''
+    if storage_format not in STORAGE_FORMATS:
+        raise ValueError("'storage_format' must be one of %s"
+                         % str(STORAGE_FORMATS))
+    count = 0
+    if os.path.isdir(pv_it_dir):
+        for folder in os.listdir(pv_it_dir):
+            folder_path = os.path.join(pv_it_dir, folder)
+            if os.path.isdir(folder_path):
+                count += migrate_folder(folder_path, storage_format)
+    else:
+        os.makedirs(pv_it_dir)
+    write_storage_format(pv_it_dir, storage_format)
+    return count
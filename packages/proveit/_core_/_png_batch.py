@@ -0,0 +1,136 @@
+'''
+Batched generation of expression png images.  Rather than running
+latex and dvipng once per expression (as
+TheoryFolderStorage._generate_png does via IPython's latex_to_png), the
+LaTeX of expressions that share the same document header (the packages
+and preamble from their LaTeXTool configuration) is compiled, up to
+defaults.png_batch_size at a time, as the pages of one LaTeX document
+which a single dvipng invocation splits into one png per page.  Up to
+defaults.png_workers batches are compiled concurrently.
+
+The latex and dvipng options match those of IPython's dvipng backend,
+so the images are the same as when they are generated one at a time.
+When latex or dvipng is not available, or a batch fails to compile,
+the pngs are generated one at a time instead so that the problematic
+LaTeX is reported as usual.
+'''
+
+import os
+import shutil
+import subprocess
+import tempfile
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from .defaults import defaults
+
+
+def generate_pngs(latex_configs, generate_png):
+    '''
+    Return the list of png data for the given list of
+    (latex, config_latex_tool_fn) pairs, in the same order.
+    'generate_png(latex, config_latex_tool_fn)' generates a single png
+    and is used when the pngs cannot be generated in batches.
+    '''
+    batch_size = defaults.png_batch_size
+    if (len(latex_configs) <= 1 or batch_size is None or batch_size <= 1
+            or shutil.which('latex') is None
+            or shutil.which('dvipng') is None):
+        return [generate_png(latex, config_latex_tool_fn)
+                for latex, config_latex_tool_fn in latex_configs]
+
+    # Map distinct (header, latex) keys to a configuration function
+    # and group the distinct latex strings by header.
+    keys = []
+    key_configs = OrderedDict()
+    header_groups = OrderedDict()
+    for latex, config_latex_tool_fn in latex_configs:
+        key = (_document_header(config_latex_tool_fn), latex)
+        keys.append(key)
+        if key not in key_configs:
+            key_configs[key] = config_latex_tool_fn
+            header_groups.setdefault(key[0], []).append(latex)
+    batches = []
+    for header, latex_strs in header_groups.items():
+        for start in range(0, len(latex_strs), batch_size):
+            batches.append((header, latex_strs[start:start + batch_size]))
+
+    max_workers = defaults.png_workers
+    if max_workers is None:
+        max_workers = os.cpu_count() or 1
+    max_workers = max(1, min(max_workers, len(batches)))
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        batch_pngs = list(executor.map(lambda batch: _compile_batch(*batch),
+                                       batches))
+
+    pngs = dict()
+    for (header, latex_strs), batch_png_list in zip(batches, batch_pngs):
+        if batch_png_list is None:
+            # Generate these one at a time (reporting any problem).
+            batch_png_list = [
+                generate_png(latex, key_configs[(header, latex)])
+                for latex in latex_strs]
+        for latex, png in zip(latex_strs, batch_png_list):
+            pngs[(header, latex)] = png
+    return [pngs[key] for key in keys]
+
+
+def _document_header(config_latex_tool_fn):
+    '''
+    Return the LaTeX document header (through the preamble) for the
+    given LaTeXTool configuration function, as IPython's genelatex
+    would generate it (without breqn).
+    '''
+    from IPython.lib.latextools import LaTeXTool
+    LaTeXTool.clear_instance()
+    lt = LaTeXTool.instance()
+    config_latex_tool_fn(lt)
+    lines = [r'\documentclass{article}']
+    lines += [r'\usepackage{%s}' % package for package in lt.packages]
+    lines.append(r'\pagestyle{empty}')
+    if lt.preamble:
+        lines.append(lt.preamble)
+    return '\n'.join(lines)
+
+
+def _compile_batch(header, latex_strs):
+    '''
+    Compile the latex strings as the pages of one document with the
+    given header and return their png data (or None if this fails).
+    '''
+    startupinfo = None
+    if os.name == 'nt':
+        # prevent popup-windows
+        startupinfo = subprocess.STARTUPINFO()
+        startupinfo.dwFlags |= subprocess.STARTF_USESHOWWINDOW
+    workdir = tempfile.mkdtemp()
+    try:
+        with open(os.path.join(workdir, 'batch.tex'), 'w',
+                  encoding='utf8') as tex_file:
+            tex_file.write(header + '\n' + r'\begin{document}' + '\n')
+            tex_file.write('\n\\newpage\n'.join(
+                '$$%s$$' % latex for latex in latex_strs))
+            tex_file.write('\n' + r'\end{document}' + '\n')
+        subprocess.check_call(
+            ['latex', '-halt-on-error', '-interaction', 'batchmode',
+             'batch.tex'], cwd=workdir, stdout=subprocess.DEVNULL,
+            stderr=subprocess.DEVNULL, startupinfo=startupinfo)
+        subprocess.check_call(
+            ['dvipng', '-T', 'tight', '-D', '150', '-z', '9',
+             '-bg', 'Transparent', '-o', 'page%d.png', 'batch.dvi',
+             '-fg', 'Black'], cwd=workdir, stdout=subprocess.DEVNULL,
+            stderr=subprocess.DEVNULL, startupinfo=startupinfo)
+        if os.path.isfile(os.path.join(workdir,
+                                       'page%d.png' % (len(latex_strs) + 1))):
+            return None # pages don't correspond to the latex strings
+        pngs = []
+        for page in range(1, len(latex_strs) + 1):
+            png_path = os.path.join(workdir, 'page%d.png' % page)
+            if not os.path.isfile(png_path):
+                return None
+            with open(png_path, 'rb') as png_file:
+                pngs.append(png_file.read())
+        return pngs
+    except (OSError, subprocess.CalledProcessError):
+        return None
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
@@ -0,0 +1,252 @@
+'''
+Opt-in profiling of proof automation.  While a ProveProfile is active
+(as a context manager or via the %prove_profile magic), calls to
+@prover/@equality_prover methods, Expression.prove, _readily_provable
+and side_effects are timed and counted, along with hits/misses of the
+caches consulted along the way.  When no profile is active, the
+instrumentation only costs a class attribute check per call.
+'''
+
+import time
+from collections import defaultdict
+
+
+class ProveProfileStats:
+    '''
+    Statistics of one profiled method (or strategy) name.
+    '''
+
+    def __init__(self, name):
+        self.name = name
+        self.calls = 0
+        self.failures = 0
+        # Time from outermost calls only (so recursion isn't
+        # double counted).
+        self.total_time = 0.
+        # Time excluding that spent in nested profiled calls.
+        self.self_time = 0.
+        self.max_depth = 0
+        self.hits = 0
+        self.misses = 0
+
+    def hit_rate(self):
+        '''
+        Return the fraction of cache lookups that were hits, or None
+        if there were no lookups.
+        '''
+        lookups = self.hits + self.misses
+        if lookups == 0:
+            return None
+        return self.hits / lookups
+
+
+class ProveProfile:
+    '''
+    Records per-method wall time, call counts, cache hit rates,
+    recursion depth and failures of proof automation while active:
+
+        with ProveProfile() as profile:
+            expr.prove()
+        profile.display(sort_by='self_time')
+        profile.write_collapsed_stacks('prove.folded')
+
+    The collapsed-stack file is compatible with flame graph tools
+    (e.g., flamegraph.pl or speedscope).
+    '''
+
+    # The ProveProfile that is currently recording (if any).
+    active = None
+
+    sort_keys = ('name', 'calls', 'total_time', 'self_time', 'failures',
+                 'max_depth', 'hit_rate')
+
+    def __init__(self):
+        self.stats = dict()
+        # Stack of [name, start time, time in nested calls] entries.
+        self._stack = []
+        # Number of active calls of each name on the stack.
+        self._depths = defaultdict(int)
+        # Map call stacks (tuples of names) to self time.
+        self._stack_times = defaultdict(float)
+        self._prev_active = None
+        self.elapsed = 0.
+
+    def __enter__(self):
+        self._prev_active = ProveProfile.active
+        ProveProfile.active = self
+        self._start = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.elapsed += time.perf_counter() - self._start
+        ProveProfile.active = self._prev_active
+        self._prev_active = None
+
+    def _get_stats(self, name):
+        stats = self.stats.get(name)
+        if stats is None:
+            stats = self.stats[name] = ProveProfileStats(name)
+        return stats
+
+    def call(self, name, func, args=(), kwargs=None):
+        '''
+        Call func(*args, **kwargs), recording it under the given name.
+        '''
+        if kwargs is None:
+            kwargs = dict()
+        stats = self._get_stats(name)
+        stats.calls += 1
+        depths = self._depths
+        depths[name] += 1
+        depth = depths[name]
+        if depth > stats.max_depth:
+            stats.max_depth = depth
+        stack = self._stack
+        entry = [name, time.perf_counter(), 0.]
+        stack.append(entry)
+        try:
+            return func(*args, **kwargs)
+        except BaseException:
+            stats.failures += 1
+            raise
+        finally:
+            elapsed = time.perf_counter() - entry[1]
+            self_time = elapsed - entry[2]
+            stats.self_time += self_time
+            self._stack_times[tuple(_entry[0] for _entry in stack)] += (
+                self_time)
+            stack.pop()
+            if len(stack) > 0:
+                stack[-1][2] += elapsed
+            depths[name] -= 1
+            if depths[name] == 0:
+                stats.total_time += elapsed
+
+    def hit(self, name):
+        '''
+        Record a cache hit for the given name.
+        '''
+        self._get_stats(name).hits += 1
+
+    def miss(self, name):
+        '''
+        Record a cache miss for the given name.
+        '''
+        self._get_stats(name).misses += 1
+
+    def sorted_stats(self, sort_by='total_time'):
+        '''
+        Return the ProveProfileStats sorted by the given key
+        (one of ProveProfile.sort_keys).  Names are sorted in
+        ascending order; everything else in descending order.
+        '''
+        if sort_by not in ProveProfile.sort_keys:
+            raise ValueError("'sort_by' must be one of %s, not %s"
+                             % (ProveProfile.sort_keys, sort_by))
+        if sort_by == 'name':
+            return sorted(self.stats.values(), key=lambda s: s.name)
+        if sort_by == 'hit_rate':
+            def key(stats):
+                hit_rate = stats.hit_rate()
+                return -1 if hit_rate is None else hit_rate
+        else:
+            def key(stats):
+                return getattr(stats, sort_by)
+        return sorted(self.stats.values(), key=key, reverse=True)
+
+    def _rows(self, sort_by, limit):
+        rows = []
+        for stats in self.sorted_stats(sort_by)[:limit]:
+            hit_rate = stats.hit_rate()
+            rows.append((stats.name, str(stats.calls),
+                         '%.4f' % stats.total_time,
+                         '%.4f' % stats.self_time, str(stats.failures),
+                         str(stats.max_depth),
+                         '' if hit_rate is None else
+                         '%.1f%% of %d' % (100 * hit_rate,
+                                           stats.hits + stats.misses)))
+        return rows
+
+    def table(self, sort_by='total_time', limit=None):
+        '''
+        Return a plain-text table of the statistics.
+        '''
+        header = ('name', 'calls', 'total (s)', 'self (s)', 'failures',
+                  'max depth', 'cache hits')
+        rows = [header] + self._rows(sort_by, limit)
+        widths = [max(len(row[i]) for row in rows)
+                  for i in range(len(header))]
+        lines = []
+        for row in rows:
+            lines.append('  '.join(
+                row[0].ljust(widths[0]) if i == 0 else
+                row[i].rjust(widths[i]) for i in range(len(row))))
+        return '\n'.join(lines)
+
+    def _repr_html_(self, sort_by='total_time', limit=None):
+        from html import escape
+        header = ('name', 'calls', 'total (s)', 'self (s)', 'failures',
+                  'max depth', 'cache hits')
+        html = '<table>\n<tr>'
+        html += ''.join('<th>%s</th>' % _ for _ in header)
+        html += '</tr>\n'
+        for row in self._rows(sort_by, limit):
+            html += '<tr>' + ''.join(
+                '<td style="text-align:%s">%s</td>'
+                % ('left' if i == 0 else 'right', escape(cell))
+                for i, cell in enumerate(row)) + '</tr>\n'
+        html += '</table>\n'
+        html += '<p>%.3f seconds elapsed while profiling.</p>' % self.elapsed
+        return html
+
+    def __str__(self):
+        return self.table()
+
+    def display(self, sort_by='total_time', limit=None):
+        '''
+        Display the statistics as an HTML table in a notebook or
+        print them as a plain-text table otherwise.
+        '''
+        try:
+            from IPython import get_ipython
+            from IPython.display import display, HTML
+            in_notebook = get_ipython() is not None
+        except ImportError:
+            in_notebook = False
+        if in_notebook:
+            display(HTML(self._repr_html_(sort_by, limit)))
+        else:
+            print(self.table(sort_by, limit))
+
+    def collapsed_stacks(self):
+        '''
+        Yield 'name;name;...;name microseconds' lines of self time per
+        call stack (the "collapsed stack" format of flame graphs).
+        '''
+        for stack, self_time in sorted(self._stack_times.items()):
+            microseconds = int(round(self_time * 1e6))
+            if microseconds > 0:
+                yield '%s %d' % (';'.join(name.replace(' ', '_')
+                                          for name in stack), microseconds)
+
+    def write_collapsed_stacks(self, filename):
+        '''
+        Write the collapsed stacks to the given file for use with
+        flame graph tools.
+        '''
+        with open(filename, 'w') as f:
+            for line in self.collapsed_stacks():
+                f.write(line + '\n')
+
+
+def profiled(func, name):
+    '''
+    Return a wrapper of func that is recorded under the given name
+    whenever a ProveProfile is active.
+    '''
+    def profiled_func(*args, **kwargs):
+        profile = ProveProfile.active
+        if profile is None:
+            return func(*args, **kwargs)
+        return profile.call(name, func, args, kwargs)
+    return profiled_func
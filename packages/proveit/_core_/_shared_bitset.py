@@ -0,0 +1,166 @@
+'''
+Immutable sets of (small, non-negative) integer indices that share
+structure with the sets they were built from.  A set is a trie of
+fixed fan-out whose leaves are int bitmasks of _LEAF_BITS bits;
+absent children are None.  A union only copies the paths where its
+operands differ (identical sub-tries are shared, not visited), so
+adding an index to a large set, or merging sets derived from common
+ones, costs about the depth of the trie rather than the size of the
+sets.  Each internal node records its number of indices.
+'''
+
+if hasattr(int, 'bit_count'):
+    _popcount = int.bit_count
+else:
+    def _popcount(mask):
+        return bin(mask).count('1')
+
+_LEAF_SHIFT = 8
+_LEAF_BITS = 1 << _LEAF_SHIFT
+_FANOUT_SHIFT = 4
+_FANOUT = 1 << _FANOUT_SHIFT
+_NO_CHILDREN = (None,) * _FANOUT
+
+
+def _node_count(node, level):
+    if node is None:
+        return 0
+    if level == 0:
+        return _popcount(node)
+    return node[0]
+
+
+def _node_union(node, other, level):
+    '''
+    Return the union of two nodes at the given level, returning one of
+    the nodes itself if it already contains the other.
+    '''
+    if node is other or other is None:
+        return node
+    if node is None:
+        return other
+    if level == 0:
+        union = node | other
+        if union == node:
+            return node
+        if union == other:
+            return other
+        return union
+    union_children = []
+    is_node = is_other = True
+    for child, other_child in zip(node[1], other[1]):
+        if child is other_child or other_child is None:
+            union_child = child
+        elif child is None:
+            union_child = other_child
+        else:
+            union_child = _node_union(child, other_child, level - 1)
+        if union_child is not child:
+            is_node = False
+        if union_child is not other_child:
+            is_other = False
+        union_children.append(union_child)
+    if is_node:
+        return node
+    if is_other:
+        return other
+    count = sum(_node_count(child, level - 1) for child in union_children)
+    return (count, tuple(union_children))
+
+
+class SharedBitset:
+    '''
+    An immutable set of non-negative int indices (see the module
+    docstring).
+    '''
+
+    __slots__ = ('_level', '_root')
+
+    def __init__(self, level=0, root=None):
+        # The root covers indices below _LEAF_BITS * _FANOUT**level.
+        self._level = level
+        self._root = root
+
+    @staticmethod
+    def singleton(index):
+        '''
+        Return the set containing just the given index.
+        '''
+        level = 0
+        while index >> (_LEAF_SHIFT + level * _FANOUT_SHIFT):
+            level += 1
+        node = 1 << (index & (_LEAF_BITS - 1))
+        for node_level in range(1, level + 1):
+            child_index = (index >> (_LEAF_SHIFT + (node_level - 1) *
+                                     _FANOUT_SHIFT)) & (_FANOUT - 1)
+            children = list(_NO_CHILDREN)
+            children[child_index] = node
+            node = (1, tuple(children))
+        return SharedBitset(level, node)
+
+    def _lifted_root(self, level):
+        # The root raised to the given (higher) level.
+        root = self._root
+        count = _node_count(root, self._level)
+        for _ in range(self._level, level):
+            if root is not None:
+                root = (count, (root,) + _NO_CHILDREN[1:])
+        return root
+
+    def union(self, *others):
+        '''
+        Return the union of this set with the other sets.
+        '''
+        result = self
+        for other in others:
+            if other._root is None or other._root is result._root:
+                continue
+            if result._root is None:
+                result = other
+                continue
+            level = max(result._level, other._level)
+            root = _node_union(result._lifted_root(level),
+                               other._lifted_root(level), level)
+            if level == result._level and root is result._root:
+                continue
+            if level == other._level and root is other._root:
+                result = other
+            else:
+                result = SharedBitset(level, root)
+        return result
+
+    def __contains__(self, index):
+        level = self._level
+        if index < 0 or index >> (_LEAF_SHIFT + level * _FANOUT_SHIFT):
+            return False
+        node = self._root
+        while node is not None and level > 0:
+            child_index = (index >> (_LEAF_SHIFT + (level - 1) *
+                                     _FANOUT_SHIFT)) & (_FANOUT - 1)
+            node = node[1][child_index]
+            level -= 1
+        return node is not None and bool(
+            node >> (index & (_LEAF_BITS - 1)) & 1)
+
+    def __len__(self):
+        return _node_count(self._root, self._level)
+
+    def __iter__(self):
+        to_visit = [(self._root, self._level, 0)]
+        while len(to_visit) > 0:
+            node, level, offset = to_visit.pop()
+            if node is None:
+                continue
+            if level == 0:
+                while node:
+                    low_bit = node & -node
+                    yield offset + low_bit.bit_length() - 1
+                    node ^= low_bit
+                continue
+            child_span = _LEAF_BITS << ((level - 1) * _FANOUT_SHIFT)
+            for child_index in reversed(range(_FANOUT)):
+                to_visit.append((node[1][child_index], level - 1,
+                                 offset + child_index * child_span))
+
+
+SharedBitset.EMPTY = SharedBitset()
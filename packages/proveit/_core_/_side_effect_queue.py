@@ -0,0 +1,238 @@
+'''
+Deferred derivation of side-effects.  Normally, the side-effects of a
+new proof (obvious consequences such as reversed equalities or
+memberships in including sets) are derived right away and recursively,
+before the step that proved it returns.  When defaults.defer_sideeffects
+is True, the proofs are instead queued in SideEffectQueue and their
+side-effects are derived in order of priority (see
+Expression.sideeffect_priority) when a look-up of known facts may
+benefit (Judgment.find_judgment fails to find a judgment, or a
+known_* table of a relation is consulted) or when
+SideEffectQueue.drain is called explicitly.
+
+A look-up only drains the queued proofs that may derive facts about
+what is being looked up: pending proofs are indexed by their proven
+expression and its operands (the side-effects of a fact relate these,
+e.g. reversed equalities, memberships of the same element, or the
+parts of a conjunction), and a look-up of an expression drains those
+that share the expression or one of its operands.  Each drain is
+limited by defaults.sideeffect_budget (a number of proofs) and
+defaults.sideeffect_time_budget (in seconds) when these are not None.
+
+SideEffectQueue.stats() reports how many of the facts derived via the
+queue were ever used (found by Judgment.find_judgment or required by
+another proof).
+'''
+
+import heapq
+import itertools
+import time
+from .defaults import defaults, USE_DEFAULTS
+
+
+class SideEffectQueue:
+    '''
+    The queue of proofs whose side-effects are pending, as class-level
+    state.
+    '''
+
+    # Heap of (priority, sequence number, key, proof, assumptions)
+    # entries where the key is the (expression, sorted assumptions,
+    # conclude_automation) of Proof.sideeffect_processed.  The
+    # sequence number makes ties first-in-first-out.  Entries that
+    # were drained out of order (by a targeted drain) are left in the
+    # heap and skipped.
+    _heap = []
+    # Map keys to the pending entries.
+    _entries = dict()
+    # Map expressions to the keys of the pending entries whose proven
+    # expressions are, or have operands that are, those expressions
+    # (see _indexed_exprs).
+    _keys_by_expr = dict()
+    _sequence = itertools.count()
+
+    # True while side-effects are being derived from the queue (drains
+    # are not nested).
+    draining = False
+
+    # Judgments derived while draining that have not been used yet.
+    _unused_derived = set()
+
+    num_queued = 0
+    num_drained = 0
+    num_derived = 0
+    num_used = 0
+
+    @staticmethod
+    def _clear_():
+        '''
+        Forget the pending side-effects and the statistics.
+        '''
+        SideEffectQueue._heap.clear()
+        SideEffectQueue._entries.clear()
+        SideEffectQueue._keys_by_expr.clear()
+        SideEffectQueue._unused_derived.clear()
+        SideEffectQueue.num_queued = SideEffectQueue.num_drained = 0
+        SideEffectQueue.num_derived = SideEffectQueue.num_used = 0
+
+    @staticmethod
+    def num_pending():
+        '''
+        Return the number of proofs whose side-effects are pending.
+        '''
+        return len(SideEffectQueue._entries)
+
+    @staticmethod
+    def _indexed_exprs(expr):
+        '''
+        Return the expression and its operands (or other
+        sub-expressions if it isn't an Operation), by which pending
+        proofs are indexed and targeted drains look them up.
+        '''
+        from .expression.operation import Operation
+        from .expression.composite import ExprTuple
+        if isinstance(expr, Operation) and isinstance(expr.operands,
+                                                      ExprTuple):
+            return (expr,) + tuple(expr.operands.entries)
+        return (expr,) + tuple(expr._sub_expressions)
+
+    @staticmethod
+    def push(proof, key):
+        '''
+        Queue the side-effect derivations of the given proof under the
+        default assumptions.  The key is the
+        Proof.sideeffect_processed key.
+        '''
+        entries = SideEffectQueue._entries
+        if key in entries:
+            return # already queued
+        priority = proof.proven_truth.expr.sideeffect_priority
+        entry = (priority, next(SideEffectQueue._sequence), key, proof,
+                 defaults.assumptions)
+        heapq.heappush(SideEffectQueue._heap, entry)
+        entries[key] = entry
+        keys_by_expr = SideEffectQueue._keys_by_expr
+        for expr in SideEffectQueue._indexed_exprs(key[0]):
+            keys_by_expr.setdefault(expr, set()).add(key)
+        SideEffectQueue.num_queued += 1
+
+    @staticmethod
+    def _remove(key):
+        '''
+        Remove the pending entry of the key (its heap entry becomes
+        stale).
+        '''
+        del SideEffectQueue._entries[key]
+        keys_by_expr = SideEffectQueue._keys_by_expr
+        for expr in SideEffectQueue._indexed_exprs(key[0]):
+            keys = keys_by_expr.get(expr)
+            if keys is not None:
+                keys.discard(key)
+                if len(keys) == 0:
+                    del keys_by_expr[expr]
+
+    @staticmethod
+    def _relevant_entries(expr):
+        '''
+        Return a heap of the pending entries that may derive facts
+        about the given expression.
+        '''
+        entries, keys_by_expr = (SideEffectQueue._entries,
+                                 SideEffectQueue._keys_by_expr)
+        keys = set()
+        for indexed_expr in SideEffectQueue._indexed_exprs(expr):
+            keys.update(keys_by_expr.get(indexed_expr, ()))
+        relevant = [entries[key] for key in keys]
+        heapq.heapify(relevant)
+        return relevant
+
+    @staticmethod
+    def drain(budget=USE_DEFAULTS, time_budget=USE_DEFAULTS, *,
+              relevant_to=None):
+        '''
+        Derive the side-effects of queued proofs, in order of priority,
+        for up to 'budget' proofs and 'time_budget' seconds
+        (defaulting to defaults.sideeffect_budget and
+        defaults.sideeffect_time_budget; None means no limit).  If
+        'relevant_to' is an expression, only derive the side-effects
+        of queued proofs that may derive facts about it (including
+        those queued along the way).  Return the number of proofs that
+        were processed.
+        '''
+        entries = SideEffectQueue._entries
+        if len(entries) == 0 or SideEffectQueue.draining:
+            return 0
+        if budget is USE_DEFAULTS:
+            budget = defaults.sideeffect_budget
+        if time_budget is USE_DEFAULTS:
+            time_budget = defaults.sideeffect_time_budget
+        start = time.perf_counter()
+        num_drained = 0
+        SideEffectQueue.draining = True
+        try:
+            heap = (SideEffectQueue._heap if relevant_to is None else
+                    SideEffectQueue._relevant_entries(relevant_to))
+            while len(entries) > 0:
+                if budget is not None and num_drained >= budget:
+                    break
+                if time_budget is not None and (
+                        time.perf_counter() - start >= time_budget):
+                    break
+                if len(heap) == 0:
+                    if relevant_to is None:
+                        break
+                    # See if relevant proofs were queued along the way.
+                    heap = SideEffectQueue._relevant_entries(relevant_to)
+                    if len(heap) == 0:
+                        break
+                entry = heapq.heappop(heap)
+                _, _, key, proof, assumptions = entry
+                if entries.get(key) is not entry:
+                    continue # stale
+                SideEffectQueue._remove(key)
+                with defaults.temporary() as temp_defaults:
+                    temp_defaults.assumptions = assumptions
+                    temp_defaults.conclude_automation = key[2]
+                    proof._derive_side_effects(deferrable=False)
+                num_drained += 1
+        finally:
+            SideEffectQueue.draining = False
+            SideEffectQueue.num_drained += num_drained
+            main_heap = SideEffectQueue._heap
+            if len(main_heap) > 2 * len(entries) + 16:
+                # Discard the stale entries of the heap.
+                main_heap[:] = entries.values()
+                heapq.heapify(main_heap)
+        return num_drained
+
+    @staticmethod
+    def _note_derived(judgment):
+        '''
+        Note that the judgment was derived while draining.
+        '''
+        if judgment not in SideEffectQueue._unused_derived:
+            SideEffectQueue._unused_derived.add(judgment)
+            SideEffectQueue.num_derived += 1
+
+    @staticmethod
+    def _note_used(judgment):
+        '''
+        Note that the judgment was used (if it was derived while
+        draining and not used before).
+        '''
+        if judgment in SideEffectQueue._unused_derived:
+            SideEffectQueue._unused_derived.remove(judgment)
+            SideEffectQueue.num_used += 1
+
+    @staticmethod
+    def stats():
+        '''
+        Return a dictionary of the number of proofs queued, drained,
+        and pending, and the number of facts derived via the queue and
+        how many of them were used.
+        '''
+        return {'queued': SideEffectQueue.num_queued,
+                'drained': SideEffectQueue.num_drained,
+                'pending': len(SideEffectQueue._entries),
+                'derived': SideEffectQueue.num_derived,
+                'used': SideEffectQueue.num_used}
@@ -0,0 +1,91 @@
+'''
+A snapshot of a theory is a single 'theory_snapshot.json' file in its
+__pv_it directory recording the names and hash ids of its common
+expressions, axioms, and theorems along with the unique
+representations of their expressions and all of their sub-expressions
+(including those of other theories).  Preloading a theory from its
+snapshot (see Theory.preload) takes a single read rather than reading
+the 'name_to_expr_and_obj_hashes.txt' files and one unique
+representation at a time.
+
+A snapshot records the size and modification time of each of the
+'name_to_expr_and_obj_hashes.txt' files that it reflects and it is
+ignored when these do not match (e.g., after the theory's notebooks
+have been executed again).  Unique representations are addressed by
+their hashes, so they do not go stale in the same way.
+'''
+
+import os
+import json
+
+SNAPSHOT_FILENAME = 'theory_snapshot.json'
+SNAPSHOT_VERSION = 1
+
+# The special object kinds and the __pv_it folders where they are
+# stored.
+SNAPSHOT_KINDS = (('common', 'common'), ('axiom', 'axioms'),
+                  ('theorem', 'theorems'))
+
+
+def special_names_stamp(pv_it_dir, folder):
+    '''
+    Return the [size, modification time in ns] of the
+    'name_to_expr_and_obj_hashes.txt' file of the given folder of a
+    __pv_it directory, or None if the file does not exist.
+    '''
+    filename = os.path.join(pv_it_dir, folder,
+                            'name_to_expr_and_obj_hashes.txt')
+    try:
+        stat = os.stat(filename)
+    except OSError:
+        return None
+    return [stat.st_size, stat.st_mtime_ns]
+
+
+def special_names_stamps(pv_it_dir):
+    '''
+    Return a dictionary mapping each special object kind to the stamp
+    of its 'name_to_expr_and_obj_hashes.txt' file in the given __pv_it
+    directory (see special_names_stamp).
+    '''
+    return {kind: special_names_stamp(pv_it_dir, folder)
+            for kind, folder in SNAPSHOT_KINDS}
+
+
+def write_snapshot(pv_it_dir, stamps, special_entries, unique_reps):
+    '''
+    Write the snapshot of a theory to its __pv_it directory.
+    'special_entries' maps each kind to a list of
+    (name, expression hash id, object hash id) entries and
+    'unique_reps' maps explicit storage ids to unique
+    representations.  The file is replaced atomically so concurrent
+    readers see either the old or the new snapshot.
+    '''
+    filename = os.path.join(pv_it_dir, SNAPSHOT_FILENAME)
+    tmp_filename = '%s.%d.tmp' % (filename, os.getpid())
+    snapshot = {'version': SNAPSHOT_VERSION, 'stamps': stamps,
+                'special': special_entries, 'unique_reps': unique_reps}
+    with open(tmp_filename, 'w') as f:
+        json.dump(snapshot, f, separators=(',', ':'))
+    os.replace(tmp_filename, filename)
+    return filename
+
+
+def read_snapshot(pv_it_dir):
+    '''
+    Return the (special_entries, unique_reps) of the snapshot in the
+    given __pv_it directory, or None if there is no snapshot or it is
+    out of date.
+    '''
+    filename = os.path.join(pv_it_dir, SNAPSHOT_FILENAME)
+    try:
+        with open(filename, 'r') as f:
+            snapshot = json.load(f)
+    except (OSError, ValueError):
+        return None
+    if snapshot.get('version') != SNAPSHOT_VERSION:
+        return None
+    if snapshot['stamps'] != special_names_stamps(pv_it_dir):
+        return None  # out of date
+    return snapshot['special'], snapshot['unique_reps']
+
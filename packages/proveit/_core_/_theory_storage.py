@@ -8,19 +8,28 @@ import itertools
 import json
 from io import StringIO
 import re
-import urllib.request
-import urllib.parse
-import urllib.error
 import importlib
 import bisect
-from collections import deque
+from collections import deque, OrderedDict
+from ._packed_storage import (
+    DIRECTORIES_FORMAT, PACKED_FORMAT, PACK_FILENAME, INDEX_FILENAME,
+    PackedUniqueReps, read_storage_format, migrate_pv_it_dir)
+from ._theory_snapshot import (
+    SNAPSHOT_KINDS, special_names_stamp, special_names_stamps,
+    write_snapshot, read_snapshot)
 
 
 def relurl(path, start='.'):
     '''
     Return the relative path as a url
     '''
-    return urllib.request.pathname2url(os.path.relpath(path, start))
+    # Equivalent to urllib.request.pathname2url without importing
+    # urllib.request (which is slow to import).
+    if os.name == 'nt':
+        from nturl2path import pathname2url
+    else:
+        from urllib.parse import quote as pathname2url
+    return pathname2url(os.path.relpath(path, start))
 
 
 class TheoryStorage:
@@ -53,6 +62,18 @@ class TheoryStorage:
                 # maybe another processor beat us to it.
                 pass
 
+        # The format for storing unique representations: 'directories'
+        # (a unique_rep.pv_it file in each hash directory) or 'packed'
+        # (see _packed_storage.py).  Sub-theories use the format of
+        # their root theory unless they record their own.
+        self.storage_format = read_storage_format(self.pv_it_dir)
+        if self.storage_format is None:
+            if self.is_root():
+                self.storage_format = DIRECTORIES_FORMAT
+            else:
+                self.storage_format = (
+                    self.root_theory_storage.storage_format)
+
         if self.is_root():
             # If this is a root theory, let's add the directory above
             # the root to sys.path if it is needed.
@@ -129,6 +150,11 @@ class TheoryStorage:
                                       'theorem': None}
         self._special_obj_hash_ids = {'common': None, 'axiom': None,
                                       'theorem': None}
+        # The stamps (see special_names_stamp) of the
+        # name_to_expr_and_obj_hashes.txt files when the above were
+        # recorded, to tell when they were updated by another process.
+        self._special_names_stamps = {'common': None, 'axiom': None,
+                                      'theorem': None}
 
         # Names of axioms, theorems, and common expressions that have
         # been read in and not in need of an update.
@@ -159,6 +185,22 @@ class TheoryStorage:
         '''
         return self.root_theory_storage is self
 
+    def set_storage_format(self, storage_format):
+        '''
+        Set the format for storing unique representations in the
+        __pv_it directory of this theory, 'directories' or 'packed',
+        migrating anything that is already stored.
+        '''
+        for folder_storage in self._folder_storage_dict.values():
+            if folder_storage._packed is not None:
+                folder_storage._packed.close()
+        migrate_pv_it_dir(self.pv_it_dir, storage_format)
+        self.storage_format = storage_format
+        for folder_storage in self._folder_storage_dict.values():
+            folder_storage._packed = (
+                PackedUniqueReps(folder_storage.path)
+                if storage_format == PACKED_FORMAT else None)
+
     def get_sub_theory_names(self):
         '''
         Return the sub-theory names as indicated in the _sub_theories_.txt files.
@@ -466,6 +508,8 @@ class TheoryStorage:
             with open(name_to_expr_and_obj_hashes_file, 'w') as f:
                 for line in new_lines:
                     f.write(line + '\n')
+        self._special_names_stamps[kind] = special_names_stamp(
+            self.pv_it_dir, folder)
 
     def _update_name_to_kind(self, names, kind):
         kind_to_str = {'axiom':'an axiom', 'theorem':'a theorem',
@@ -531,30 +575,63 @@ class TheoryStorage:
 
     def _load_special_names(self, kind):
         '''
-        Yield names of axioms/theorems or common expressions.
+        Read and return the names of axioms/theorems or common
+        expressions.
         '''
         folder = TheoryStorage._kind_to_folder(kind)
-        theory_folder_storage = self.theory_folder_storage(folder)
         name_to_expr_and_obj_hashes_filename = os.path.join(
                 self.pv_it_dir, folder, 'name_to_expr_and_obj_hashes.txt')
+        # Stamp before reading so a concurrent update is not missed.
+        stamp = special_names_stamp(self.pv_it_dir, folder)
+        entries = []
+        if os.path.isfile(name_to_expr_and_obj_hashes_filename):
+            with open(name_to_expr_and_obj_hashes_filename, 'r') as f:
+                for line in f.readlines():
+                    entries.append(line.split())
+        return self._record_special_names(kind, entries, stamp)
+
+    def _record_special_names(self, kind, entries, stamp):
+        '''
+        Record the (name, expression hash id, object hash id) entries
+        of axioms/theorems or common expressions, read from the
+        name_to_expr_and_obj_hashes.txt file with the given stamp, and
+        return the names.
+        '''
+        folder = TheoryStorage._kind_to_folder(kind)
+        theory_folder_storage = self.theory_folder_storage(folder)
+        self._special_names_stamps[kind] = stamp
 
         special_expr_hash_ids = self._special_expr_hash_ids[kind] = dict()
         special_obj_hash_ids  = self._special_obj_hash_ids[kind]  = dict()
 
-        if os.path.isfile(name_to_expr_and_obj_hashes_filename):
-            with open(name_to_expr_and_obj_hashes_filename, 'r') as f:
-                for line in f.readlines():
-                    name, expr_hash_id, obj_hash_id = line.split()
-                    special_expr_hash_ids[name] = expr_hash_id
-                    special_obj_hash_ids[name] = obj_hash_id
+        names = []
+        for name, expr_hash_id, obj_hash_id in entries:
+            special_expr_hash_ids[name] = expr_hash_id
+            special_obj_hash_ids[name] = obj_hash_id
 
-                    self._kindname_to_exprhash[(kind, name)] = expr_hash_id
-                    self._kindname_to_objhash[(kind, name)]  = obj_hash_id
-                    theory_folder_storage._objhash_to_names.setdefault(
-                        expr_hash_id, []).append(name)
-                    theory_folder_storage._objhash_to_names.setdefault(
-                        obj_hash_id, []).append(name)
-                    yield name
+            self._kindname_to_exprhash[(kind, name)] = expr_hash_id
+            self._kindname_to_objhash[(kind, name)]  = obj_hash_id
+            theory_folder_storage._objhash_to_names.setdefault(
+                expr_hash_id, []).append(name)
+            theory_folder_storage._objhash_to_names.setdefault(
+                obj_hash_id, []).append(name)
+            names.append(name)
+        return names
+
+    def _get_special_obj_hash(self, kind, name):
+        '''
+        Return the object hash id of the axiom/theorem or common
+        expression of the given name.  The names are read again if they
+        have not been read already or their file changed since (e.g.,
+        updated by another process).
+        '''
+        special_obj_hash_ids = self._special_obj_hash_ids[kind]
+        if (special_obj_hash_ids is None or
+                self._special_names_stamps[kind] != special_names_stamp(
+                    self.pv_it_dir, TheoryStorage._kind_to_folder(kind))):
+            self._load_special_names(kind)
+            special_obj_hash_ids = self._special_obj_hash_ids[kind]
+        return special_obj_hash_ids[name]
 
     def get_axiom_hash(self, name):
         '''
@@ -562,9 +639,8 @@ class TheoryStorage:
         given name is stored (stored on the 'axioms' theory storage
         folder).
         '''
-        list(self._load_special_names('axiom'))
         try:
-            return self._special_obj_hash_ids['axiom'][name]
+            return self._get_special_obj_hash('axiom', name)
         except KeyError:
             raise KeyError("%s not found as an axiom in %s"
                            % (name, self.theory.name))
@@ -575,13 +651,101 @@ class TheoryStorage:
         name is stored (stored on the 'theorems' theory storage
         folder).
         '''
-        list(self._load_special_names('theorem'))
         try:
-            return self._special_obj_hash_ids['theorem'][name]
+            return self._get_special_obj_hash('theorem', name)
         except KeyError:
             raise KeyError("%s not found as a theorem in %s"
                            % (name, self.theory.name))
 
+    def write_snapshot(self):
+        '''
+        Write the snapshot of this theory (see _theory_snapshot.py):
+        the names of its common expressions, axioms, and theorems and
+        the unique representations of their expressions and all of
+        their sub-expressions.  Return the snapshot filename.
+        '''
+        stamps = special_names_stamps(self.pv_it_dir)
+        special_entries = dict()
+        unique_reps = dict()
+        to_visit = []
+        for kind, folder in SNAPSHOT_KINDS:
+            self._load_special_names(kind)
+            theory_folder_storage = self.theory_folder_storage(folder)
+            expr_hash_ids = self._special_expr_hash_ids[kind]
+            obj_hash_ids = self._special_obj_hash_ids[kind]
+            special_entries[kind] = [
+                (name, expr_hash_id, obj_hash_ids[name])
+                for name, expr_hash_id in expr_hash_ids.items()]
+            to_visit.extend(
+                theory_folder_storage._relative_to_explicit_prefix(
+                    expr_hash_id) for expr_hash_id in expr_hash_ids.values())
+        # Collect the unique representations of the sub-expression
+        # DAG.
+        while len(to_visit) > 0:
+            expr_id = to_visit.pop()
+            if expr_id in unique_reps:
+                continue
+            theory_folder_storage, hash_id = self.theory_folder_storage(
+                'common')._split(expr_id)
+            unique_rep = theory_folder_storage._load_unique_rep(hash_id)
+            unique_reps[expr_id] = unique_rep
+            to_visit.extend(
+                theory_folder_storage._extractReferencedStorageIds(
+                    unique_rep))
+        return write_snapshot(self.pv_it_dir, stamps, special_entries,
+                              unique_reps)
+
+    def preload(self, make_expressions=True):
+        '''
+        Load the names of the common expressions, axioms, and
+        theorems of this theory and, if 'make_expressions' is True,
+        make all of their expressions at once.  Use the snapshot of
+        the theory if there is one that is up to date.  Return True
+        iff the snapshot was used.
+        '''
+        from .theory import Theory
+        # Stamp before reading so a concurrent update is not missed.
+        stamps = special_names_stamps(self.pv_it_dir)
+        snapshot = read_snapshot(self.pv_it_dir)
+        if snapshot is None:
+            self.load_special_names()
+        else:
+            special_entries, unique_reps = snapshot
+            for kind, _ in SNAPSHOT_KINDS:
+                if self._special_expr_hash_ids[kind] is not None:
+                    continue  # already loaded
+                names = self._record_special_names(
+                    kind, special_entries[kind], stamps[kind])
+                self._update_name_to_kind(names, kind)
+                if kind == 'common':
+                    self._common_expr_names = names
+                elif kind == 'axiom':
+                    self._axiom_names = names
+                else:
+                    self._theorem_names = names
+            TheoryFolderStorage.preloaded_unique_reps.update(unique_reps)
+        if make_expressions:
+            # set the default Theory in case there is a Literal
+            prev_theory_default = Theory.default
+            Theory.default = self.theory
+            try:
+                for kind, folder in SNAPSHOT_KINDS:
+                    theory_folder_storage = self.theory_folder_storage(
+                        folder)
+                    if (TheoryFolderStorage.owns_active_storage and
+                            theory_folder_storage ==
+                            TheoryFolderStorage.active_theory_folder_storage):
+                        # Self importing is not allowed.
+                        continue
+                    expr_ids = list(
+                        self._special_expr_hash_ids[kind].values())
+                    if len(expr_ids) > 0:
+                        theory_folder_storage.make_expressions(expr_ids)
+            finally:
+                # reset the default Theory
+                Theory.default = prev_theory_default
+        return snapshot is not None
+
     def get_common_expr(self, name):
         '''
         Return the Expression of the common expression in this theory
@@ -901,6 +1065,27 @@ class TheoryFolderStorage:
     # being stored.
     proveit_object_to_storage = dict()
 
+    # Map explicit storage ids (theory.folder.hash) to Expressions that
+    # have been made from storage so they need not be made again.
+    # Ordered from least to most recently used for eviction beyond
+    # made_expressions_capacity.
+    made_expressions = OrderedDict()
+    made_expressions_capacity = 100000
+
+    # Map Expression class strings (module path + class name) to
+    # the imported Expression classes.
+    expr_classes = dict()
+
+    # Map explicit storage ids to unique representations read from
+    # theory snapshots (see TheoryStorage.preload).
+    preloaded_unique_reps = dict()
+
+    # Style ids of objects that were stored (e.g., as a recorded
+    # canonical form) while 'defer_notebooks' was True.  Their
+    # notebooks are generated if they are retrieved again.
+    defer_notebooks = False
+    deferred_notebook_style_ids = set()
+
     clean_nb_method = None
 
     def __init__(self, theory_storage, folder):
@@ -926,6 +1111,22 @@ class TheoryFolderStorage:
         # version.
         self._prev_objhash_to_names = dict()
 
+        # With the 'packed' storage format, the unique representations
+        # are stored together rather than in hash directories.
+        if theory_storage.storage_format == PACKED_FORMAT:
+            self._packed = PackedUniqueReps(self.path)
+        else:
+            self._packed = None
+
+        # Map hash ids of stored expressions to the storage ids of
+        # their canonical forms (read from 'canonical_forms.txt' on
+        # demand).  Recorded canonical forms of a different
+        # Expression.canonical_form_version are disregarded.
+        self._canonical_form_ids = None
+        # True if 'canonical_forms.txt' must be rewritten (rather than
+        # appended) because it is missing or of a different version.
+        self._rewrite_canonical_forms = False
+
     @staticmethod
     def get_folder_storage_of_obj(obj):
         '''
@@ -985,6 +1186,10 @@ class TheoryFolderStorage:
                 to_remove.add(obj_id)
         for obj_id in to_remove:
             proveit_obj_to_storage.pop(obj_id)
+        # Expressions made from storage may refer to the forgotten
+        # storage of their sub-expressions, so forget them all.
+        TheoryFolderStorage.made_expressions.clear()
+        self._canonical_form_ids = None
         folder = self.folder
         kind = TheoryStorage._folder_to_kind(folder)
         # Load it before we unload it so we can then
@@ -1027,10 +1232,62 @@ class TheoryFolderStorage:
         return theory_folder_storage._retrieve_png(
             expr, latex, config_latex_tool_fn)
 
+    @staticmethod
+    def retrieve_pngs(expr_latex_configs):
+        '''
+        Find or create the expr.png files for a list of
+        (expr, latex, config_latex_tool_fn) triples of stored
+        Expressions, as retrieve_png does for one, generating the
+        missing png files in batches (see _png_batch.generate_pngs).
+        Return the list of (png data, relative url) tuples in the same
+        order.
+        '''
+        from ._png_batch import generate_pngs
+        pngs_and_paths = []
+        missing = []
+        for expr, latex, config_latex_tool_fn in expr_latex_configs:
+            theory_folder_storage = \
+                TheoryFolderStorage.get_folder_storage_of_obj(expr)
+            if theory_folder_storage is None:
+                raise Exception("You must run the %begin or %proving magic "
+                                "command before displaying LaTeX Prove-It "
+                                "expressions")
+            png, png_path = theory_folder_storage._stored_png(expr, latex)
+            if png is None:
+                missing.append((len(pngs_and_paths), latex,
+                                config_latex_tool_fn))
+            pngs_and_paths.append((png, png_path))
+        if len(missing) > 0:
+            pngs = generate_pngs(
+                [(latex, config_latex_tool_fn) for _, latex,
+                 config_latex_tool_fn in missing],
+                TheoryFolderStorage._generate_png)
+            for (idx, _, _), png in zip(missing, pngs):
+                png_path = pngs_and_paths[idx][1]
+                with open(png_path, 'wb') as png_file:
+                    png_file.write(png)
+                pngs_and_paths[idx] = (png, png_path)
+        return [(png, relurl(png_path)) for png, png_path in pngs_and_paths]
+
     def _retrieve_png(self, expr, latex, config_latex_tool_fn):
         '''
         Helper method of retrieve_png.
         '''
+        png, png_path = self._stored_png(expr, latex)
+        if png is None:
+            # generate, store and return the png file
+            png = self._generate_png(latex, config_latex_tool_fn)
+            with open(png_path, 'wb') as png_file:
+                png_file.write(png)
+        return png, relurl(png_path)
+
+    def _stored_png(self, expr, latex):
+        '''
+        Return the stored png data of the expression (or None if
+        it must be generated) and the path of its png file.  The latex
+        file is updated if it is missing or is not consistent with the
+        given latex string.
+        '''
         (theory_folder_storage, hash_directory) = self._retrieve(expr)
         assert theory_folder_storage == self, \
             "How did the theory end up different from expected??"
@@ -1038,6 +1295,10 @@ class TheoryFolderStorage:
         # the distinction
         latex_path = os.path.join(self.path, hash_directory, 'expr.latex')
         png_path = os.path.join(self.path, hash_directory, 'expr.png')
+        if self._packed is not None:
+            # Hash directories are only made as needed when packed.
+            os.makedirs(os.path.join(self.path, hash_directory),
+                        exist_ok=True)
         # check if the latex file exists, is consistent with the given
         # latex string, and if the png file exists.
         if os.path.isfile(latex_path):
@@ -1050,17 +1311,14 @@ class TheoryFolderStorage:
                     if os.path.isfile(png_path):
                         # png file exists.  read and return the data.
                         with open(png_path, 'rb') as png_file:
-                            return png_file.read(), relurl(png_path)
+                            return png_file.read(), png_path
         # store the latex string in the latex file
         with open(latex_path, 'wb') as latex_file:
             latex_file.write(latex.encode('ascii'))
-        # generate, store and return the png file
-        png = self._generate_png(latex, config_latex_tool_fn)
-        with open(png_path, 'wb') as png_file:
-            png_file.write(png)
-        return png, relurl(png_path)
+        return None, png_path
 
-    def _generate_png(self, latex, config_latex_tool_fn):
+    @staticmethod
+    def _generate_png(latex, config_latex_tool_fn):
         '''
         Generate the png image for the given latex using the given latex
         configuration function.
@@ -1229,7 +1487,14 @@ class TheoryFolderStorage:
         from proveit._core_.proof import Axiom, Theorem
         proveit_obj_to_storage = TheoryFolderStorage.proveit_object_to_storage
         if prove_it_object._style_id in proveit_obj_to_storage:
-            return proveit_obj_to_storage[prove_it_object._style_id]
+            result = proveit_obj_to_storage[prove_it_object._style_id]
+            deferred_notebook_style_ids = (
+                TheoryFolderStorage.deferred_notebook_style_ids)
+            if (prove_it_object._style_id in deferred_notebook_style_ids
+                    and not TheoryFolderStorage.defer_notebooks):
+                deferred_notebook_style_ids.discard(prove_it_object._style_id)
+                result[0]._generateObjectNotebook(prove_it_object)
+            return result
         if isinstance(prove_it_object, Axiom):
             theory_folder_storage = \
                 prove_it_object.theory._theory_folder_storage('axioms')
@@ -1250,48 +1515,205 @@ class TheoryFolderStorage:
         # hash the unique representation and make a sub-directory of
         # this hash value
         rep_hash = hashlib.sha1(unique_rep.encode('utf-8')).hexdigest()
-        hash_path = os.path.join(self.path, rep_hash)
         # append the hash value with an index, avoiding collisions
         # (that should be astronomically rare, but let's not risk it).
         index = 0
-        while os.path.exists(hash_path + str(index)):
-            indexed_hash_path = hash_path + str(index)
-            unique_rep_filename = os.path.join(indexed_hash_path,
-                                               'unique_rep.pv_it')
-            if not os.path.isfile(unique_rep_filename):
-                # folder does not contain a unique_rep.pv_it file;
-                # it may not have been completely erased before, but
-                # let's just use it.
+        while True:
+            hash_id = rep_hash + str(index)
+            rep = self._read_unique_rep(hash_id)
+            if rep is None:
+                # Not stored (or a hash directory without a
+                # unique_rep.pv_it file that may not have been
+                # completely erased before, but let's just use it).
+                self._write_unique_rep(hash_id, unique_rep)
                 break
-            with open(unique_rep_filename, 'r') as f:
-                rep = f.read()
-                if rep != unique_rep:
-                    # there is a hashing collision (this should be
-                    # astronomically rare, but we'll make sure just
-                    # in case)
-                    index += 1  # increment the index and try again
-                    continue
-            # found a match; it is already in storage
-            # remember this for next time
-            result = (self, rep_hash + str(index))
-            self._record_storage(prove_it_object._style_id,
-                                 rep_hash + str(index))
-            self._generateObjectNotebook(prove_it_object)
-            return result
-        indexed_hash_path = hash_path + str(index)
-        # store the unique representation in the appropriate file
-        if not os.path.exists(indexed_hash_path):
-            os.mkdir(indexed_hash_path)
-        with open(os.path.join(indexed_hash_path, 'unique_rep.pv_it'),
-                  'w') as f:
-            f.write(unique_rep)
+            if rep == unique_rep:
+                # found a match; it is already in storage
+                break
+            # there is a hashing collision (this should be
+            # astronomically rare, but we'll make sure just
+            # in case)
+            index += 1  # increment the index and try again
         # remember this for next time
-        result = (self, rep_hash + str(index))
-        self._record_storage(prove_it_object._style_id,
-                             rep_hash + str(index))
+        result = (self, hash_id)
+        self._record_storage(prove_it_object._style_id, hash_id)
         self._generateObjectNotebook(prove_it_object)
+        if not TheoryFolderStorage.defer_notebooks:
+            # Record its canonical form if it is already known.
+            self._record_known_canonical_form(prove_it_object)
         return result
 
+    def _get_canonical_form_ids(self):
+        '''
+        Return the dictionary mapping hash ids of stored expressions
+        of this folder to the storage ids of their canonical forms.
+        '''
+        from proveit import Expression
+        if self._canonical_form_ids is None:
+            self._canonical_form_ids = dict()
+            self._rewrite_canonical_forms = True
+            filename = os.path.join(self.path, 'canonical_forms.txt')
+            if os.path.isfile(filename):
+                with open(filename, 'r') as f:
+                    if f.readline().split() == [
+                            'version',
+                            str(Expression.canonical_form_version)]:
+                        self._rewrite_canonical_forms = False
+                        for line in f:
+                            split_line = line.split()
+                            if len(split_line) == 2:
+                                hash_id, cf_id = split_line
+                                self._canonical_form_ids[hash_id] = cf_id
+        return self._canonical_form_ids
+
+    def _write_canonical_forms(self, canonical_form_ids):
+        '''
+        (Re)write 'canonical_forms.txt' with the given entries, headed
+        by the current Expression.canonical_form_version.
+        '''
+        from proveit import Expression
+        with open(os.path.join(self.path, 'canonical_forms.txt'), 'w') as f:
+            f.write('version %d\n' % Expression.canonical_form_version)
+            for hash_id, cf_id in canonical_form_ids.items():
+                f.write('%s %s\n' % (hash_id, cf_id))
+        self._rewrite_canonical_forms = False
+
+    @staticmethod
+    def retrieve_canonical_form(expr):
+        '''
+        Return the canonical form of the given expression if the
+        expression is stored and its canonical form was recorded;
+        otherwise, return None.
+        '''
+        proveit_obj_to_storage = TheoryFolderStorage.proveit_object_to_storage
+        if expr._style_id not in proveit_obj_to_storage:
+            return None
+        theory_folder_storage, hash_id = proveit_obj_to_storage[
+            expr._style_id]
+        cf_id = theory_folder_storage._get_canonical_form_ids().get(hash_id)
+        if cf_id is None:
+            return None
+        if cf_id == hash_id:
+            return expr # its own canonical form
+        try:
+            return theory_folder_storage.make_expression(cf_id)
+        except Exception:
+            # The canonical form may not be available (e.g., if it
+            # was stored in a different theory that is being rebuilt).
+            return None
+
+    @staticmethod
+    def record_canonical_form(expr, cf):
+        '''
+        Record the canonical form of the given expression, storing the
+        canonical form as needed, if the expression is stored in the
+        active theory folder storage that is owned (so it is recorded by
+        the notebook that generates this folder).  The canonical form is
+        stored without generating its expression notebook.  This is
+        called by Expression.canonical_form when it builds a canonical
+        form and when an expression with a known canonical form is
+        stored.
+        '''
+        if not TheoryFolderStorage.owns_active_storage:
+            return
+        proveit_obj_to_storage = TheoryFolderStorage.proveit_object_to_storage
+        if expr._style_id not in proveit_obj_to_storage:
+            return
+        theory_folder_storage, hash_id = proveit_obj_to_storage[
+            expr._style_id]
+        if theory_folder_storage != (
+                TheoryFolderStorage.active_theory_folder_storage):
+            return
+        canonical_form_ids = theory_folder_storage._get_canonical_form_ids()
+        if hash_id in canonical_form_ids:
+            return
+        prev_defer_notebooks = TheoryFolderStorage.defer_notebooks
+        TheoryFolderStorage.defer_notebooks = True
+        try:
+            cf_id = theory_folder_storage._prove_it_storage_id(cf)
+        finally:
+            TheoryFolderStorage.defer_notebooks = prev_defer_notebooks
+        canonical_form_ids[hash_id] = cf_id
+        if theory_folder_storage._rewrite_canonical_forms:
+            theory_folder_storage._write_canonical_forms(canonical_form_ids)
+        else:
+            with open(os.path.join(theory_folder_storage.path,
+                                   'canonical_forms.txt'), 'a') as f:
+                f.write('%s %s\n' % (hash_id, cf_id))
+
+    def _record_known_canonical_form(self, prove_it_object):
+        '''
+        If the given object is an Expression whose canonical form has
+        already been generated, record it (see record_canonical_form).
+        '''
+        from proveit import Expression
+        if not isinstance(prove_it_object, Expression):
+            return
+        expr_to_canonical_form = Expression.expr_to_canonical_form
+        if prove_it_object in expr_to_canonical_form:
+            cf = expr_to_canonical_form[prove_it_object]
+            if cf is None:
+                cf = prove_it_object # its own canonical form
+            TheoryFolderStorage.record_canonical_form(prove_it_object, cf)
+
+    def _read_unique_rep(self, hash_id):
+        '''
+        Return the stored unique representation for the given hash id
+        of this folder, or None if it is not stored.
+        '''
+        preloaded_unique_reps = TheoryFolderStorage.preloaded_unique_reps
+        if len(preloaded_unique_reps) > 0:
+            unique_rep = preloaded_unique_reps.get(
+                self.theory.name + '.' + self.folder + '.' + hash_id)
+            if unique_rep is not None:
+                return unique_rep
+        if self._packed is not None:
+            unique_rep = self._packed.read(hash_id)
+            if unique_rep is not None:
+                return unique_rep
+            # Fall back to the directory layout in case the migration
+            # to the packed format is incomplete.
+        unique_rep_filename = os.path.join(self.path, hash_id,
+                                           'unique_rep.pv_it')
+        if not os.path.isfile(unique_rep_filename):
+            return None
+        with open(unique_rep_filename, 'r') as f:
+            return f.read()
+
+    def _write_unique_rep(self, hash_id, unique_rep):
+        '''
+        Store the unique representation for the given hash id of this
+        folder.
+        '''
+        hash_path = os.path.join(self.path, hash_id)
+        TheoryFolderStorage.preloaded_unique_reps.pop(
+            self.theory.name + '.' + self.folder + '.' + hash_id, None)
+        if self._packed is not None:
+            self._packed.append(hash_id, unique_rep)
+            if self.folder in ('axioms', 'theorems'):
+                # Axioms and theorems keep 'used_by' and proof
+                # information in their hash directories.
+                os.makedirs(hash_path, exist_ok=True)
+            return
+        if not os.path.exists(hash_path):
+            os.mkdir(hash_path)
+        with open(os.path.join(hash_path, 'unique_rep.pv_it'), 'w') as f:
+            f.write(unique_rep)
+
+    def _load_unique_rep(self, storage_id):
+        '''
+        Return the stored unique representation for the Prove-It object
+        with the given storage id (which may be in a different theory
+        or folder).
+        '''
+        theory_folder_storage, hash_id = self._split(storage_id)
+        unique_rep = theory_folder_storage._read_unique_rep(hash_id)
+        if unique_rep is None:
+            raise FileNotFoundError(
+                "No stored unique representation for %s in %s"
+                % (storage_id, theory_folder_storage.path))
+        return unique_rep
+
     def _owningNotebook(self):
         '''
         Return the notebook that generates the information in this
@@ -1320,6 +1742,10 @@ class TheoryFolderStorage:
         # generate the expression or proof notebook as appropriate
         if (TheoryFolderStorage.owns_active_storage and
                 self == TheoryFolderStorage.active_theory_folder_storage):
+            if TheoryFolderStorage.defer_notebooks:
+                TheoryFolderStorage.deferred_notebook_style_ids.add(
+                    prove_it_object._style_id)
+                return
             if isinstance(prove_it_object, Expression):
                 TheoryFolderStorage.expression_notebook(prove_it_object)
             elif isinstance(prove_it_object, Proof):
@@ -1477,6 +1903,7 @@ class TheoryFolderStorage:
                     with open(filepath, 'w') as expr_file:
                         expr_file.write(nb)
         else:
+            os.makedirs(full_hash_dir, exist_ok=True)
             with open(filepath, 'w') as expr_file:
                 expr_file.write(nb)
         # return the relative url to the new proof file
@@ -1978,6 +2405,7 @@ class TheoryFolderStorage:
             # Copy the template.  Nothing needs to be edited for these.
             template_filename = os.path.join(proveit_path, '..',
                                              '_proof_template_.ipynb')
+            os.makedirs(os.path.dirname(filename), exist_ok=True)
             shutil.copyfile(template_filename, filename)
         return relurl(filename)
 
@@ -1986,25 +2414,17 @@ class TheoryFolderStorage:
         Return the Expression object that is represented in storage by
         the given expression id.
         '''
-        import importlib
-        # map expression class strings to Expression class objects
-        expr_class_map = dict()
+        return self.make_expressions([expr_id])[0]
 
-        def import_fn(expr_class_str):
-            split_expr_class = expr_class_str.split('.')
-            module = importlib.import_module('.'.join(split_expr_class[:-1]))
-            expr_class_map[expr_class_str] = getattr(
-                module, split_expr_class[-1])
-
-        def expr_builder_fn(
-                expr_class_str,
-                expr_info,
-                styles,
-                sub_expressions):
-            expr_class = expr_class_map[expr_class_str]
-            expr = expr_class._checked_make(expr_info, sub_expressions,
-                                            style_preferences=styles)
-            return expr
+    def make_expressions(self, expr_ids):
+        '''
+        Return the list of Expression objects that are represented in
+        storage by the given expression ids.  The union of their
+        sub-expression dependencies is resolved at once so shared
+        sub-expressions are only made once, and everything that is made
+        is remembered in TheoryFolderStorage.made_expressions for
+        future requests.
+        '''
         # Load the "special names" of the theory so we
         # will know, for future reference, if this is a special
         # expression that may be addressed as such.
@@ -2014,12 +2434,42 @@ class TheoryFolderStorage:
             # Don't worry if we can't load these right now -- we may
             # by in the process of rebuilding.
             pass
-        expr = self._make_expression(expr_id, import_fn, expr_builder_fn)
-        return expr
+        return self._make_expressions(expr_ids)
+
+    @staticmethod
+    def _import_expr_class(expr_class_str, *, remember=True):
+        '''
+        Import and return the Expression class with the given
+        (module path + class name) string.  Remember it in
+        TheoryFolderStorage.expr_classes if 'remember' is True.
+        '''
+        expr_classes = TheoryFolderStorage.expr_classes
+        if expr_class_str in expr_classes:
+            return expr_classes[expr_class_str]
+        split_expr_class = expr_class_str.split('.')
+        module = importlib.import_module('.'.join(split_expr_class[:-1]))
+        expr_class = getattr(module, split_expr_class[-1])
+        if remember:
+            expr_classes[expr_class_str] = expr_class
+        return expr_class
+
+    @staticmethod
+    def _remember_made_expression(explicit_expr_id, expr):
+        '''
+        Remember the Expression made for the explicit storage id,
+        evicting the least recently used entries beyond
+        TheoryFolderStorage.made_expressions_capacity.
+        '''
+        made_expressions = TheoryFolderStorage.made_expressions
+        made_expressions[explicit_expr_id] = expr
+        made_expressions.move_to_end(explicit_expr_id)
+        while len(made_expressions) > (
+                TheoryFolderStorage.made_expressions_capacity):
+            made_expressions.popitem(last=False)
 
-    def _make_expression(self, expr_id, import_fn, expr_builder_fn):
+    def _make_expressions(self, expr_ids):
         '''
-        Helper method for make_expression
+        Helper method for make_expressions
         '''
         from proveit import Expression
         from ._dependency_graph import ordered_dependency_nodes
@@ -2036,18 +2486,40 @@ class TheoryFolderStorage:
         # Map the expression storage id to a (theory folder storage,
         # hash) tuple.
         exprid_to_storage = dict()
-        master_expr_id = expr_id
+        # Use explicit ids (with the theory and folder) throughout;
+        # the ids of sub-expressions are extracted as explicit ids.
+        master_expr_ids = [self._relative_to_explicit_prefix(expr_id)
+                           for expr_id in expr_ids]
         try:
             local_theory_name = Theory().name
         except BaseException:
             local_theory_name = None
         proveit_obj_to_storage = TheoryFolderStorage.proveit_object_to_storage
+        made_expressions = TheoryFolderStorage.made_expressions
+        # Expressions found in made_expressions.  These are held here
+        # since making other expressions (or importing their classes)
+        # may evict them from made_expressions.
+        previously_made = dict()
 
         def get_dependent_expr_ids(expr_id):
             '''
             Given an expression id, yield the ids of all of its
             sub-expressions.
             '''
+            if expr_id is None:
+                # The 'root' of all the requested expressions.
+                return master_expr_ids
+            if expr_id in previously_made:
+                return []
+            expr = made_expressions.get(expr_id)
+            if expr is not None:
+                # Already made; no need to visit its sub-expressions.
+                made_expressions.move_to_end(expr_id)
+                previously_made[expr_id] = expr
+                return []
+            if expr_id in sub_expr_ids_map:
+                # Already visited via another path.
+                return sub_expr_ids_map[expr_id]
             theory_folder_storage, hash_directory = self._split(expr_id)
             if theory_folder_storage.theory != self.theory:
                 # Load the "special names" of the theory so we
@@ -2056,59 +2528,70 @@ class TheoryFolderStorage:
                 theory_folder_storage.theory_storage.load_special_names()
             exprid_to_storage[expr_id] = (theory_folder_storage,
                                           hash_directory)
-            hash_path = self._storagePath(expr_id)
-            with open(os.path.join(hash_path, 'unique_rep.pv_it'), 'r') as f:
-                # Extract the unique representation from the pv_it file.
-                unique_rep = f.read()
-                # Parse the unique_rep to get the expression information.
-                (expr_class_str, core_info, style_dict, sub_expr_refs) = \
-                    Expression._parse_unique_rep(unique_rep)
-                if (local_theory_name is not None
-                        and expr_class_str.find(local_theory_name) == 0):
-                    # import locally if necessary
-                    expr_class_rel_strs[expr_id] = \
-                        expr_class_str[len(local_theory_name) + 1:]
-                expr_class_strs[expr_id] = expr_class_str
-                # extract the Expression "core information" from the
-                # unique representation
-                core_info_map[expr_id] = core_info
-                styles_map[expr_id] = style_dict
-                dependent_refs = sub_expr_refs
-                dependent_ids = \
-                    theory_folder_storage._extractReferencedStorageIds(
-                        unique_rep, storage_ids=dependent_refs)
-                sub_expr_ids_map[expr_id] = dependent_ids
-                #print('dependent_ids', dependent_ids)
-                return dependent_ids
-
-        expr_ids = ordered_dependency_nodes(expr_id, get_dependent_expr_ids)
-        for expr_id in reversed(expr_ids):
+            # Extract the unique representation from storage.
+            unique_rep = theory_folder_storage._load_unique_rep(
+                hash_directory)
+            # Parse the unique_rep to get the expression information.
+            (expr_class_str, core_info, style_dict, sub_expr_refs) = \
+                Expression._parse_unique_rep(unique_rep)
+            if (local_theory_name is not None
+                    and expr_class_str.find(local_theory_name) == 0):
+                # import locally if necessary
+                expr_class_rel_strs[expr_id] = \
+                    expr_class_str[len(local_theory_name) + 1:]
+            expr_class_strs[expr_id] = expr_class_str
+            # extract the Expression "core information" from the
+            # unique representation
+            core_info_map[expr_id] = core_info
+            styles_map[expr_id] = style_dict
+            dependent_refs = sub_expr_refs
+            dependent_ids = \
+                theory_folder_storage._extractReferencedStorageIds(
+                    unique_rep, storage_ids=dependent_refs)
+            sub_expr_ids_map[expr_id] = dependent_ids
+            #print('dependent_ids', dependent_ids)
+            return dependent_ids
+
+        # Order the union of the dependencies from a common 'root'
+        # (None) and then drop that root.
+        ordered_expr_ids = ordered_dependency_nodes(
+            None, get_dependent_expr_ids)[1:]
+        # map expr-ids to Expression classes:
+        expr_class_map = dict()
+        for expr_id in reversed(ordered_expr_ids):
+            if expr_id not in expr_class_strs:
+                continue  # already made
             if expr_id in expr_class_rel_strs:
                 # there exists a relative path
                 try:
                     # First try the absolute path; that is preferred for
                     # consistency sake (we want different imports of
                     # something to be regarded as the same)
-                    import_fn(expr_class_strs[expr_id])
+                    expr_class_map[expr_id] = self._import_expr_class(
+                        expr_class_strs[expr_id])
                 except BaseException:
                     # If importing the absolute path fails, maybe the
-                    # relative path will work.
-                    import_fn(expr_class_rel_strs[expr_id])
-                    # use the relative path
-                    expr_class_strs[expr_id] = expr_class_rel_strs[expr_id]
+                    # relative path will work (but don't remember it
+                    # since it is relative to the active theory).
+                    expr_class_map[expr_id] = self._import_expr_class(
+                        expr_class_rel_strs[expr_id], remember=False)
             else:
                 # there does not exist a relative path;
                 # the absolute path is the only option.
-                import_fn(expr_class_strs[expr_id])
-        # map expr-ids to "built" expressions
-        # (whatever expr_builder_fn returns):
+                expr_class_map[expr_id] = self._import_expr_class(
+                    expr_class_strs[expr_id])
+        # map expr-ids to built expressions:
         built_expr_map = dict()
-        for expr_id in reversed(expr_ids):
+        for expr_id in reversed(ordered_expr_ids):
+            if expr_id not in expr_class_map:
+                # Made previously.
+                built_expr_map[expr_id] = previously_made[expr_id]
+                continue
             sub_expressions = [built_expr_map[sub_expr_id] for sub_expr_id
                                in sub_expr_ids_map[expr_id]]
-            expr = expr_builder_fn(
-                expr_class_strs[expr_id], core_info_map[expr_id],
-                styles_map[expr_id], sub_expressions)
+            expr = expr_class_map[expr_id]._checked_make(
+                core_info_map[expr_id], sub_expressions,
+                style_preferences=styles_map[expr_id])
             expr_style_id = expr._style_id
             if expr_style_id not in proveit_obj_to_storage:
                 # Remember the storage corresponding to the style id
@@ -2118,8 +2601,9 @@ class TheoryFolderStorage:
                 theory_folder_storage._record_storage(
                     expr_style_id, hash_id)
             built_expr_map[expr_id] = expr
+            self._remember_made_expression(expr_id, expr)
 
-        return built_expr_map[master_expr_id]
+        return [built_expr_map[expr_id] for expr_id in master_expr_ids]
 
     def make_judgment_or_proof(self, storage_id):
         '''
@@ -2133,10 +2617,8 @@ class TheoryFolderStorage:
             # Make it from the proper TheoryFolderStorage.
             return theory_folder_storage.make_judgment_or_proof(storage_id)
         theory = self.theory
-        hash_path = self._storagePath(storage_id)
-        with open(os.path.join(hash_path, 'unique_rep.pv_it'), 'r') as f:
-            # extract the unique representation from the pv_it file
-            unique_rep = f.read()
+        # extract the unique representation from storage
+        unique_rep = self._load_unique_rep(storage_id)
         subids = \
             theory_folder_storage._extractReferencedStorageIds(unique_rep)
 
@@ -2155,9 +2637,7 @@ class TheoryFolderStorage:
                 judgment = self.make_judgment_or_proof(judgment_id)
                 obj = Theorem(judgment.expr, theory, name)
         elif unique_rep[:9] == 'Judgment:':
-            truth_expr_id = self.make_expression(subids[0])
-            assumptions = [self.make_expression(
-                exprid) for exprid in subids[1:]]
+            truth_expr_id, *assumptions = self.make_expressions(subids)
             num_lit_gen_str = unique_rep[unique_rep.rfind(']')+1:]
             num_lit_gen = 0 if num_lit_gen_str == '' else int(num_lit_gen_str)
             obj = Judgment(truth_expr_id, assumptions, num_lit_gen=num_lit_gen)
@@ -2175,10 +2655,8 @@ class TheoryFolderStorage:
         theory_folder_storage, hash_directory = self._split(proof_id)
         theory = theory_folder_storage.theory
         folder = theory_folder_storage.folder
-        hash_path = theory_folder_storage._storagePath(proof_id)
-        with open(os.path.join(hash_path, 'unique_rep.pv_it'), 'r') as f:
-            # extract the unique representation from the pv_it file
-            unique_rep = f.read()
+        # extract the unique representation from storage
+        unique_rep = theory_folder_storage._load_unique_rep(hash_directory)
         # full storage id:
         proof_id = theory.name + '.' + folder + '.' + hash_directory
         proveit_obj_to_storage = TheoryFolderStorage.proveit_object_to_storage
@@ -2237,6 +2715,10 @@ class TheoryFolderStorage:
                 continue
             if hash_subfolder == 'name_to_expr_and_obj_hashes.txt':
                 continue
+            if hash_subfolder in (PACK_FILENAME, INDEX_FILENAME):
+                continue
+            if hash_subfolder == 'canonical_forms.txt':
+                continue
             hashpath = os.path.join(self.path, hash_subfolder)
             if hash_subfolder not in owned_hash_folders:
                 paths_to_remove.append(hashpath)
@@ -2283,6 +2765,26 @@ class TheoryFolderStorage:
             except OSError:
                 unable_to_remove_warning(hashpath)
 
+        if self._packed is not None:
+            # Drop the unique representations that are not owned.
+            try:
+                self._packed.compact(owned_hash_folders)
+            except OSError:
+                unable_to_remove_warning(self._packed.pack_filename)
+
+        # Drop the recorded canonical forms of expressions that are
+        # not owned (or all of them if they are of a different
+        # version).
+        canonical_forms_filename = os.path.join(self.path,
+                                                'canonical_forms.txt')
+        if os.path.isfile(canonical_forms_filename):
+            canonical_form_ids = self._get_canonical_form_ids()
+            self._write_canonical_forms(
+                {hash_id: cf_id for hash_id, cf_id
+                 in canonical_form_ids.items()
+                 if hash_id in owned_hash_folders})
+            self._canonical_form_ids = None
+
     def contains_any_expression(self):
         '''
         Returns True if the __pv_it directory contains any expressions
@@ -2410,17 +2912,8 @@ class StoredSpecialStmt:
         Returns the set of theorems that are known to depend upon the
         given theorem or axiom directly or indirectly.
         '''
-        from .theory import Theory
-        to_process = set(self.read_dependent_theorems())
-        processed = set()
-        while len(to_process) > 0:
-            next_theorem = to_process.pop()
-            processed.add(next_theorem)
-            stored_theorem = Theory.get_stored_theorem(next_theorem)
-            dependents = set(stored_theorem.read_dependent_theorems())
-            # add anything new to be processed
-            to_process.update(dependents.difference(processed))
-        return processed
+        from ._dependency_index import DependencyIndex
+        return DependencyIndex.all_dependents(str(self))
 
     def _removeEntryFromFile(self, filename, entry_to_remove):
         '''
@@ -2546,7 +3039,7 @@ class StoredTheorem(StoredSpecialStmt):
         Return the recorded set of eliminated theorems
         (via literal generalization).
         '''
-        return set(self._read_stmts('eliminated_theorems.text'))
+        return set(self._read_stmts('eliminated_theorems.txt'))
 
 
     def _read_stmts(self, filename):
@@ -2774,6 +3267,7 @@ class StoredTheorem(StoredSpecialStmt):
         '''
         from proveit._core_ import Proof
         from .theory import Theory, TheoryException
+        from ._dependency_index import DependencyIndex
 
         # add a reference to the new proof
         active_folder_storage = \
@@ -2858,10 +3352,12 @@ class StoredTheorem(StoredSpecialStmt):
                     for used_stmt_name in sorted(used_stmt_names):
                         used_stmts_file.write(str(used_stmt_name) + '\n')
 
-        # If this proof is complete (all of the theorems that it uses
-        # are complete) then  propagate this information to the theorems
-        # that depend upon this one.
-        self._propagateCompletion()
+        # Index the dependencies.  If this proof is complete (all of the
+        # theorems that it uses are complete) then propagate this
+        # information to the theorems that depend upon this one.
+        DependencyIndex.of_stmt(str(self)).record_proof(
+            str(self), used_axiom_names, used_theorem_names,
+            eliminated_axiom_names, eliminated_theorem_names)
 
         # Record any imported theorem that is usable as a "presumptions"
         # stored in a presumptions.txt file that should be allowable
@@ -2914,31 +3410,28 @@ class StoredTheorem(StoredSpecialStmt):
         this update causes a dependent to become complete, propagate the
         news onward.
         '''
-        from .theory import Theory, TheoryException
-        self._markIfComplete()
-        if self.is_complete():
-            # This theorem has been completely proven.
-            # Let the dependents know.
-            dependent_theorems = self.read_dependent_theorems()
-            for dependent in dependent_theorems:
-                try:
-                    stored_dependent = Theory.get_stored_theorem(dependent)
-                except (KeyError, TheoryException):
-                    # Dependent was removed; skip it.
-                    continue
-                # propagate this recursively in case self's theorem was
-                # the final  theorem to complete the dependent
-                stored_dependent._propagateCompletion()
+        from ._dependency_index import DependencyIndex
+        DependencyIndex.propagate_completion(str(self))
 
-    def _markIfComplete(self):
+    @staticmethod
+    def _mark_completions(theorem_names, complete):
         '''
-        If all of the used theorems are complete, this is now complete.
+        Add (if complete is True) or remove (otherwise) the empty
+        'complete' files that mark the completion of the given theorems
+        (full names).
         '''
-        from .theory import Theory
-        if all(Theory.get_stored_theorem(used_theorem).is_complete() for
-               used_theorem in self.read_used_theorems()):
-            # An empty 'complete' file marks the completion.
-            open(os.path.join(self.path, 'complete'), 'w')
+        from .theory import Theory, TheoryException
+        for theorem_name in theorem_names:
+            try:
+                stored_theorem = Theory.get_stored_theorem(theorem_name)
+            except (KeyError, TheoryException):
+                # The theorem was removed; skip it.
+                continue
+            complete_filename = os.path.join(stored_theorem.path, 'complete')
+            if complete:
+                open(complete_filename, 'w').close()
+            else:
+                remove_if_exists(complete_filename)
 
     def remove_proof(self):
         '''
@@ -2946,6 +3439,7 @@ class StoredTheorem(StoredSpecialStmt):
         obsolete links/references.
         '''
         from .theory import Theory, TheoryException
+        from ._dependency_index import DependencyIndex
         # Remove obsolete used-by links that refer to this theorem by
         # its old proof.
         prev_used_axiom_names, prev_used_theorem_names = (
@@ -2962,11 +3456,18 @@ class StoredTheorem(StoredSpecialStmt):
                     used_theorem)._removeUsedByEntry(str(self))
             except (KeyError, TheoryException):
                 pass  # If it doesn't exist, never mind.
-        # If it was previously complete before, we need to erase the
-        # completion marker and inform dependents that it is not longer
-        # complete.
-        self._undoDependentCompletion()
-        # remove 'proof.pv_it', 'used_axioms.txt', 'used_theorems.txt',
+        # Remove the proof files.  If it was previously complete
+        # before, we need to erase the completion markers of dependents
+        # that are no longer complete.
+        DependencyIndex.of_stmt(str(self)).remove_proof(self)
+
+    def _remove_proof_files(self):
+        '''
+        Remove the 'complete', 'proof.pv_it', 'used_*.txt' and
+        'eliminated_*.txt' files of this theorem (called by
+        DependencyIndex.remove_proof).
+        '''
+        remove_if_exists(os.path.join(self.path, 'complete'))
         remove_if_exists(os.path.join(self.path, 'proof.pv_it'))
         remove_if_exists(os.path.join(self.path, 'used_axioms.txt'))
         remove_if_exists(os.path.join(self.path, 'used_theorems.txt'))
@@ -3020,6 +3521,7 @@ class StoredTheorem(StoredSpecialStmt):
         a tuple.
         '''
         from .theory import Theory
+        from ._dependency_index import DependencyIndex
         if excluded_names is None: excluded_names = frozenset()
         if len(theorems) == 1:
             # When there are axioms/theorems to be eliminated
@@ -3047,28 +3549,36 @@ class StoredTheorem(StoredSpecialStmt):
         required_conservative_definitions = set()
         processed = set()
         to_process = set([str(theorem) for theorem in theorems])
+        required_axiom_names = set()
         while len(to_process) > 0:
             next_theorem_name = to_process.pop()
             if next_theorem_name in excluded_names:
                 continue # excluded
             processed.add(next_theorem_name)
-            next_theorem = Theory.find_theorem(next_theorem_name)
-            stored_theorem = Theory.get_stored_theorem(next_theorem_name)
-            if (next_theorem.proven_truth.expr in dead_end_theorem_exprs or
-                    not stored_theorem.has_proof()):
+            # Read the dependencies from the index rather than the
+            # __pv_it folders.
+            (has_proof, used_axiom_names, used_theorem_names,
+             _eliminated_axiom_names, _eliminated_theorem_names) = (
+                 DependencyIndex.of_stmt(next_theorem_name).theorem_info(
+                     next_theorem_name))
+            # Only make the theorem when it is needed.
+            if not has_proof or (
+                    len(dead_end_theorem_exprs) > 0 and
+                    Theory.find_theorem(next_theorem_name).proven_truth.expr
+                    in dead_end_theorem_exprs):
                 # This is a dead-end or unproven theorem.  Mark it
                 # as such and go no further on this path.
-                required_deadend_theorems.add(next_theorem)
+                required_deadend_theorems.add(
+                    Theory.find_theorem(next_theorem_name))
                 continue
             if len(eliminated_axiom_names)==len(eliminated_theorem_names)==0:
-                _eliminated_axiom_names, _eliminated_theorem_names = (
-                    stored_theorem.read_eliminated_axioms(),
-                    stored_theorem.read_eliminated_theorems())
                 if (len(_eliminated_axiom_names) > 0 or
                         len(_eliminated_theorem_names) > 0):
                     # When there are eliminated axioms or theorems, we
                     # must call all_requirements recursively to make
                     # sure we do the elimination properly.
+                    stored_theorem = Theory.get_stored_theorem(
+                        next_theorem_name)
                     _req_axioms, _req_theorems, _required_cons_defs = (
                         stored_theorem.all_requirements(
                             dead_end_theorem_exprs=dead_end_theorem_exprs,
@@ -3078,16 +3588,14 @@ class StoredTheorem(StoredSpecialStmt):
                     required_conservative_definitions.update(
                             _required_cons_defs)
                     continue
-            used_axiom_names, used_theorem_names = (
-                stored_theorem.read_used_axioms(),
-                stored_theorem.read_used_theorems())
-            required_axioms.update({Theory.find_axiom(name) for name
-                                    in used_axiom_names
-                                    if name not in excluded_names})
+            required_axiom_names.update(name for name in used_axiom_names
+                                        if name not in excluded_names)
             for used_theorem_name in used_theorem_names:
                 if used_theorem_name not in processed:
                     if used_theorem_name not in excluded_names:
                         to_process.add(used_theorem_name)
+        required_axioms.update(Theory.find_axiom(name) for name
+                               in required_axiom_names)
         return (required_axioms, required_deadend_theorems,
                 required_conservative_definitions)
 
@@ -3230,21 +3738,3 @@ class StoredTheorem(StoredSpecialStmt):
                 new_to_process = stored_theorem.read_used_theorems()
             to_process.update(set(new_to_process) - names)
         return names
-
-    def _undoDependentCompletion(self):
-        '''
-        Due to the proof being removed, a dependent theorem is no longer
-        complete. This new status must be updated and propagated.
-        '''
-        from .theory import Theory
-        was_complete = self.is_complete()  # was it complete before?
-        # Remove the 'complete' file indicating that it was no longer
-        # complete.
-        remove_if_exists(os.path.join(self.path, 'complete'))
-        # If this theorem was previously complete before, we need to
-        # inform dependents that it is not longer complete.
-        if was_complete:
-            dependent_theorems = self.read_dependent_theorems()
-            for dependent in dependent_theorems:
-                stored_thm = Theory.get_stored_theorem(dependent)
-                stored_thm._undoDependentCompletion()
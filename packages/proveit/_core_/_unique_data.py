@@ -2,8 +2,23 @@
 Generic utilities for Expression, Judgment, and Proof objects --
 the standard Prove-It objects that are stored and have dependencies
 between them.
+
+The unique data tables only hold weak references so that the data of
+Prove-It objects that are no longer referenced (e.g., by a live
+Judgment or Proof) is released.  A unique id is only guaranteed to be
+unique among live data; it may be reused after its data is released.
+
+Unique ids are derived from a stable hash of the unique representation
+(see stable_hash) rather than Python's hash() of strings, which varies
+with PYTHONHASHSEED.  Barring (very unlikely) collisions, the same
+Expression therefore has the same meaning/style ids, and sorting by
+hash (canonical forms, sorted assumptions) gives the same order, in
+any process.
 '''
 
+from hashlib import blake2b
+from weakref import WeakValueDictionary
+
 
 class _MeaningData:
     '''
@@ -11,7 +26,8 @@ class _MeaningData:
     that can be shared among different instances that have the same "meaning"
     -- same structure independent of style.
     '''
-    unique_id_map = dict()  # map _unique_id's to UniqueData objects
+    unique_id_map = WeakValueDictionary()  # map _unique_id's to UniqueData objects
+    unique_rep_map = WeakValueDictionary()  # map _unique_rep's to UniqueData objects
 
     def __init__(self, unique_id, unique_rep):
         self._unique_id = unique_id
@@ -27,7 +43,8 @@ class _StyleData:
     Expression, Judgment, or Proof.
     '''
 
-    unique_id_map = dict()  # map _unique_id's to UniqueData objects
+    unique_id_map = WeakValueDictionary()  # map _unique_id's to UniqueData objects
+    unique_rep_map = WeakValueDictionary()  # map _unique_rep's to UniqueData objects
 
     def __init__(self, unique_id, unique_rep):
         self._unique_id = unique_id
@@ -36,21 +53,69 @@ class _StyleData:
     def __hash__(self):
         return self._unique_id
 
+# Stable hashes of (short) strings, which tend to recur in the unique
+# representations (class paths, core info, style names and values).
+_str_hashes = dict()
+_max_cached_str_len = 256
+
+
+def _stable_str_hash(string):
+    str_hash = _str_hashes.get(string)
+    if str_hash is None:
+        digest = blake2b(string.encode('utf-8'), digest_size=8).digest()
+        # Pass the 64-bit digest through hash() to reduce it in the
+        # same (deterministic) way as any other int.
+        str_hash = hash(int.from_bytes(digest, 'little', signed=True))
+        if len(string) <= _max_cached_str_len:
+            _str_hashes[string] = str_hash
+    return str_hash
+
+
+# The stable_hash of None.
+_NONE_HASH = 0x4e6f6e65
+
+
+def stable_hash(unique_rep):
+    '''
+    Return a hash of the unique representation (a string or nested
+    tuples of strings, ints, None, and other numbers) that does not
+    depend upon PYTHONHASHSEED.  Python's hash() is already
+    deterministic for numbers and for tuples of them, so only strings
+    and None (whose hash is based on its address on Python 3.11 and
+    earlier) need explicit encodings.
+    '''
+    if unique_rep is None:
+        return _NONE_HASH
+    rep_type = type(unique_rep)
+    if rep_type is tuple:
+        return hash(tuple([item if type(item) is int else
+                           stable_hash(item) for item in unique_rep]))
+    if rep_type is str:
+        str_hash = _str_hashes.get(unique_rep)
+        if str_hash is None:
+            return _stable_str_hash(unique_rep)
+        return str_hash
+    return hash(unique_rep)
+
+
 def unique_data(DataClass, unique_rep):
     '''
     Find or create unique data that has the given unique representation.
+    The unique representation may be a string or any hashable key (such
+    as the structural tuples used for Expression objects).
     '''
-    unique_id = hash(unique_rep)
-    while unique_id in DataClass.unique_id_map and DataClass.unique_id_map[
-            unique_id]._unique_rep != unique_rep:
-        unique_id += 1
-    if unique_id in DataClass.unique_id_map:
-        unique_data = DataClass.unique_id_map[unique_id]
-        assert unique_data._unique_rep == unique_rep
+    unique_data = DataClass.unique_rep_map.get(unique_rep)
+    if unique_data is not None:
         return unique_data  # return an existing UniqueData object for the unique_rep
-    # create new UniqueData object for the unique_rep
+    # create new UniqueData object for the unique_rep with an id that
+    # is not used by any live UniqueData object.
+    unique_id_map = DataClass.unique_id_map
+    unique_id = stable_hash(unique_rep)
+    while unique_id in unique_id_map:
+        unique_id += 1
     unique_data = DataClass(unique_id, unique_rep)
-    DataClass.unique_id_map[unique_id] = unique_data
+    unique_id_map[unique_id] = unique_data
+    DataClass.unique_rep_map[unique_rep] = unique_data
     return unique_data
 
 
@@ -63,7 +128,17 @@ def style_data(unique_rep):
 
 
 def clear_unique_data():
-    _MeaningData.unique_id_map.clear()
-    _StyleData.unique_id_map.clear()
+    for DataClass in (_MeaningData, _StyleData):
+        DataClass.unique_id_map.clear()
+        DataClass.unique_rep_map.clear()
+
+
+def unique_data_sizes():
+    '''
+    Return the number of live entries of the "meaning" and "style"
+    data tables.
+    '''
+    return {'meaning_data': len(_MeaningData.unique_id_map),
+            'style_data': len(_StyleData.unique_id_map)}
 
 
@@ -22,6 +22,15 @@ class Defaults:
         self.sideeffect_automation = True
         self.conclude_automation = True
 
+        # When True, side-effects of new proofs are queued and derived
+        # lazily (see proveit._core_._side_effect_queue) rather than
+        # right away.  Each lazy drain of the queue derives the
+        # side-effects of at most 'sideeffect_budget' proofs within
+        # 'sideeffect_time_budget' seconds (None for no limit).
+        self.defer_sideeffects = False
+        self.sideeffect_budget = 100
+        self.sideeffect_time_budget = 0.5
+
         # Display LaTeX versions of expressions.
         self.display_latex = True
 
@@ -99,6 +108,14 @@ class Defaults:
         # Put expression pngs inline versus using links.
         self.inline_pngs = True
 
+        # The pngs of expressions that are displayed together (e.g.,
+        # the steps of a proof) are generated in batches of up to
+        # 'png_batch_size' expressions compiled as one LaTeX document,
+        # with up to 'png_workers' batches at a time (None for the
+        # number of CPUs).  A 'png_batch_size' of 1 disables batching.
+        self.png_batch_size = 32
+        self.png_workers = None
+
         # Will be set to a (theory, kind) object when a common
         # expressions, axioms, or theorms notebook is being executed.
         self._running_theory_notebook = None
@@ -449,6 +466,11 @@ class SimplificationDirectives:
                         "%s is not a simplification directive for %s"
                         %(key, self._expr_class))
         self.__dict__[key] = value
+        if key[0] != '_':
+            # Failed proof attempts may succeed with different
+            # directives.
+            from proveit._core_.expression.expr import Expression
+            Expression._forget_failed_attempts()
     
     def temporary(self, use_defaults=False):
         '''
@@ -1,5 +1,3 @@
-import more_itertools
-
 from proveit._core_.expression.expr import (Expression, MakeNotImplemented,
                                             ImproperReplacement,
                                             free_vars)
@@ -1173,7 +1171,7 @@ class ExprRange(Expression):
         return '%s%s' % (between_count.formatted(format_type, fence=True),
                          repeats_str)
 
-    def _free_var_ranges(self, exclusions=None):
+    def _build_free_var_ranges(self, exclusions=None):
         '''
         Return the dictionary mapping Variables to forms w.r.t. ranges
         of indices (or solo) in which the variable occurs as free
@@ -1500,6 +1498,7 @@ class ExprRange(Expression):
         from proveit.logic import Equals, InSet
         from proveit.numbers import (Add, subtract, one, Interval,
                                      Integer, quick_simplified_index)
+        import more_itertools
 
         if len(repl_map) > 0 and (self in repl_map):
             # The full expression is to be replaced.
@@ -2,23 +2,26 @@
 This is the expression module.
 """
 
-from proveit.util import OrderedSet
 from proveit._core_.defaults import (defaults, USE_DEFAULTS, 
                                      SimplificationDirectives)
 from proveit._core_.theory import Theory
 from proveit._core_.expression.style_options import StyleOptions
 from proveit._core_._unique_data import meaning_data, style_data
+from proveit._core_._knowledge import KnowledgeRegistry
 from proveit.decorators import (
     prover, relation_prover, equality_prover,
     _equality_prover_fn_to_tenses)
 import sys
 import re
 import inspect
-import urllib.request
-import urllib.parse
-import urllib.error
 from base64 import encodebytes
 from copy import copy
+from operator import attrgetter
+from weakref import WeakKeyDictionary, WeakValueDictionary
+
+# Used to obtain sub-expression ids for Expression._generate_unique_key.
+_labeled_meaning_id_of = attrgetter('_labeled_meaning_id')
+_style_id_of = attrgetter('_style_id')
 
 class ExprType(type):
     '''
@@ -177,13 +180,45 @@ class Expression(metaclass=ExprType):
     # in progress. Tracked to prevent infinite recursion.
     in_progress_to_check_provability = set()
 
-    # Map "labeled" meaning data to "canonical" meaning data.
-    labeled_to_canonical_meaning_data = dict()
+    # Map (expression, sorted assumptions, automation settings) keys
+    # to the ProofFailure of an automated 'prove' attempt, and keep
+    # the (expression, sorted assumptions, must_be_direct, automation
+    # settings) keys of 'readily_provable' checks that returned False
+    # (see Expression._automation_settings).  These are
+    # forgotten whenever something new is proven (see
+    # Expression._forget_failed_attempts).
+    failed_proof_attempts = dict()
+    failed_provability_checks = set()
+    
+    # Incremented when a recursion guard blocks an attempt.  A failure
+    # is only remembered when this did not happen and nothing new
+    # became known (KnowledgeRegistry.epoch did not advance) during
+    # the attempt (a failure due to a blocked recursion may not be a
+    # failure in a different context).
+    num_blocked_attempts = 0
+
+    # When side-effects are deferred (see defaults.defer_sideeffects),
+    # those of proven expressions with lower priorities are derived
+    # first.
+    sideeffect_priority = 0
+
+    # Map "labeled" meaning data to "canonical" meaning data (or to
+    # None when they are the same).  Entries are released along with
+    # the "labeled" meaning data.
+    labeled_to_canonical_meaning_data = WeakKeyDictionary()
     
-    # Map canonincal forms to sets of expressions with that canonical
-    # form and vice-versa.
-    canonical_form_to_exprs = dict()    
-    expr_to_canonical_form = dict()
+    # Map canonincal forms to (ordered) expressions with that canonical
+    # form, keyed by meaning id, and vice-versa (mapping to None for an
+    # expression that is its own canonical form).  Entries are
+    # released along with the expressions.
+    canonical_form_to_exprs = WeakKeyDictionary()
+    expr_to_canonical_form = WeakKeyDictionary()
+
+    # The version of the canonical forms that are recorded in storage
+    # (see TheoryFolderStorage.record_canonical_form).  Increment this
+    # whenever any _build_canonical_form changes so that recorded
+    # canonical forms from before are disregarded.
+    canonical_form_version = 1
 
     # Map Expression classes to their proper paths (as returned
     # by the Expression._class_path method).
@@ -218,6 +253,7 @@ class Expression(metaclass=ExprType):
                 "Unexpected remnant 'in_progress_to_check_provability'"
                 "items (should have been temporary)")
         Expression.labeled_to_canonical_meaning_data.clear()
+        Expression._forget_failed_attempts()
         Expression.canonical_form_to_exprs.clear()
         Expression.expr_to_canonical_form.clear()
         Expression.class_paths.clear()
@@ -266,9 +302,11 @@ class Expression(metaclass=ExprType):
         # to equivalent expressions which use the same lambda labels.
         # This isn't the "true" meaning data which is based upon using
         # "canonical" lambda labels.
-        def object_rep_fn(expr): return hex(expr._labeled_meaning_id)
+        # These are interned via structural keys (see _generate_unique_key)
+        # rather than unique representation strings; the string is only
+        # generated when the expression is stored.
         self._labeled_meaning_data = meaning_data(
-            self._generate_unique_rep(object_rep_fn, core_info))
+            self._generate_unique_key(_labeled_meaning_id_of, core_info))
         if not hasattr(self._labeled_meaning_data, '_core_info'):
             # initialize the data of self._labeledMeaningData
             self._labeled_meaning_data._core_info = tuple(core_info)
@@ -303,8 +341,8 @@ class Expression(metaclass=ExprType):
         # The style data is shared among Expressions with the same structure
         # and style -- this will contain the 'png' generated on demand.
         self._style_data = style_data(
-            self._generate_unique_rep(lambda expr: hex(expr._style_id),
-                core_info, styles, style_options))
+            self._generate_unique_key(_style_id_of, core_info, styles,
+                                      style_options))
         # initialize the style options
         # formatting style options that don't affect the meaning of the
         # expression
@@ -354,8 +392,11 @@ class Expression(metaclass=ExprType):
         if self._labeled_meaning_data in labeled_to_canonical_meaning_data:
             # Set the '_meaning_data' via '_labeled_meaning_data' and
             # 'labeled_to_canonical_meaning_data'.
-            self._meaning_data = (
+            _meaning_data = (
                 labeled_to_canonical_meaning_data[self._labeled_meaning_data])
+            if _meaning_data is None:
+                _meaning_data = self._labeled_meaning_data
+            self._meaning_data = _meaning_data
             self._meaning_id = self._meaning_data._unique_id
             # Now we can set the _canonically_labeled via the
             # '_meaning_data'.
@@ -421,23 +462,54 @@ class Expression(metaclass=ExprType):
         
         See _build_canonical_form: this method should be overriden by
         each Expression type for build type-specific canonical forms.
-        '''
-        if self in Expression.expr_to_canonical_form:
-            cf = Expression.expr_to_canonical_form[self]
+
+        Side-effect: when this expression is stored in the active
+        theory folder that the running notebook owns, a newly built
+        canonical form is stored as well and recorded in that folder's
+        canonical_forms.txt (see
+        TheoryFolderStorage.record_canonical_form) so that it may be
+        retrieved rather than rebuilt later.
+        '''
+        expr_to_canonical_form = Expression.expr_to_canonical_form
+        if self in expr_to_canonical_form:
+            cf = expr_to_canonical_form[self]
+            if cf is None:
+                cf = self # its own canonical form
         else:
-            cf = self._build_canonical_form()
-            Expression.expr_to_canonical_form[self] = cf
-            if cf in Expression.expr_to_canonical_form:
-                cf_of_cf = Expression.expr_to_canonical_form[cf]
-                if cf != cf_of_cf:
+            from proveit._core_._theory_storage import TheoryFolderStorage
+            # Use a canonical form that was recorded with the stored
+            # expression if there is one; otherwise, build it.
+            cf = TheoryFolderStorage.retrieve_canonical_form(self)
+            if cf is None:
+                cf = self._build_canonical_form()
+                TheoryFolderStorage.record_canonical_form(self, cf)
+            # (Map to None rather than to itself so the entry does not
+            # keep its weak key alive.)
+            expr_to_canonical_form[self] = None if cf == self else cf
+            if cf in expr_to_canonical_form:
+                cf_of_cf = expr_to_canonical_form[cf]
+                if cf_of_cf is not None and cf != cf_of_cf:
                     raise ValueError("Inconsistent canonical forms: %s vs %s"
                                      %(cf, cf_of_cf))
             else:
-                Expression.expr_to_canonical_form[cf] = cf
-            Expression.canonical_form_to_exprs.setdefault(
-                    cf, OrderedSet()).update({self, cf})
+                expr_to_canonical_form[cf] = None
+            exprs = Expression.canonical_form_to_exprs.setdefault(
+                    cf, WeakValueDictionary())
+            for expr in (self, cf):
+                exprs.setdefault(expr._establish_and_get_meaning_id(), expr)
         return cf
 
+    @staticmethod
+    def exprs_with_canonical_form(cf):
+        '''
+        Return the live expressions, that have been reported to
+        have the given canonical form, in the order they were reported.
+        '''
+        exprs = Expression.canonical_form_to_exprs.get(cf)
+        if exprs is None:
+            return []
+        return list(exprs.values())
+
     def _build_canonical_form(self):
         '''
         Build the canonical form of the Expression (see the
@@ -536,8 +608,11 @@ class Expression(metaclass=ExprType):
         # same "canonical meaning data".
         labeled_to_canonical_meaning_data = \
             Expression.labeled_to_canonical_meaning_data
-        labeled_to_canonical_meaning_data[self._labeled_meaning_data] = \
-            self._meaning_data
+        # (Map to None rather than to itself so the entry does not keep
+        # its weak key alive.)
+        labeled_to_canonical_meaning_data[self._labeled_meaning_data] = (
+            None if self._meaning_data is self._labeled_meaning_data
+            else self._meaning_data)
         self._meaning_id = self._meaning_data._unique_id
         return self._meaning_id
 
@@ -568,6 +643,31 @@ class Expression(metaclass=ExprType):
                                 ','.join(core_info), style_str)
     #self._class_path() + '[' + ','.join(core_info) + ']' + style_str + ';[' +  + ']'
 
+    def _generate_unique_key(self, object_id_fn, core_info=None,
+                             styles=None, style_options=None):
+        '''
+        Generate a hashable key with the same information as the
+        unique representation string of _generate_unique_rep, using
+        the given function to obtain the (integer) ids of the
+        sub-expressions.  This is used for interning the "labeled
+        meaning" and "style" data without building strings.
+        '''
+        if core_info is None:
+            core_info = self._core_info
+        if styles is None and hasattr(self, '_style_data'):
+            styles = self._style_data.styles
+            style_options = self.style_options()
+        if styles:
+            canonical_styles = style_options.canonical_styles()
+            style_key = tuple(
+                (style_name, styles[style_name]) for style_name
+                in sorted(styles.keys()) if styles[style_name] !=
+                canonical_styles.get(style_name, None))
+        else:
+            style_key = ()
+        return (tuple(map(object_id_fn, self._sub_expressions)),
+                self._class_path(), tuple(core_info), style_key)
+
     def _class_path(self):
         ExprClass = self.__class__
         if ExprClass in Expression.class_paths:
@@ -791,8 +891,8 @@ class Expression(metaclass=ExprType):
         """
         new_style_expr = copy(self)
         new_style_expr._style_data = style_data(
-            new_style_expr._generate_unique_rep(lambda expr: hex(expr._style_id),
-                styles=styles, style_options=style_options))
+            new_style_expr._generate_unique_key(
+                _style_id_of, styles=styles, style_options=style_options))
         new_style_expr._style_data.styles = dict(styles)
         new_style_expr._style_id = new_style_expr._style_data._unique_id
         return new_style_expr
@@ -889,9 +989,10 @@ class Expression(metaclass=ExprType):
         '''
         from proveit import Judgment, Assumption, ProofFailure
         from proveit.relation import Relation
-        from proveit.logic import Not, TRUE, Equals
+        from proveit._core_._profiling import ProveProfile
         assumptions = defaults.assumptions
         automation = defaults.conclude_automation
+        profile = ProveProfile.active
 
         if defaults.sideeffect_automation:
             # Generate assumption side-effects.
@@ -905,6 +1006,8 @@ class Expression(metaclass=ExprType):
         # See if this Expression already has a legitimate proof.
         found_truth = Judgment.find_judgment(self, assumptions)
         if found_truth is not None:
+            if profile is not None:
+                profile.hit('%s.prove' % self.__class__.__name__)
             # found an existing Judgment that does the job!
             return found_truth.with_matching_styles(
                 self, assumptions)  # give it the appropriate style
@@ -912,6 +1015,43 @@ class Expression(metaclass=ExprType):
         if not automation:
             raise ProofFailure(self, assumptions, "No pre-existing proof")
 
+        # Don't repeat an attempt that failed when nothing new has
+        # been proven since.
+        attempt_key = Expression._proof_attempt_key(self)
+        failed_proof_attempts = Expression.failed_proof_attempts
+        if attempt_key in failed_proof_attempts:
+            if profile is not None:
+                profile.hit('%s.prove' % self.__class__.__name__)
+            # Re-raise the original failure (of whichever ProofFailure
+            # class) with a fresh traceback.
+            raise failed_proof_attempts[attempt_key].with_traceback(None)
+        knowledge_epoch = KnowledgeRegistry.epoch
+        num_blocked_attempts = Expression.num_blocked_attempts
+        try:
+            if profile is not None:
+                name = '%s.prove' % self.__class__.__name__
+                profile.miss(name)
+                return profile.call(name, self._prove_via_automation)
+            return self._prove_via_automation()
+        except ProofFailure as failure:
+            if (attempt_key is not None and 
+                    knowledge_epoch == KnowledgeRegistry.epoch and
+                    num_blocked_attempts == 
+                    Expression.num_blocked_attempts):
+                failed_proof_attempts[attempt_key] = failure
+            raise
+
+    def _prove_via_automation(self):
+        '''
+        Helper for 'prove' to attempt to prove this expression, under
+        the default assumptions, via automation when there is no
+        pre-existing proof.
+        '''
+        from proveit import Judgment, ProofFailure
+        from proveit.logic import Not, TRUE, Equals
+        from proveit._core_._profiling import ProveProfile
+        assumptions = defaults.assumptions
+
         # See if this Expression already has an indirect legitimate proof
         # (proven under assumptions that have been proven by current 
         # assumptions).
@@ -925,7 +1065,14 @@ class Expression(metaclass=ExprType):
             return found_truth.with_matching_styles(
                 self, assumptions)  # give it the appropriate style
 
-        if not self._readily_provable():
+        profile = ProveProfile.active
+        if profile is not None:
+            readily_provable = profile.call(
+                '%s._readily_provable' % self.__class__.__name__,
+                self._readily_provable)
+        else:
+            readily_provable = self._readily_provable()
+        if not readily_provable:
             # See if this Expression can be proven indirectly (proven under
             # assumptions that are provable under current assumptions).
             found_truth = Judgment.find_judgment(self, assumptions,
@@ -968,6 +1115,7 @@ class Expression(metaclass=ExprType):
         # recursion
         in_progress_key = (self, defaults.sorted_assumptions)
         if in_progress_key in Expression.in_progress_to_conclude:
+            Expression.num_blocked_attempts += 1
             raise ProofFailure(
                 self,
                 assumptions,
@@ -1023,6 +1171,45 @@ class Expression(metaclass=ExprType):
         finally:
             Expression.in_progress_to_conclude.remove(in_progress_key)
 
+    @staticmethod
+    def _proof_attempt_key(expr):
+        '''
+        Return the key for remembering a failed attempt to prove the
+        expression under the current defaults, or None if such a
+        failure should not be remembered (when there are 
+        'replacements').
+        '''
+        if len(defaults.replacements) > 0:
+            return None
+        return (expr, defaults.sorted_assumptions,
+                Expression._automation_settings())
+
+    @staticmethod
+    def _automation_settings():
+        '''
+        Return the current defaults that affect what automation may
+        prove, for the keys of remembered failures.  (Changes to
+        simplification directives forget the failures instead; see
+        SimplificationDirectives.__setattr__.)
+        '''
+        return (defaults.conclude_automation, defaults.sideeffect_automation,
+                defaults.auto_simplify, defaults.preserve_all,
+                frozenset(defaults.preserved_exprs),
+                defaults.simplify_with_known_evaluations,
+                defaults.simplify_with_provable_evaluations)
+
+    @staticmethod
+    def _forget_failed_attempts():
+        '''
+        Forget failed attempts to prove expressions or check their
+        provability.  Called whenever something new is proven (or
+        simplification directives change) since that may make a
+        difference.
+        '''
+        KnowledgeRegistry.advance()
+        Expression.failed_proof_attempts.clear()
+        Expression.failed_provability_checks.clear()
+
     def proven(self, assumptions=USE_DEFAULTS):
         '''
         Return True if and only if the expression is known to be true.
@@ -1050,9 +1237,11 @@ class Expression(metaclass=ExprType):
         '''
         from proveit import Judgment, ExprTuple
         from proveit.logic import TRUE
+        from proveit._core_._profiling import ProveProfile
 
         if isinstance(self, ExprTuple):
             return False # An ExprTuple cannot be true or false.
+        profile = ProveProfile.active
 
         with defaults.temporary() as tmp_defaults:
             # Make sure we derive assumption side-effects first.
@@ -1083,17 +1272,42 @@ class Expression(metaclass=ExprType):
             if in_progress_key in Expression.in_progress_to_check_provability:
                 # avoid infinite recursion by using
                 # in_progress_to_check_provability
+                Expression.num_blocked_attempts += 1
                 return False
+            # Don't repeat a check that failed when nothing new has
+            # been proven since (unless there are special kwargs or
+            # replacements).
+            check_key = (
+                None if len(kwargs) > 0 or len(defaults.replacements) > 0
+                else in_progress_key + (
+                    must_be_direct, Expression._automation_settings()))
+            if check_key in Expression.failed_provability_checks:
+                if profile is not None:
+                    profile.hit('%s._readily_provable'
+                                % self.__class__.__name__)
+                return False
+            knowledge_epoch = KnowledgeRegistry.epoch
+            num_blocked_attempts = Expression.num_blocked_attempts
             try:
                 Expression.in_progress_to_check_provability.add(
                         in_progress_key)
                 if must_be_direct:
-                    return self._readily_provable(must_be_direct=True,
-                                                  **kwargs)
-                return self._readily_provable(**kwargs)
+                    kwargs = dict(kwargs, must_be_direct=True)
+                if profile is not None:
+                    name = '%s._readily_provable' % self.__class__.__name__
+                    profile.miss(name)
+                    provable = profile.call(name, self._readily_provable,
+                                            kwargs=kwargs)
+                else:
+                    provable = self._readily_provable(**kwargs)
             finally:
                 Expression.in_progress_to_check_provability.remove(
                         in_progress_key)
+            if (not provable and check_key is not None and
+                    knowledge_epoch == KnowledgeRegistry.epoch and
+                    num_blocked_attempts == Expression.num_blocked_attempts):
+                Expression.failed_provability_checks.add(check_key)
+            return provable
 
     def _readily_provable(self, **kwargs):
         '''
@@ -1680,14 +1894,32 @@ class Expression(metaclass=ExprType):
         expr_copy = self.basic_replaced({})
         return expr_copy
 
+    # The used Literals and Variables, contained parameter variables,
+    # free variables and free variable ranges (without exclusions) are
+    # computed once per "labeled" meaning (they don't depend upon
+    # styles but do depend upon lambda labels) and stored as frozensets
+    # on the shared _labeled_meaning_data.  They are composed
+    # bottom-up from those of the sub-expressions.  The _build_...
+    # methods do the actual work and may be overridden.
+
     def _used_literals(self):
         '''
         Return all of the used Literals of this Expression,
         included those in sub-expressions.
         Call externally via the used_literals method in expr.py.
         '''
-        return set().union(*[expr._used_literals() for
-                             expr in self._sub_expressions])
+        meaning_data = self._labeled_meaning_data
+        try:
+            return meaning_data._used_literals
+        except AttributeError:
+            pass
+        used_literals = frozenset(self._build_used_literals())
+        meaning_data._used_literals = used_literals
+        return used_literals
+
+    def _build_used_literals(self):
+        return frozenset().union(*[expr._used_literals() for
+                                   expr in self._sub_expressions])
 
     def _used_vars(self):
         '''
@@ -1695,16 +1927,36 @@ class Expression(metaclass=ExprType):
         included those in sub-expressions.
         Call externally via the used_vars method in expr.py.
         '''
-        return set().union(*[expr._used_vars() for
-                             expr in self._sub_expressions])
+        meaning_data = self._labeled_meaning_data
+        try:
+            return meaning_data._used_vars
+        except AttributeError:
+            pass
+        used_vars = frozenset(self._build_used_vars())
+        meaning_data._used_vars = used_vars
+        return used_vars
+
+    def _build_used_vars(self):
+        return frozenset().union(*[expr._used_vars() for
+                                   expr in self._sub_expressions])
 
     def _contained_parameter_vars(self):
         '''
         Return all of the Variables of this Expression that
         are parameter variables of a contained Lambda.
         '''
-        return set().union(*[expr._contained_parameter_vars() for
-                             expr in self._sub_expressions])
+        meaning_data = self._labeled_meaning_data
+        try:
+            return meaning_data._contained_parameter_vars
+        except AttributeError:
+            pass
+        param_vars = frozenset(self._build_contained_parameter_vars())
+        meaning_data._contained_parameter_vars = param_vars
+        return param_vars
+
+    def _build_contained_parameter_vars(self):
+        return frozenset().union(*[expr._contained_parameter_vars() for
+                                   expr in self._sub_expressions])
 
     def _free_var_ranges(self, exclusions=None):
         '''
@@ -1734,8 +1986,33 @@ class Expression(metaclass=ExprType):
         if x_{i, 1}, ..., x_{i, n_i} is in the exclusion set,
         then 'a' will be the only free variable reported.
 
+        The returned dictionary (mapping to frozensets) may be shared
+        and must not be modified.
+
         Call externally via the free_var_forms method in expr.py.
         '''
+        if exclusions:
+            # An exclusion can only make a difference if it shares a
+            # Variable with this Expression (excluding something
+            # without Variables removes no free variable forms).
+            used_vars = self._used_vars()
+            if not all(used_vars.isdisjoint(exclusion._used_vars())
+                       for exclusion in exclusions):
+                return self._build_free_var_ranges(exclusions)
+        meaning_data = self._labeled_meaning_data
+        try:
+            return meaning_data._free_var_ranges
+        except AttributeError:
+            pass
+        forms_dict = {var: frozenset(forms) for var, forms
+                      in self._build_free_var_ranges().items()}
+        meaning_data._free_var_ranges = forms_dict
+        return forms_dict
+
+    def _build_free_var_ranges(self, exclusions=None):
+        '''
+        Compute the dictionary returned by _free_var_ranges.
+        '''
         forms_dict = dict()
         if exclusions is not None and self in exclusions:
             return forms_dict  # this is excluded
@@ -1940,6 +2217,30 @@ class Expression(metaclass=ExprType):
             html += '</a>'
         return html
 
+    @staticmethod
+    def _prefetch_pngs(exprs):
+        '''
+        Recall or generate the png images of the given expressions that
+        _repr_html_ will need, generating missing ones in batches (see
+        proveit._core_._png_batch) rather than one at a time.  Used
+        before displaying many expressions together.
+        '''
+        if not defaults.display_latex:
+            return
+        pending = dict() # style data -> expression
+        for expr in exprs:
+            if not hasattr(expr._style_data, 'png'):
+                pending.setdefault(expr._style_data, expr)
+        if len(pending) < 2:
+            return # nothing to batch
+        pngs_and_urls = Theory._stored_pngs(
+            [(expr, expr.latex(), expr._config_latex_tool)
+             for expr in pending.values()])
+        for _style_data, (png, png_url) in zip(pending.keys(),
+                                               pngs_and_urls):
+            _style_data.png = png
+            _style_data.png_url = png_url
+
     def _config_latex_tool(self, lt):
         '''
         Configure the LaTeXTool from IPython.lib.latextools as required by all
@@ -2030,16 +2331,22 @@ def free_vars(expr):
     restriction is satisfied.
     Axioms and theorems must not have any variables that are
     entirely free.
+    The returned frozenset is cached on the "labeled" meaning data.
     '''
     from proveit._core_.expression.label.var import Variable
     from proveit._core_.expression.lambda_expr.lambda_expr import Lambda
     if isinstance(expr, Variable):
-        return {expr}
-    fvars = set()
-    for sub_expr in expr._sub_expressions:
-        fvars.update(free_vars(sub_expr))
+        return frozenset({expr})
+    meaning_data = expr._labeled_meaning_data
+    try:
+        return meaning_data._free_vars
+    except AttributeError:
+        pass
+    fvars = frozenset().union(*[free_vars(sub_expr) for sub_expr
+                                in expr._sub_expressions])
     if isinstance(expr, Lambda):
-        return fvars.difference(expr.parameter_vars)
+        fvars = fvars.difference(expr.parameter_vars)
+    meaning_data._free_vars = fvars
     return fvars
 
 
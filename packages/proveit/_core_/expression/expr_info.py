@@ -105,6 +105,7 @@ class ExpressionInfo:
         return repr(self)
 
     def _repr_html_(self):
+        from .expr import Expression
         from .composite import ExprTuple, ExprArray, NamedExprs, ExprRange
         from .operation import Operation, IndexedVar
         from .conditional import Conditional
@@ -116,6 +117,7 @@ class ExpressionInfo:
         expr_num_map = {
             expr: k for k,
             expr in enumerate(enumerated_expressions)}
+        Expression._prefetch_pngs(enumerated_expressions)
 
         # generate the html as a table with the enumerated expressions on the
         # rows.
@@ -73,7 +73,7 @@ class Literal(Label):
             "'instance' method has not been implemented for a Literal of type %s" %
             str(literal_class))
 
-    def _used_literals(self):
+    def _build_used_literals(self):
         return {self}
 
     def as_variable(self):
@@ -50,10 +50,10 @@ class Variable(Label):
             return subbed
         return self
 
-    def _used_vars(self):
+    def _build_used_vars(self):
         return {self}
 
-    def _free_var_ranges(self, exclusions=None):
+    def _build_free_var_ranges(self, exclusions=None):
         '''
         Return the dictionary mapping Variables to forms w.r.t. ranges
         of indices (or solo) in which the variable occurs as free
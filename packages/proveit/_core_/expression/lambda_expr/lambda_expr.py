@@ -1306,7 +1306,7 @@ class Lambda(Expression):
             forms_dict.pop(param_var, None)
         return forms_dict
 
-    def _free_var_ranges(self, exclusions=None):
+    def _build_free_var_ranges(self, exclusions=None):
         '''
         Return the dictionary mapping Variables to forms w.r.t. ranges
         of indices (or solo) in which the variable occurs as free
@@ -1325,7 +1325,7 @@ class Lambda(Expression):
             self.parameters, self.parameter_vars, self.body,
             exclusions=exclusions)
 
-    def _contained_parameter_vars(self):
+    def _build_contained_parameter_vars(self):
         '''
         Return all of the Variables of this Expression that
         are parameter variables of a contained Lambda.
@@ -100,7 +100,7 @@ class IndexedVar(Function):
                 return '(' + result + ')'
         return result
 
-    def _free_var_ranges(self, exclusions=None):
+    def _build_free_var_ranges(self, exclusions=None):
         '''
         Return the dictionary mapping Variables to forms w.r.t. ranges
         of indices (or solo) in which the variable occurs as free
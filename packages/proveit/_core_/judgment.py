@@ -11,6 +11,8 @@ from proveit._core_.expression import Expression
 from proveit._core_._unique_data import meaning_data, style_data
 from proveit.decorators import prover
 from .defaults import defaults, USE_DEFAULTS
+from ._side_effect_queue import SideEffectQueue
+from ._knowledge import KnowledgeRegistry
 import re
 from copy import copy
 from inspect import signature, Parameter
@@ -69,9 +71,61 @@ class _ExprProofs:
         return best_unusable_proof  
 
 
+class _ExprJudgments(set):
+    '''
+    The set of Judgments for a particular expression under various
+    assumptions, indexed by assumption so the Judgments whose
+    assumptions are a subset of given assumptions may be found
+    without scanning all of them.
+    '''
+
+    def __init__(self):
+        set.__init__(self)
+        # Map each assumption to the Judgments (in the order they were
+        # added) whose assumptions include it.
+        self._by_assumption = dict()
+        # Judgments without any assumptions.
+        self._unconditional = []
+
+    def add(self, judgment):
+        if judgment in self:
+            return
+        set.add(self, judgment)
+        assumptions = judgment.assumptions
+        if len(assumptions) == 0:
+            self._unconditional.append(judgment)
+        elif len(assumptions) == 1 and (
+                next(iter(assumptions)) == judgment.expr):
+            # A simple Assumption proof is never found by
+            # Judgment.find_judgment (avoiding infinite recursion).
+            return
+        else:
+            for assumption in assumptions:
+                self._by_assumption.setdefault(assumption, []).append(
+                    judgment)
+
+    def judgments_within(self, assumptions):
+        '''
+        Yield the Judgments whose assumptions are a subset of the given
+        assumptions, excluding simple Assumption proofs.
+        '''
+        yield from self._unconditional
+        by_assumption = self._by_assumption
+        # Count how many of each Judgment's assumptions are among
+        # the given assumptions; all of them must be.
+        counts = dict()
+        for assumption in set(assumptions):
+            for judgment in by_assumption.get(assumption, ()):
+                count = counts.get(judgment, 0) + 1
+                counts[judgment] = count
+                if count == len(judgment.assumptions):
+                    yield judgment
+
+
 class Judgment:
     # expr_to_judgments maps each Expression to a set of Judgments for
-    # proving the Expression under various assumptions.
+    # proving the Expression under various assumptions (as an
+    # _ExprJudgments set, indexed by assumption).
     expr_to_judgments = dict()
 
     # Map canonical form Expressions to sets of proven Expressions
@@ -118,6 +172,7 @@ class Judgment:
         Judgment.presumed_theorems_and_dependencies = None
         Judgment.qed_in_progress = False
         _ExprProofs.all_expr_proofs.clear()
+        KnowledgeRegistry._clear_()
         assert len(Judgment.in_progress_to_derive_sideeffects) == 0, (
                 "Unexpected remnant 'in_progress_to_derive_sideeffects' "
                 "items (should have been temporary)")
@@ -231,7 +286,7 @@ class Judgment:
         from this truth.  Called after the corresponding Proof is 
         complete.
         '''
-        from .proof import ProofFailure, UnsatisfiedPrerequisites
+        from ._profiling import ProveProfile
         if not defaults.sideeffect_automation:
             return  # automation disabled
         if Judgment.theorem_being_proven == self:
@@ -241,26 +296,40 @@ class Judgment:
             # in_progress_to_deduce_sideeffects
             Judgment.in_progress_to_derive_sideeffects.add(self)
             try:
-                for side_effect in self.expr.side_effects(self):
-                    # Attempt each side-effect derivation, specific to 
-                    # thetype of Expression.
-                    try:
-                        # use the default assumptions which are 
-                        # temporarily set to the assumptions utilized
-                        # in the last derivation step.
-                        side_effect()
-                    except (ProofFailure, UnsatisfiedPrerequisites):
-                        pass
-                    except Exception as e:
-                        raise Exception(
-                            "Side effect failure for %s, while running %s: " %
-                            (str(
-                                self.expr),
-                                str(side_effect)) +
-                            str(e))
+                profile = ProveProfile.active
+                if profile is not None:
+                    profile.call('%s.side_effects'
+                                 % self.expr.__class__.__name__,
+                                 self._derive_each_side_effect)
+                else:
+                    self._derive_each_side_effect()
             finally:
                 Judgment.in_progress_to_derive_sideeffects.remove(self)
 
+    def _derive_each_side_effect(self):
+        '''
+        Helper for derive_side_effects to attempt each side-effect
+        derivation of the expression.
+        '''
+        from .proof import ProofFailure, UnsatisfiedPrerequisites
+        for side_effect in self.expr.side_effects(self):
+            # Attempt each side-effect derivation, specific to 
+            # thetype of Expression.
+            try:
+                # use the default assumptions which are 
+                # temporarily set to the assumptions utilized
+                # in the last derivation step.
+                side_effect()
+            except (ProofFailure, UnsatisfiedPrerequisites):
+                pass
+            except Exception as e:
+                raise Exception(
+                    "Side effect failure for %s, while running %s: " %
+                    (str(
+                        self.expr),
+                        str(side_effect)) +
+                    str(e))
+
     def order_of_appearance(self, sub_expressions):
         '''
         Yields the given sub-Expressions in the order in which they
@@ -516,13 +585,15 @@ class Judgment:
                 self._meaning_data._proof = newproof
             return
         self._expr_proofs.insert(newproof)
+        # Failed attempts to prove things may succeed now.
+        Expression._forget_failed_attempts()
 
         # Check to see if the new proof is applicable to any other 
         # Judgment.  It can replace an old proof if it became unusable 
         # or if the newer one uses fewer steps.
         #newproof_numsteps = newproof.num_steps()
-        expr_judgments = Judgment.expr_to_judgments.setdefault(self.expr, 
-                                                               set())
+        expr_judgments = Judgment.expr_to_judgments.setdefault(
+            self.expr, _ExprJudgments())
         expr_judgments.add(self)
         for expr_judgment in expr_judgments:
             if expr_judgment.num_lit_gen != self.num_lit_gen:
@@ -734,21 +805,63 @@ class Judgment:
         allow_indirect_provable_assumptions is True, it's assumptions are 
         provable under the given assumptions.
         Return None if there is no match.
+
+        If there is no match but side-effects are pending in the
+        SideEffectQueue, drain those that may derive facts about the
+        expression (within the default budget) and try again.
+        '''
+        judgment = Judgment._find_judgment(
+            expression, assumptions,
+            allow_indirect_proven_assumptions=(
+                allow_indirect_proven_assumptions),
+            allow_indirect_provable_assumptions=(
+                allow_indirect_provable_assumptions))
+        if judgment is None:
+            if SideEffectQueue.drain(relevant_to=expression) == 0:
+                return None
+            judgment = Judgment._find_judgment(
+                expression, assumptions,
+                allow_indirect_proven_assumptions=(
+                    allow_indirect_proven_assumptions),
+                allow_indirect_provable_assumptions=(
+                    allow_indirect_provable_assumptions))
+        if judgment is not None:
+            SideEffectQueue._note_used(judgment)
+        return judgment
+
+    @staticmethod
+    def _find_judgment(expression, assumptions, *,
+                       allow_indirect_proven_assumptions,
+                       allow_indirect_provable_assumptions):
+        '''
+        Helper for find_judgment that doesn't drain the
+        SideEffectQueue.
         '''
         if expression not in Judgment.expr_to_judgments:
             return None
         truths = Judgment.expr_to_judgments[expression]
         suitable_truths = []
-        
-        for truth in truths:
-            if len(truth.assumptions)==1 and  (
-                    next(iter(truth.assumptions)) == truth.expr):
-                # Must be a simple Assumption proof.
-                continue # Avoids infinite recursion.
+
+        # Use the assumption index to find the Judgments whose
+        # assumptions are a subset of the given assumptions.
+        for truth in truths.judgments_within(assumptions):
             proof = truth.proof()
             if proof is not None and proof.is_possibly_usable():
+                suitable_truths.append(truth)
+
+        if (allow_indirect_proven_assumptions or
+                allow_indirect_provable_assumptions):
+            # Judgments with other assumptions may apply indirectly.
+            for truth in truths:
+                if len(truth.assumptions)==1 and  (
+                        next(iter(truth.assumptions)) == truth.expr):
+                    # Must be a simple Assumption proof.
+                    continue # Avoids infinite recursion.
+                proof = truth.proof()
+                if proof is None or not proof.is_possibly_usable():
+                    continue
                 if truth.assumptions.issubset(assumptions):
-                    suitable_truths.append(truth)
+                    continue # already found via the index
                 elif allow_indirect_proven_assumptions and all(
                         _assumption.proven(assumptions=assumptions) for
                         _assumption in truth.assumptions):
@@ -756,7 +869,7 @@ class Judgment:
                 elif allow_indirect_provable_assumptions and all(
                         _assumption.readily_provable(assumptions=assumptions)
                         for _assumption in truth.assumptions):
-                    suitable_truths.append(truth)                    
+                    suitable_truths.append(truth)
         if len(suitable_truths) == 0:
             return None  # no suitable truth
         # return one with the shortest proof, and among those the fewest
@@ -1383,6 +1496,7 @@ class Judgment:
             return None  # No LaTeX display at this time.
         if not self.is_usable():
             self.raise_unusable_proof()
+        Expression._prefetch_pngs(list(self.assumptions) + [self.expr])
         html = ''
         proof = self.proof()
         html += '<span style="font-size:20px;">'
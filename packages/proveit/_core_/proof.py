@@ -8,17 +8,57 @@ Proof objects form a DAG.
 """
 
 from collections import OrderedDict, deque
+import heapq
 import re
 import sys
+import weakref
 from proveit._core_.judgment import Judgment
+from proveit._core_.expression import Expression
 from proveit._core_._unique_data import meaning_data, style_data
 from .defaults import defaults, USE_DEFAULTS
 from .theory import Theory
+from ._side_effect_queue import SideEffectQueue
+from ._knowledge import KnowledgeRegistry
+from ._shared_bitset import SharedBitset
 from proveit.util import OrderedSet
 
 
+class _BitIndices:
+    '''
+    Allocates bit indices to "meaning" data objects for the sets of
+    transitive requirements (see Proof._requirement_sets).  The index of an object is released
+    along with the object and reused (lowest first) so indices stay
+    about as large as the number of live objects.
+    '''
+
+    def __init__(self):
+        self._released = []  # heap of released indices
+        self._num_allocated = 0
+
+    def index(self, data):
+        '''
+        Return the bit index of the given meaning data, allocating it
+        as needed.
+        '''
+        index = getattr(data, '_bit_index', None)
+        if index is None:
+            if len(self._released) > 0:
+                index = heapq.heappop(self._released)
+            else:
+                index = self._num_allocated
+                self._num_allocated += 1
+            data._bit_index = index
+            weakref.finalize(data, heapq.heappush, self._released, index)
+        return index
+
+
 class Proof:
 
+    # Bit indices of Proof and Judgment meaning data for the sets of
+    # transitive requirements (see Proof._requirement_sets).
+    _proof_bits = _BitIndices()
+    _truth_bits = _BitIndices()
+
     # (Expression, sorted assumptions) pairs for which 
     # derive_side_effects has been called.  We track this to make sure 
     # we didn't miss anything while automation was disabled and then 
@@ -32,10 +72,12 @@ class Proof:
         the Proof jurisdiction.
         '''
         Proof.sideeffect_processed.clear()
+        SideEffectQueue._clear_()
         Assumption.all_assumptions_by_style.clear()
         Assumption.considered_assumption_sets.clear()
         Theorem.all_theorems.clear()
         Instantiation.instantiations.clear()
+        Instantiation.reset_memo_stats()
         Instantiation.unsatisfied_condition = None
         Instantiation.condition_assumptions = None
         _ShowProof.show_proof_by_id.clear()
@@ -89,6 +131,14 @@ class Proof:
             self._meaning_data._non_allowances = None
             # being applied directly or indirectly.
 
+            # The number of unique steps (determined as needed) and
+            # the sets of this proof and its direct/indirect
+            # requirements and of their proven truths (see
+            # _requirement_sets).
+            self._meaning_data.num_steps = None
+            self._meaning_data._requirements_set = None
+            self._meaning_data._required_truths_set = None
+
         # The style data is shared among Proofs with the same structure and
         # style.
         self._style_data = style_data(
@@ -173,16 +223,18 @@ class Proof:
             self._eliminated_axioms = frozenset(eliminated_axioms)
             self._eliminated_theorems = frozenset(eliminated_theorems)
 
-        all_required_proofs = self.all_required_proofs()
-        if not hasattr(self._meaning_data, 'num_steps'):
-            # determine the number of unique steps required for this proof
-            self._meaning_data.num_steps = len(all_required_proofs)
-        
-        # See if this is a useless self-dependent proof
-        all_required_truths = {required_proof.proven_truth for
-                               required_proof in all_required_proofs
-                               if required_proof is not self}
-        useless_proof = proven_truth in all_required_truths
+        # See if this is a useless self-dependent proof (one that
+        # requires, directly or indirectly, a proof of the same truth).
+        if len(self.eliminated_proof_steps()) > 0:
+            all_required_truths = {
+                required_proof.proven_truth for required_proof
+                in self.all_required_proofs() if required_proof is not self}
+            useless_proof = proven_truth in all_required_truths
+        else:
+            truth_index = Proof._truth_bits.index(proven_truth._meaning_data)
+            useless_proof = any(
+                truth_index in required_proof._requirement_sets()[1]
+                for required_proof in self.required_proofs)
         if useless_proof:
             # not usable because it is not useful
             self._meaning_data._unusable_proof = self  
@@ -198,6 +250,12 @@ class Proof:
             for required_proof in self.required_proofs:
                 required_proof._dependents.add(self)
 
+        if len(SideEffectQueue._unused_derived) > 0:
+            for required_proof in self.required_proofs:
+                SideEffectQueue._note_used(required_proof.proven_truth)
+        if SideEffectQueue.draining:
+            SideEffectQueue._note_derived(proven_truth)
+
         requiring_unusable_proof = False
         for required_proof in self.required_proofs:
             if required_proof.is_possibly_usable():
@@ -239,6 +297,10 @@ class Proof:
         # Record that this is proven whether side-effect automation is
         # enabled or not.
         self.proven_truth.expr._record_as_proven(self.proven_truth)         
+        # Advance the knowledge epochs and notify subscribers.
+        KnowledgeRegistry.record(self.proven_truth)
+        # Expression-specific records may make failed attempts succeed.
+        Expression._forget_failed_attempts()
         
         # Derive obvious consequences from this truth.
         self._derive_side_effects()
@@ -359,10 +421,12 @@ class Proof:
         raise NotImplementedError("Must be implemented for each Proof "
                                   "object")
     
-    def _derive_side_effects(self):
+    def _derive_side_effects(self, deferrable=True):
         '''
         Derive side-effects under the active assumptions if
-        this proof is relevent.
+        this proof is relevent.  If deferrable and
+        defaults.defer_sideeffects is True, queue them in the
+        SideEffectQueue instead.
         '''
         if not defaults.sideeffect_automation:
             return # Side-effect automation is off, so don't do it.
@@ -373,6 +437,9 @@ class Proof:
                    defaults.conclude_automation)
             if key in Proof.sideeffect_processed:
                 return  # has already been processed
+            if deferrable and defaults.defer_sideeffects:
+                SideEffectQueue.push(self, key)
+                return
 
             # Don't bother with side effects if this proof was born 
             # obsolete or unusable.  May derive any side-effects that 
@@ -590,7 +657,6 @@ class Proof:
         # of steps so that dependents are visited after
         # everything they depend upon and we avoid revising
         # and discarding proofs multiple times.
-        import heapq
         # The 'sources' are the originally disabled proofs
         # that may propagate to dependents.
         dep_id_to_dep_and_source = dict()
@@ -668,9 +734,62 @@ class Proof:
         '''
         if self._meaning_data.num_steps is None:
             # Compute the number of steps as needed.
-            self._meaning_data.num_steps = len(self.all_required_proofs())
+            if len(self.eliminated_proof_steps()) > 0:
+                self._meaning_data.num_steps = len(
+                    self.all_required_proofs())
+            else:
+                self._meaning_data.num_steps = len(
+                    self._requirement_sets()[0])
         return self._meaning_data.num_steps
 
+    def _requirement_sets(self):
+        '''
+        Return the sets of bit indices (see _BitIndices) of this proof
+        and all of its direct and indirect requirements and of the
+        truths that they prove.  These are SharedBitsets maintained on
+        the meaning data, each the union of those of the required
+        proofs with one more index, so they are only determined once
+        per proof step (until requirements change; see
+        _mark_num_steps_as_unknown) at a cost that is logarithmic in
+        the number of live proofs.  They disregard eliminated proof
+        steps.
+        '''
+        meaning_data = self._meaning_data
+        if meaning_data._requirements_set is None:
+            # Determine the sets of the requirements first (without
+            # recursion, as proofs may be long).
+            proof_bits, truth_bits = Proof._proof_bits, Proof._truth_bits
+            to_process = [self]
+            while len(to_process) > 0:
+                proof = to_process[-1]
+                proof_meaning_data = proof._meaning_data
+                if proof_meaning_data._requirements_set is not None:
+                    to_process.pop()
+                    continue
+                pending = [required_proof for required_proof
+                           in proof.required_proofs if
+                           required_proof._meaning_data._requirements_set
+                           is None]
+                if len(pending) > 0:
+                    to_process.extend(pending)
+                    continue
+                to_process.pop()
+                required_meaning_data = [
+                    required_proof._meaning_data for required_proof
+                    in proof.required_proofs]
+                proof_meaning_data._requirements_set = (
+                    SharedBitset.singleton(
+                        proof_bits.index(proof_meaning_data)).union(
+                            *[data._requirements_set
+                              for data in required_meaning_data]))
+                proof_meaning_data._required_truths_set = (
+                    SharedBitset.singleton(
+                        truth_bits.index(proof.proven_truth._meaning_data)
+                    ).union(*[data._required_truths_set
+                              for data in required_meaning_data]))
+        return (meaning_data._requirements_set,
+                meaning_data._required_truths_set)
+
     def _goodness(self):
         '''
         We determine the 'best' proof according to:
@@ -692,8 +811,13 @@ class Proof:
         to_process = [self]
         while len(to_process) > 0:
             proof = to_process.pop()
-            if proof._meaning_data.num_steps is not None:
-                proof._meaning_data.num_steps = None
+            meaning_data = proof._meaning_data
+            if (meaning_data.num_steps is not None or
+                    meaning_data._requirements_set is not None):
+                meaning_data.num_steps = None
+                # The requirements may have changed as well.
+                meaning_data._requirements_set = None
+                meaning_data._required_truths_set = None
                 to_process.extend(proof._dependents)
 
     def used_axioms(self):
@@ -868,6 +992,16 @@ class Proof:
             return ('<a href="#%s_step%d">%d</a>%s'
                     % (proof_id, n, n, mark_str))
         proof_num_map = {proof: k for k, proof in enumerate(proof_steps)}
+        # Recall or generate the pngs of all of the displayed steps in
+        # batches.
+        displayed_exprs = []
+        for k, proof in enumerate(proof_steps):
+            if hasattr(self, '_steps_to_include'):
+                if k not in self._steps_to_include:
+                    continue
+            displayed_exprs.extend(proof.proven_truth.assumptions)
+            displayed_exprs.append(proof.proven_truth.expr)
+        Expression._prefetch_pngs(displayed_exprs)
         for k, proof in enumerate(proof_steps):
             if hasattr(self, '_steps_to_include'):
                 if k not in self._steps_to_include:
@@ -1620,10 +1754,22 @@ class Instantiation(Proof):
     rules.
     '''
 
-    # Map (orig_judgment, mapping, defaults_config) triples to a set 
-    # of Instantiations (there may be multiple Instantiations which 
-    # use different assumptions)
-    instantiations = dict()
+    # Map (orig_judgment, mapping, defaults_config, style ids) keys to
+    # lists of [Instantiation, knowledge epoch] entries (there may be
+    # multiple Instantiations which use different assumptions).
+    # Ordered from least to most recently used for eviction beyond
+    # instantiations_capacity.  Entries that were made more than
+    # instantiations_max_age knowledge epochs ago (see
+    # KnowledgeRegistry.epoch) are forgotten, unless
+    # instantiations_max_age is None.
+    instantiations = OrderedDict()
+    instantiations_capacity = 10000
+    instantiations_max_age = None
+
+    # Counters of instantiation memo lookups (see memo_stats).
+    memo_hits = 0
+    memo_misses = 0
+    memo_evictions = 0
     
     # For convenience in figuring out what went wrong, store the last 
     # unsatisfied condition and associate assumptions.
@@ -1660,29 +1806,116 @@ class Instantiation(Proof):
             important_configs[_k] = tuple(
                 sorted(important_configs[_k], key=lambda expr:hash(expr)))
         important_configs = tuple(important_configs)
-        instantiations = Instantiation.instantiations
-        key = (orig_judgment, mapping_pairs, important_configs)
-        if (key in instantiations and
-                not defaults.simplify_with_known_evaluations):
-            for inst in instantiations[key]:
-                if inst.proven_truth.is_applicable():
-                    # Found a known instantiation.  Retrieve it.
-                    # We may be using different assumptions than
-                    # previously, though, so we might need to derive
-                    # side-effects again.
-                    inst._derive_side_effects()
-                    return inst.with_matching_styles(
-                        inst.expr, defaults.assumptions)
+        # Expressions compare by meaning, so include the style ids to
+        # reproduce the styles of the instantiated Judgment.
+        style_ids = (orig_judgment._style_id,) + tuple(
+            (_key._style_id, _val._style_id) for _key, _val
+            in mapping_pairs)
+        key = (orig_judgment, mapping_pairs, important_configs, style_ids)
+        memoize = not defaults.simplify_with_known_evaluations
+        if memoize:
+            inst = Instantiation._recall_instantiation(key)
+            if inst is not None:
+                return inst
         inst = Instantiation(orig_judgment, num_forall_eliminations,
                              repl_map, equiv_alt_expansions,
                              mapping, mapping_key_order,
                              simplify_only_where_marked,
                              markers_and_marked_expr)
         assert inst.mapping == mapping
-        #if not defaults.simplify_with_known_evaluations:
-        #    Instantiation.instantiations.setdefault(key, set()).add(inst)
+        if memoize:
+            Instantiation._remember_instantiation(key, inst)
         return inst
 
+    @staticmethod
+    def _recall_instantiation(key):
+        '''
+        Return a remembered Instantiation for the given key that is
+        usable and applicable under the default assumptions, or None.
+        Unusable (e.g., disabled) or expired entries are forgotten.
+        '''
+        from ._profiling import ProveProfile
+        instantiations = Instantiation.instantiations
+        entries = instantiations.get(key)
+        found = None
+        if entries is not None:
+            max_age = Instantiation.instantiations_max_age
+            knowledge_epoch = KnowledgeRegistry.epoch
+            for entry in list(entries):
+                inst, epoch = entry
+                if ((max_age is not None and
+                        knowledge_epoch - epoch > max_age) or
+                        not inst.is_possibly_usable()):
+                    entries.remove(entry)
+                    Instantiation.memo_evictions += 1
+                    continue
+                # is_applicable checks the usability of the proven
+                # truth and the assumptions.  We may be using different
+                # assumptions than previously, so it derives
+                # side-effects again if needed.
+                if inst.proven_truth.is_applicable():
+                    found = inst
+                    break
+            if len(entries) == 0:
+                del instantiations[key]
+            elif found is not None:
+                instantiations.move_to_end(key)
+        profile = ProveProfile.active
+        if found is None:
+            Instantiation.memo_misses += 1
+            if profile is not None:
+                profile.miss('Instantiation.get_instantiation')
+        else:
+            Instantiation.memo_hits += 1
+            if profile is not None:
+                profile.hit('Instantiation.get_instantiation')
+        return found
+
+    @staticmethod
+    def _remember_instantiation(key, inst):
+        '''
+        Remember the Instantiation for the given key, evicting the
+        least recently used entries beyond
+        Instantiation.instantiations_capacity.
+        '''
+        instantiations = Instantiation.instantiations
+        entries = instantiations.get(key)
+        if entries is None:
+            instantiations[key] = [[inst, KnowledgeRegistry.epoch]]
+        else:
+            for entry in entries:
+                if entry[0] is inst:
+                    entry[1] = KnowledgeRegistry.epoch
+                    break
+            else:
+                entries.append([inst, KnowledgeRegistry.epoch])
+            instantiations.move_to_end(key)
+        while len(instantiations) > Instantiation.instantiations_capacity:
+            _, evicted = instantiations.popitem(last=False)
+            Instantiation.memo_evictions += len(evicted)
+
+    @staticmethod
+    def memo_stats():
+        '''
+        Return a dictionary of the instantiation memo counters along
+        with its size and hit rate (None if there were no lookups).
+        '''
+        hits, misses = Instantiation.memo_hits, Instantiation.memo_misses
+        return {'hits': hits, 'misses': misses,
+                'hit_rate': hits / (hits + misses) if hits + misses > 0
+                else None,
+                'evictions': Instantiation.memo_evictions,
+                'size': len(Instantiation.instantiations)}
+
+    @staticmethod
+    def reset_memo_stats():
+        '''
+        Reset the instantiation memo counters.
+        '''
+        Instantiation.memo_hits = 0
+        Instantiation.memo_misses = 0
+        Instantiation.memo_evictions = 0
+
     @staticmethod
     def _generate_mapping(orig_judgment, repl_map, 
                           equiv_alt_expansions):
@@ -2664,9 +2897,9 @@ class _ShowProof:
         if self.step_type_str == 'instantiation':
             # Extract the mapping information.
             group = ref_obj_id_groups[0]
+            group_exprs = theory_folder_storage.make_expressions(group)
             key_mapping_pairs = \
-                [(theory_folder_storage.make_expression(group[i]),
-                  theory_folder_storage.make_expression(group[i + 1]))
+                [(group_exprs[i], group_exprs[i + 1])
                     for i in range(0, len(group), 2)]
             self.mapping_key_order = [key for key, value in key_mapping_pairs]
             self.mapping = dict(key_mapping_pairs)
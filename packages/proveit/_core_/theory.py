@@ -21,6 +21,7 @@ the theorem proofs, and it stores theorem proof dependencies.
 '''
 
 import os
+import importlib
 import json
 from collections import OrderedDict
 from ._theory_storage import TheoryStorage, TheoryFolderStorage, relurl
@@ -63,12 +64,19 @@ class Theory:
         Clear all references to Prove-It information in
         the Theory jurisdiction.
         '''
+        from ._dependency_index import DependencyIndex
+        DependencyIndex._clear_()
         Theory._rootTheoryPaths.clear()
         Theory.default = None
         Theory.storages.clear()
         TheoryFolderStorage.active_theory_folder_storage = None
         TheoryFolderStorage.proveit_object_to_storage.clear()
         TheoryFolderStorage.owned_hash_folders.clear()
+        TheoryFolderStorage.made_expressions.clear()
+        TheoryFolderStorage.expr_classes.clear()
+        TheoryFolderStorage.preloaded_unique_reps.clear()
+        TheoryFolderStorage.defer_notebooks = False
+        TheoryFolderStorage.deferred_notebook_style_ids.clear()
 
     # externals.txt at top level to track relative path to external
     # theories.
@@ -573,6 +581,17 @@ class Theory:
         return TheoryFolderStorage.retrieve_png(
             expr, latex, config_latex_tool_fn)
 
+    @staticmethod
+    def _stored_pngs(expr_latex_configs):
+        '''
+        Find the .png files for a list of
+        (expr, latex, config_latex_tool_fn) triples of stored
+        Expressions, creating the missing ones in batches.
+        Return the list of (png data, relative url) tuples in the same
+        order.
+        '''
+        return TheoryFolderStorage.retrieve_pngs(expr_latex_configs)
+
     def _theory_folder_storage(self, folder=None):
         '''
         Return the TheoryFolderStorage object associated with this
@@ -597,6 +616,57 @@ class Theory:
         if theory_folder_storage is not None:
             return theory_folder_storage.clean(clear)
 
+    def set_storage_format(self, storage_format,
+                           include_sub_theories=False):
+        '''
+        Set the format for storing unique representations in the
+        __pv_it directory of this theory (and, optionally, its
+        sub-theories), migrating anything that is already stored.
+        The storage_format may be 'directories' (a unique_rep.pv_it
+        file in each hash directory) or 'packed' (a single packed file
+        per folder with an offset index).
+        '''
+        self._storage.set_storage_format(storage_format)
+        if include_sub_theories:
+            for sub_theory in self.generate_sub_theories():
+                sub_theory.set_storage_format(storage_format,
+                                              include_sub_theories=True)
+
+    def write_snapshot(self, include_sub_theories=False):
+        '''
+        Write a single-file snapshot of the common expressions, axioms,
+        and theorems of this theory (and, optionally, its
+        sub-theories), with the unique representations of all of their
+        sub-expressions, for Theory.preload.  Return the list of
+        snapshot filenames.
+        '''
+        filenames = [self._storage.write_snapshot()]
+        if include_sub_theories:
+            for sub_theory in self.generate_sub_theories():
+                filenames.extend(sub_theory.write_snapshot(
+                    include_sub_theories=True))
+        return filenames
+
+    def preload(self, include_sub_theories=False, make_expressions=True):
+        '''
+        Load the common expressions, axioms, and theorems of this
+        theory (and, optionally, its sub-theories) in bulk, in advance
+        of their use.  An up-to-date snapshot (see write_snapshot) is
+        read in a single pass; otherwise, this falls back to reading
+        the stored names and unique representations.  If
+        'make_expressions' is False, only the names and unique
+        representations are loaded.  Return the number of theories that
+        were preloaded from a snapshot.
+        '''
+        num_from_snapshot = 1 if self._storage.preload(
+            make_expressions=make_expressions) else 0
+        if include_sub_theories:
+            for sub_theory in self.generate_sub_theories():
+                num_from_snapshot += sub_theory.preload(
+                    include_sub_theories=True,
+                    make_expressions=make_expressions)
+        return num_from_snapshot
+
     def contains_any_expression(self):
         '''
         Return True if this theory and all of its sub-theories
@@ -613,10 +683,15 @@ class TheoryPackage(ModuleType):
     '''
     Used in __init__.py modules of theory packages for accessing 
     common expressions, axioms, and theorems of the package.
+    Attributes (e.g., Expression classes) may also be imported lazily,
+    upon first access, by mapping their names to the (relative or
+    absolute) module paths from which they are imported via
+    'lazy_attrs'.
     '''
     
-    def __init__(self, name, filename, attr_dict):
+    def __init__(self, name, filename, attr_dict, lazy_attrs=None):
         ModuleType.__init__(self, name)
+        self._lazy_attrs = dict() if lazy_attrs is None else lazy_attrs
         self._theory = Theory(filename)
         self.__file__ = filename
         self.__dict__.update(attr_dict)
@@ -625,7 +700,36 @@ class TheoryPackage(ModuleType):
         expression_axiom_and_theorems_names = \
             self._theory.get_expression_axiom_and_theorem_names()
         return sorted(list(self.__dict__.keys()) + 
+                      list(self._lazy_attrs.keys()) +
                       list(expression_axiom_and_theorems_names))
+
+    @property
+    def __all__(self):
+        '''
+        Include the lazy attributes, other than sub-modules, when
+        importing '*' from the package (otherwise, the public
+        attributes as usual).
+        '''
+        if len(self._lazy_attrs) == 0:
+            raise AttributeError('__all__')
+        return ([name for name in self.__dict__ if name[0] != '_'] +
+                [name for name, module_path in self._lazy_attrs.items()
+                 if name not in self.__dict__ and
+                 module_path != '.' + name])
+
+    def _import_lazy_attr(self, name):
+        '''
+        Import the lazy attribute of the given name from its module
+        and store it as a regular attribute of the package.
+        '''
+        module = importlib.import_module(self._lazy_attrs[name],
+                                         self.__name__)
+        if name in self.__dict__:
+            # Importing a sub-module sets it as an attribute.
+            return self.__dict__[name]
+        value = getattr(module, name)
+        setattr(self, name, value)
+        return value
     
     def __getattr__(self, name):
         '''
@@ -638,6 +742,8 @@ class TheoryPackage(ModuleType):
         if name[0:2]=='__': 
             # don't handle internal Python attributes
             raise AttributeError 
+        if name in self._lazy_attrs:
+            return self._import_lazy_attr(name)
         try:
             kind = self._theory.get_expression_axiom_or_theorem_kind(name)
         except KeyError:
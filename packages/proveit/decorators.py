@@ -1,6 +1,7 @@
 import functools
 from inspect import signature, Parameter
 from proveit._core_.defaults import defaults
+from proveit._core_._profiling import profiled
 from proveit.util import OrderedSet
 
 def _make_decorated_prover(func, automatic=False):
@@ -235,7 +236,8 @@ def _make_decorated_prover(func, automatic=False):
                 # Match the style of self.
                 return proven_truth.with_matching_style(expr)
         return proven_truth
-    return decorated_prover    
+    # Record calls when a ProveProfile is active.
+    return profiled(decorated_prover, func.__qualname__)
 
 def _make_decorated_relation_prover(func, automatic=False):
     '''
@@ -1,7 +1,8 @@
 from proveit import (Expression, Judgment, Literal, Operation,
                      defaults, USE_DEFAULTS,
                      prover, equality_prover, relation_prover,
-                     ProofFailure, UnsatisfiedPrerequisites)
+                     ProofFailure, UnsatisfiedPrerequisites,
+                     SideEffectQueue)
 from proveit.relation import Relation
 from proveit.util import OrderedSet
 
@@ -39,6 +40,10 @@ class InClass(Relation):
     known_memberships_by_canonical_form = dict()
     known_type_specific_memberships_by_canonical_form =  dict()
     
+    # Memberships are consulted by much of the automation (e.g., for
+    # number sets), so derive their deferred side-effects first.
+    sideeffect_priority = -1
+
     # map (element, domain) pairs to corresponding InClass expressions
     inclass_expressions = dict()
 
@@ -313,6 +318,8 @@ class InClass(Relation):
                 tmp_defaults.assumptions = assumptions
             # Make sure we derive assumption side-effects first.
             Assumption.make_assumptions()
+            # Pending side-effects may add to the known memberships.
+            SideEffectQueue.drain(relevant_to=element)
     
             if include_canonical_forms:
                 key = element.canonical_form()
@@ -1,6 +1,7 @@
 from proveit import (Literal, defaults, USE_DEFAULTS,
                      prover, relation_prover, equality_prover,
-                     ProofFailure, UnsatisfiedPrerequisites)
+                     ProofFailure, UnsatisfiedPrerequisites,
+                     SideEffectQueue)
 from proveit.relation import Relation
 from proveit import x, S
 from proveit.util import OrderedSet
@@ -247,6 +248,8 @@ class NotInClass(Relation):
                 tmp_defaults.assumptions = assumptions
             # Make sure we derive assumption side-effects first.
             Assumption.make_assumptions()
+            # Pending side-effects may add to the known nonmemberships.
+            SideEffectQueue.drain(relevant_to=element)
         
             element_cf = element.canonical_form()
             if element_cf in NotInClass.known_nonmemberships_by_canonical_form:
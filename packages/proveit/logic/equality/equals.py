@@ -1,6 +1,6 @@
 from proveit import (Expression, Judgment, as_expression, 
                      defaults, USE_DEFAULTS, ProofFailure,
-                     UnsatisfiedPrerequisites,
+                     UnsatisfiedPrerequisites, SideEffectQueue,
                      Conditional, ExprTuple, equality_prover, InnerExpr,
                      InnerExprGenerator, free_vars)
 from proveit.util import OrderedSet
@@ -34,6 +34,10 @@ class Equals(EquivRelation):
     # of the invert method for future reference.
     inversions = dict()
 
+    # Equalities are consulted by much of the automation (e.g., for
+    # evaluations), so derive their deferred side-effects first.
+    sideeffect_priority = -1
+
     # Record the Equals objects being initialized (to avoid infinite
     # recursion while automatically deducing an equality is in Boolean).
     initializing = set()
@@ -464,6 +468,8 @@ class Equals(EquivRelation):
         is True, also include expressions that are presumed to be
         equal to the given one by having the same canonical form.
         '''
+        # Pending side-effects may add to the known equalities.
+        SideEffectQueue.drain(relevant_to=expr)
         known_equalities = Equals.known_equalities.get(expr, tuple())
         # No need to report the expression we started with.
         reported = set([expr])
@@ -475,7 +481,7 @@ class Equals(EquivRelation):
                         yield _expr
         if include_canonical_forms:
             cf = expr.canonical_form()
-            for expr in Expression.canonical_form_to_exprs[cf]:
+            for expr in Expression.exprs_with_canonical_form(cf):
                 if expr not in reported:
                     reported.add(expr)
                     yield expr
@@ -1098,6 +1104,8 @@ class Equals(EquivRelation):
         '''
         if is_irreducible_value(expr):
             return Equals(expr, expr).conclude_via_reflexivity()
+        # Pending side-effects may add to the known evaluations.
+        SideEffectQueue.drain(relevant_to=expr)
         if expr in Equals.known_evaluation_sets:
             evaluations = Equals.known_evaluation_sets[expr]
             candidates = []
@@ -2,13 +2,13 @@
 Define some custom magic for Prove-It in IPython notebooks.
 '''
 
-from IPython.core.magic import Magics, magics_class, line_magic
+from IPython.core.magic import (Magics, magics_class, line_magic,
+                                line_cell_magic)
 from IPython import get_ipython
 from IPython.display import display, HTML
 from proveit._core_.expression import Expression, free_vars
 from proveit._core_ import Judgment, Theorem
 from proveit._core_.theory import Theory
-import ipywidgets as widgets
 # import new#Comment out for python 3
 import types  # Added for python 3
 import re
@@ -126,6 +126,7 @@ class TheoryInterface:
     '''
 
     def __init__(self):
+        import ipywidgets as widgets
         self.theory = Theory()  # theory of the current working directory
         self.sub_theory_names = list(self.theory.get_sub_theory_names())
         self.sub_theory_descriptions = dict()
@@ -157,6 +158,7 @@ class TheoryInterface:
             self._add_sub_theoryRow(sub_theory_name)
 
     def _add_sub_theoryRow(self, sub_theory_name):
+        import ipywidgets as widgets
         sub_theory_description = self.read_description(sub_theory_name)
         self.sub_theory_descriptions[sub_theory_name] = sub_theory_description
         if self.mode == 'interactive':
@@ -309,6 +311,7 @@ class TheoryInterface:
         why we use the term 'unlinked'.  It may be resurrected by adding the sub-theory
         with the same name back in.
         '''
+        import ipywidgets as widgets
         theory = Theory(theory_name_to_delete)
         # remove all internal references and see if any external references
         # remain
@@ -434,6 +437,7 @@ class ProveItMagicCommands:
         for sub-theories which may be edited.
         '''
         import proveit
+        import ipywidgets as widgets
         proveit.defaults.automation = False  # No need for automation.
         # create an '__init__.py' in the directory if there is not an existing
         # one.
@@ -1042,6 +1046,42 @@ class ProveItMagic(Magics, ProveItMagicCommands):
         thm_expr = self.shell.user_ns[line.strip()]
         ProveItMagicCommands.display_dependencies_latex(self, name, thm_expr)
 
+    @line_cell_magic
+    def prove_profile(self, line, cell=None):
+        '''
+        Profile the proof automation of a statement (line magic) or of
+        the rest of the cell (cell magic), e.g.
+            %prove_profile -s self_time -l 20 expr.prove()
+            %%prove_profile -f qed.folded
+        Options:
+            -s <sort_by>: sort the table by 'name', 'calls',
+                          'total_time' (default), 'self_time', 'failures',
+                          'max_depth' or 'hit_rate'.
+            -l <limit>: only show this many rows.
+            -f <filename>: dump a flame-graph-compatible collapsed-stack
+                           file.
+        The ProveProfile is kept as '_prove_profile' in the user
+        namespace for further inspection.
+        '''
+        from proveit._core_._profiling import ProveProfile
+        opts, statement = self.parse_options(line, 's:l:f:', posix=False)
+        if cell is not None:
+            statement = cell
+        if statement.strip() == '':
+            raise ValueError("%prove_profile requires a statement to "
+                             "profile")
+        sort_by = opts.get('s', 'total_time')
+        limit = int(opts['l']) if 'l' in opts else None
+        profile = ProveProfile()
+        self.shell.user_ns['_prove_profile'] = profile
+        try:
+            with profile:
+                self.shell.ex(self.shell.transform_cell(statement))
+        finally:
+            profile.display(sort_by=sort_by, limit=limit)
+            if 'f' in opts:
+                profile.write_collapsed_stacks(opts['f'])
+
 def display_assignments(names, right_sides, beginning_proof=False):
     from proveit import single_or_composite_expression, Judgment
     
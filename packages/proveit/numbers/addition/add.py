@@ -20,8 +20,7 @@ from proveit.numbers import (NumberOperation, standard_number_set,
                              nonzero_number_set,
                              union_number_set, deduce_number_set,
                              readily_provable_number_set)
-from proveit.numbers.numerals.decimals import DIGITS
-import proveit.numbers.numerals.decimals
+from proveit.numbers.numerals.decimals import DIGITS, digit_add_fact
 from proveit.abstract_algebra.generic_methods import (
         apply_commutation_thm, apply_association_thm,
         apply_disassociation_thm, group_commutation, pairwise_evaluation,
@@ -1015,16 +1014,24 @@ class Add(NumberOperation):
             else:
                 _a, _b = _b - _a, _a
         assert _a >= 0 and _b >= 0
-        if not all(term in DIGITS for term in (num(_a), num(_b))):
-            # multi-digit addition
-            return DecimalSequence.add_eval(_a, _b)
         with defaults.temporary() as temp_defaults:
-            # We rely upon side-effect automation here.
+            # We rely upon side-effect automation here (e.g., to
+            # obtain c - b = a from a + b = c).
             temp_defaults.sideeffect_automation = True
-            # for single digit addition, import the theorem that provides
-            # the evaluation
-            proveit.numbers.numerals.decimals.__getattr__(
-                    'add_%d_%d' % (_a, _b))
+            if not all(term in DIGITS for term in (num(_a), num(_b))):
+                # multi-digit addition
+                evaluation = DecimalSequence.add_eval(_a, _b)
+                if evaluation.lhs == self:
+                    return evaluation
+            else:
+                # for single digit addition, use the preloaded theorem
+                # that provides the evaluation
+                evaluation = digit_add_fact(_a, _b)
+                if evaluation.lhs == self:
+                    return evaluation
+                # Checking applicability derives its side-effects if
+                # they were not derived when the table was loaded.
+                evaluation.is_applicable()
         return self.evaluation()
 
     def _rational_binary_eval(self):
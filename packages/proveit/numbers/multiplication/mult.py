@@ -21,8 +21,7 @@ from proveit.numbers.number_sets import (
     RationalNonPos,
     Real, RealNonZero, RealNeg, RealPos, RealNonNeg, RealNonPos,
     Complex, ComplexNonZero)
-import proveit.numbers.numerals.decimals
-from proveit.numbers.numerals.decimals import DIGITS
+from proveit.numbers.numerals.decimals import DIGITS, digit_mult_fact
 from proveit.abstract_algebra.generic_methods import (
         apply_commutation_thm, apply_association_thm, apply_disassociation_thm,
         group_commutation, pairwise_evaluation,
@@ -762,10 +761,9 @@ class Mult(NumberOperation):
         if not all(factor in DIGITS for factor in factors):
             # multi-digit multiplication
             return DecimalSequence.mult_eval(_a.as_int(), _b.as_int())
-        # for single digit addition, import the theorem that provides
-        # the evaluation
-        return proveit.numbers.numerals.decimals.__getattr__(
-                'mult_%d_%d' % (_a.as_int(), _b.as_int()))
+        # for single digit multiplication, use the preloaded theorem
+        # that provides the evaluation
+        return digit_mult_fact(_a.as_int(), _b.as_int())
 
     def _rational_binary_eval(self):
         '''
@@ -1,5 +1,6 @@
-from collections import deque, Counter
+from collections import deque, Counter, OrderedDict
 from proveit import (Expression, Judgment, Operation, ExprTuple, ExprRange,
+                     KnowledgeRegistry,
                      generate_inner_expressions, defaults, USE_DEFAULTS,
                      prover, relation_prover,
                      ProofFailure, UnsatisfiedPrerequisites)
@@ -21,6 +22,21 @@ class NumberOperation(Operation):
     Base class for number operation (i.e. arithmetic operations).
     '''
 
+    # Results of readily_provable_number_set, mapping (expression,
+    # sorted assumptions, automation, must_be_direct,
+    # check_order_against_zero) keys to (epochs, number set or None)
+    # pairs.  An entry is only valid while its epochs (see
+    # _number_set_epochs) are unchanged: no new membership, equality
+    # or ordering fact was recorded and nothing else that affects
+    # provability changed.  Ordered from least to most recently used
+    # for eviction beyond readily_provable_number_sets_capacity.
+    readily_provable_number_sets = OrderedDict()
+    readily_provable_number_sets_capacity = 100000
+
+    # The classes of the facts that readily provable number sets are
+    # inferred from (see _number_set_epochs).
+    _number_set_fact_classes = None
+
     def __init__(self, operator, operand_or_operands, *, styles=None):
         Operation.__init__(self, operator, operand_or_operands, styles=styles)
 
@@ -288,6 +304,63 @@ sorted_number_sets = (
 
 standard_number_sets = set(sorted_number_sets)
 
+# Encode each standard number set as a bitmask over disjoint "atoms"
+# of the complex numbers so that inclusion (A within B iff
+# A & ~B == 0) and intersection (A & B) are bit operations.  The atoms
+# are zero, positive and negative integers, positive and negative
+# non-integer rationals, positive and negative irrationals, and
+# non-real complex numbers.
+_ZERO, _POS_INT, _NEG_INT, _POS_RATIO, _NEG_RATIO, _POS_IRR, _NEG_IRR, \
+    _NON_REAL = (1 << _k for _k in range(8))
+_POS_REAL = _POS_INT | _POS_RATIO | _POS_IRR
+_NEG_REAL = _NEG_INT | _NEG_RATIO | _NEG_IRR
+number_set_masks = {
+    ZeroSet: _ZERO,
+    NaturalPos: _POS_INT,
+    IntegerNeg: _NEG_INT,
+    Natural: _ZERO | _POS_INT,
+    IntegerNonPos: _ZERO | _NEG_INT,
+    IntegerNonZero: _POS_INT | _NEG_INT,
+    Integer: _ZERO | _POS_INT | _NEG_INT,
+    RationalPos: _POS_INT | _POS_RATIO,
+    RationalNeg: _NEG_INT | _NEG_RATIO,
+    RationalNonNeg: _ZERO | _POS_INT | _POS_RATIO,
+    RationalNonPos: _ZERO | _NEG_INT | _NEG_RATIO,
+    RationalNonZero: _POS_INT | _NEG_INT | _POS_RATIO | _NEG_RATIO,
+    Rational: _ZERO | _POS_INT | _NEG_INT | _POS_RATIO | _NEG_RATIO,
+    RealPos: _POS_REAL,
+    RealNeg: _NEG_REAL,
+    RealNonNeg: _ZERO | _POS_REAL,
+    RealNonPos: _ZERO | _NEG_REAL,
+    RealNonZero: _POS_REAL | _NEG_REAL,
+    Real: _ZERO | _POS_REAL | _NEG_REAL,
+    ComplexNonZero: _POS_REAL | _NEG_REAL | _NON_REAL,
+    Complex: _ZERO | _POS_REAL | _NEG_REAL | _NON_REAL}
+
+# Map the bitmask of each standard number set back to the set.
+_number_set_of_mask = {mask: number_set for number_set, mask
+                       in number_set_masks.items()}
+
+# Map bitmasks to the most restrictive standard number set containing
+# them (see _number_set_containing).
+_containing_number_sets = dict()
+
+def _number_set_containing(mask):
+    '''
+    Return the most restrictive standard number set whose bitmask
+    contains the given (non-zero) bitmask.  The standard number sets
+    are closed under (non-empty) intersection, so there is just one.
+    '''
+    number_set = _containing_number_sets.get(mask)
+    if number_set is None:
+        containing_mask = number_set_masks[Complex]
+        for _mask in number_set_masks.values():
+            if mask & ~_mask == 0:
+                containing_mask &= _mask
+        number_set = _number_set_of_mask[containing_mask]
+        _containing_number_sets[mask] = number_set
+    return number_set
+
 # Map number sets to the positive number set it contains.
 pos_number_set = {
     NaturalPos: NaturalPos,
@@ -388,6 +461,77 @@ def readily_provable_number_set(
     
     _check_order_against_zero is set to False internally to avoid infinite
     recursion.
+
+    Results are remembered in
+    NumberOperation.readily_provable_number_sets until a fact that they
+    may depend upon is recorded (see _number_set_epochs).
+    '''
+    number_set = _remembered_readily_provable_number_set(
+        expr, automation, must_be_direct or not automation,
+        _check_order_against_zero)
+    if number_set is None:
+        if default is None:
+            raise UnsatisfiedPrerequisites(
+                "No readily provable number set for %s"%expr)
+        return default
+    return number_set
+
+def _number_set_epochs():
+    '''
+    Return the epochs that readily provable number sets depend upon:
+    the class epochs of memberships, equalities and orderings and the
+    epoch of other changes to what is provable (see KnowledgeRegistry).
+    '''
+    fact_classes = NumberOperation._number_set_fact_classes
+    if fact_classes is None:
+        from proveit.logic import InClass, NotEquals, Not
+        from proveit.relation import TransitiveRelation
+        fact_classes = (InClass, Equals, NotEquals, Not, TransitiveRelation)
+        NumberOperation._number_set_fact_classes = fact_classes
+    class_epoch = KnowledgeRegistry.class_epoch
+    return (KnowledgeRegistry.advanced_epoch,) + tuple(
+        class_epoch(fact_class) for fact_class in fact_classes)
+
+def _remembered_readily_provable_number_set(
+        expr, automation, must_be_direct, check_order_against_zero):
+    '''
+    Return the readily provable number set of the expression (or None)
+    via NumberOperation.readily_provable_number_sets if possible, or
+    via _readily_provable_number_set, remembering the result.
+    '''
+    from proveit._core_._profiling import ProveProfile
+    remembered = NumberOperation.readily_provable_number_sets
+    key = (expr, defaults.sorted_assumptions, automation, must_be_direct,
+           check_order_against_zero)
+    epochs = _number_set_epochs()
+    profile = ProveProfile.active
+    entry = remembered.get(key)
+    if entry is not None and entry[0] == epochs:
+        remembered.move_to_end(key)
+        if profile is not None:
+            profile.hit('readily_provable_number_set')
+        return entry[1]
+    if profile is not None:
+        profile.miss('readily_provable_number_set')
+    num_blocked_attempts = Expression.num_blocked_attempts
+    number_set = _readily_provable_number_set(
+        expr, automation, must_be_direct, check_order_against_zero)
+    # A result affected by a blocked recursion may differ in a
+    # different context.  One affected by facts recorded along the way
+    # is remembered with the earlier epochs (so it won't be reused).
+    if num_blocked_attempts == Expression.num_blocked_attempts:
+        remembered[key] = (epochs, number_set)
+        remembered.move_to_end(key)
+        while (len(remembered) >
+               NumberOperation.readily_provable_number_sets_capacity):
+            remembered.popitem(last=False)
+    return number_set
+
+def _readily_provable_number_set(
+        expr, automation, must_be_direct, _check_order_against_zero):
+    '''
+    Helper for readily_provable_number_set that returns None when there
+    are no readily provable number memberships.
     '''
     from proveit.logic import (InClass, Equals, NotEquals, 
                                is_irreducible_value)
@@ -395,9 +539,6 @@ def readily_provable_number_set(
 
     # Make sure we derive assumption side-effects first.
     #Assumption.make_assumptions()
-    
-    if not automation:
-        must_be_direct = True
 
     if not must_be_direct and not is_irreducible_value(expr):
         # See if the expression has a known evaluations.
@@ -407,20 +548,29 @@ def readily_provable_number_set(
             evaluation = None
         if evaluation is not None:
             # Use the evaluated number to determine its number set.
-            return readily_provable_number_set(evaluation.rhs)
+            return _remembered_readily_provable_number_set(
+                evaluation.rhs, True, False, True)
 
-    # Find the first (most restrictive) number set that
-    # contains 'expr' or something equal to it.
+    # Find the most restrictive number set that contains 'expr' or
+    # something equal to it: the intersection of the known standard
+    # number sets (see number_set_masks).
+    known_mask = number_set_masks[Complex]
     known_number_sets = set()
     for known_membership in InClass.yield_known_memberships(
             expr, include_canonical_forms=not must_be_direct):
-        if known_membership.domain in standard_number_sets:
-            known_number_sets.add(known_membership.domain)
+        domain = known_membership.domain
+        if domain in standard_number_sets:
+            known_mask &= number_set_masks[domain]
+            known_number_sets.add(domain)
     best_known_number_set = None
-    for number_set in sorted_number_sets:
-        if number_set in known_number_sets:
-            best_known_number_set = number_set
-            break
+    if len(known_number_sets) > 0:
+        best_known_number_set = _number_set_of_mask.get(known_mask)
+        if best_known_number_set is None:
+            # Contradictory memberships; take the most restrictive one.
+            for number_set in sorted_number_sets:
+                if number_set in known_number_sets:
+                    best_known_number_set = number_set
+                    break
 
     if not automation:
         # Just use what has already been proven if automation is off.
@@ -433,10 +583,8 @@ def readily_provable_number_set(
     if in_progress_key in Expression.in_progress_to_check_provability:
         # avoid infinite/pointless recursion by using
         # in_progress_to_check_provability
-        if default is None:
-            raise UnsatisfiedPrerequisites(
-                "No readily provable number set for %s"%expr)
-        return default
+        Expression.num_blocked_attempts += 1
+        return None
 
     try:
         Expression.in_progress_to_check_provability.add(
@@ -452,16 +600,19 @@ def readily_provable_number_set(
                 # what we had surmised already.
                 if best_known_number_set is None:
                     best_known_number_set = number_set
+                elif (best_known_number_set in standard_number_sets and
+                        number_set in standard_number_sets):
+                    # Use the intersection of the two.
+                    best_known_number_set = _number_set_of_mask.get(
+                        number_set_masks[best_known_number_set] &
+                        number_set_masks[number_set],
+                        best_known_number_set)
                 elif best_known_number_set != number_set and (
                         best_known_number_set.readily_includes(number_set)):
                     best_known_number_set = number_set
     
         if best_known_number_set is None:
-            if default is None:
-                raise UnsatisfiedPrerequisites(
-                    "No readily provable number set for %s"%expr)
-
-            return default
+            return None
     
         if isinstance(expr, ExprRange):
             # Don't bother trying to restrict further if the expression
@@ -474,34 +625,35 @@ def readily_provable_number_set(
 
         if Equals(expr, zero).readily_provable():
             return ZeroSet
-    
+
+        mask = number_set_masks.get(number_set)
+        if mask is None:
+            # Not a standard number set.
+            return number_set
+
+        # Restrict the sign of the number set when an order against
+        # zero (or non-zero-ness) is readily provable, skipping checks
+        # that could not restrict it further.
         if _check_order_against_zero:
-            if number_set in pos_number_set and (
-                    Less(zero, expr).readily_provable(
-                            check_number_sets=False,
-                            must_be_direct=must_be_direct)): # positive
-                number_set = pos_number_set[number_set]
-            elif number_set in neg_number_set and (
-                    Less(expr, zero).readily_provable(
-                            check_number_sets=False,
-                            must_be_direct=must_be_direct)): # negative
-                number_set = neg_number_set[number_set]
-            elif number_set in nonneg_number_set and (
-                    LessEq(zero, expr).readily_provable(
-                            check_number_sets=False,
-                            must_be_direct=must_be_direct)): # non-negative
-                number_set = nonneg_number_set[number_set]
-            elif number_set in nonpos_number_set and (
-                    LessEq(expr, zero).readily_provable(
-                            check_number_sets=False,
-                            must_be_direct=must_be_direct)): # non-positive
-                number_set = nonpos_number_set[number_set]
-
-        if number_set in nonzero_number_set and (
-                    NotEquals(expr, zero).readily_provable()):
-            return nonzero_number_set[number_set]
-
-        return number_set
+            for sign_mask, relation_class, lhs, rhs in (
+                    (_POS_REAL, Less, zero, expr), # positive
+                    (_NEG_REAL, Less, expr, zero), # negative
+                    (_ZERO | _POS_REAL, LessEq, zero, expr), # non-negative
+                    (_ZERO | _NEG_REAL, LessEq, expr, zero)): # non-positive
+                restricted_mask = mask & sign_mask
+                if restricted_mask in (0, mask):
+                    continue
+                if relation_class(lhs, rhs).readily_provable(
+                        check_number_sets=False,
+                        must_be_direct=must_be_direct):
+                    mask = restricted_mask
+                    break
+
+        if mask & _ZERO and mask != _ZERO and (
+                NotEquals(expr, zero).readily_provable()):
+            mask &= ~_ZERO
+
+        return _number_set_of_mask[mask]
     finally:
         Expression.in_progress_to_check_provability.remove(
                 in_progress_key)
@@ -782,6 +934,13 @@ def union_number_set(*sets):
     providing a superset that should be proveable under the right
     conditions.
     '''
+    if len(sets) > 0 and all(number_set in standard_number_sets
+                             for number_set in sets):
+        # The union of the bitmasks (see number_set_masks).
+        mask = 0
+        for number_set in sets:
+            mask |= number_set_masks[number_set]
+        return _number_set_containing(mask)
     if len(sets) == 2:
         set_01, set_02 = sets
         if set_01==set_02:
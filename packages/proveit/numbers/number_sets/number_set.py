@@ -66,13 +66,20 @@ class NumberSet(Literal):
                 readily_provable_number_set,
                 Interval, IntervalCC, IntervalOC, IntervalCO, IntervalOO)
         from proveit.numbers.number_operation import (
-            sorted_number_sets, standard_number_sets)
+            sorted_number_sets, standard_number_sets, number_set_masks)
         if other_set is None: return False
         if other_set == self: return True
+        both_standard = (self in standard_number_sets and
+                         other_set in standard_number_sets)
+        if both_standard and (
+                number_set_masks[other_set] & ~number_set_masks[self]):
+            # Not a subset (see number_set_masks), so don't bother
+            # looking for proofs.
+            return False
         if ProperSubset(other_set, self).proven():
             return True # already known
 
-        if self in standard_number_sets and other_set in standard_number_sets:
+        if both_standard:
             inclusion_truths = NumberSet._standard_number_set_inclusion_truths
             if (self, other_set) in inclusion_truths:
                 return inclusion_truths[(self, other_set)]
@@ -1,4 +1,5 @@
 from .deci import num, DecimalSequence, DIGITS
+from .deci import digit_add_fact, digit_mult_fact, digit_less_fact
 
 
 # KEEP THE FOLLOWING IN __init__.py FOR THEORY PACKAGES.
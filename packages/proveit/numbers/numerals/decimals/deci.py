@@ -1,7 +1,8 @@
-from proveit import (Literal, Operation, ExprRange, defaults,
-                     UnsatisfiedPrerequisites,
+from collections import OrderedDict
+from proveit import (Literal, Operation, ExprRange, ExprTuple, defaults,
+                     Theory, UnsatisfiedPrerequisites,
                      prover, relation_prover, equality_prover)
-from proveit import a, b, c, d, k, m, n, x
+from proveit import a, b, c, d, j, k, m, n, p, q, r, s, x, y, z
 from proveit.logic import is_irreducible_value
 from proveit.numbers.number_sets.number_set import NumberSet, NumberMembership
 from proveit.numbers.numerals.numeral import NumeralSequence, Numeral
@@ -204,72 +205,79 @@ class DecimalSequence(NumeralSequence):
 
         return eq.relation
 
+    # Evaluations proven by add_eval, mult_eval and less_eval (and
+    # their intermediate steps), mapping ('add'|'mult'|'less', int,
+    # int) keys to Judgments that don't require any assumptions.
+    # Ordered from least to most recently used for eviction beyond
+    # evaluations_capacity.
+    evaluations = OrderedDict()
+    evaluations_capacity = 100000
+
     @staticmethod
     @prover
     def add_eval(num1, num2, **defaults_config):
         '''
-        evaluates the addition of two integers
+        Evaluates the addition of two natural numbers via column
+        addition with carries, proving one step per digit of the
+        shorter number from the single-digit add_a_b theorems.
+        Subtractions follow from the side-effects of the proven sum
+        (see Add._integer_binary_eval).  Until the multi-digit column
+        theorems are fully proven, only adding one is supported.
         '''
-        from . import md_only_nine_add_one, md_nine_add_one
-        if not isinstance(num1, int) or not isinstance(num2, int):
-            raise ValueError("'num1' and 'num2' should be integers")
-        num1 = num(num1)
-        num2 = num(num2)
-        if num2 == one:
-            # if the second number (num2) is one, we set it equal to the first number and then assume the
-            # first number to be one and the second number to not be one.  SHOULD BE DELETED once addition works
-            # for numbers greater than one.
-            num2 = num1
-        elif num2 != one:
-            raise NotImplementedError(
-                "Currently, add_eval only works for the addition of Decimal "
-                "Sequences and one, not %s, %s" %
-                (str(num1), str(num2)))
-        if all(digit == nine for digit in num2.digits):
-            # every digit is 9
-            return md_only_nine_add_one.instantiate(
-                {k: num2.digits.num_elements()})
-        elif num2.digits[-1] == nine:
-            # the last digit is nine
-            count = 0
-            idx = -1
-            while num2.digits[idx] == nine or (
-                isinstance(
-                    num2.digits[idx],
-                    ExprRange) and num2.digits[idx].body == nine):
-                if isinstance(num2.digits[idx], ExprRange):
-                    count += num2.digits[idx].true_end_index
-                else:
-                    count += 1
-                idx -= 1
-            length = num2.digits.num_elements()
-            _m = num(length.as_int() - count - 1)
-            _k = num(count)
-            _a = num2.digits[:-(count + 1)]
-            _b = num2.digits[-(count + 1)]
-            return md_nine_add_one.instantiate(
-                {m: _m, k: _k, a: _a, b: _b})
-        else:
-            # the last digit is not nine
-            _m = num(num2.digits.num_elements().as_int() - 1)
-            _k = num(0)
-            _a = num2.digits[:-1]
-            _b = num2.digits[-1]
-        eq = md_nine_add_one.instantiate(
-            {m: _m, k: _k, a: _a, b: _b})
-        return eq.inner_expr(
-        ).rhs.operands[-1].evaluate()
+        _check_natural_ints(num1, num2)
+        if not _column_theorems_proven():
+            if num2 != 1:
+                raise NotImplementedError(
+                    "Currently, add_eval only works for the addition of "
+                    "Decimal Sequences and one, not %d, %d" % (num1, num2))
+            return _add_one(num1)
+        return _add_eval(num1, num2)
 
     @staticmethod
     @prover
     def mult_eval(num1, num2, **defaults_config):
         '''
-        evaluates the multiplication of two integers
+        Evaluates the multiplication of two natural numbers via long
+        multiplication: the multiplicand (the longer number) times
+        each distinct digit of the multiplier is proven once (digit by
+        digit, from the single-digit mult_a_b theorems) and these
+        partial products are shifted and added.  This requires the
+        multi-digit column theorems to be fully proven, except when a
+        factor is zero.
         '''
-        if not isinstance(num1, int) or not isinstance(num2, int):
-            raise ValueError("'num1' and 'num2' should be integers")
-        raise NotImplementedError("multi-digit multiplication has not "
-                                  "been implemented yet")
+        from proveit.numbers import Mult
+        from proveit.numbers.multiplication import (mult_zero_left,
+                                                    mult_zero_right)
+        _check_natural_ints(num1, num2)
+        if num1 == 0:
+            return mult_zero_left.instantiate({x: num(num2)})
+        if num2 == 0:
+            return mult_zero_right.instantiate({x: num(num1)})
+        if not _column_theorems_proven():
+            raise NotImplementedError(
+                "multi-digit multiplication requires the multi-digit "
+                "column theorems of proveit.numbers.numerals.decimals to "
+                "be fully proven")
+        return _mult_eval(num1, num2)
+
+    @staticmethod
+    @prover
+    def less_eval(num1, num2, **defaults_config):
+        '''
+        Proves num1 < num2 for natural numbers num1 < num2 by their
+        number of digits or their first differing digit.  This
+        requires the multi-digit column theorems to be fully proven
+        (except for single digits).
+        '''
+        _check_natural_ints(num1, num2)
+        if not num1 < num2:
+            raise ValueError("Cannot prove %d < %d" % (num1, num2))
+        if (num1 >= 10 or num2 >= 10) and not _column_theorems_proven():
+            raise NotImplementedError(
+                "multi-digit ordering requires the multi-digit column "
+                "theorems of proveit.numbers.numerals.decimals to be fully "
+                "proven")
+        return _less_eval(num1, num2)
 
     '''
     # Shouldn't be needed given new auto-simplification approach.
@@ -402,3 +410,437 @@ def num(x):
             return DecimalSequence(*[num(int(digit)) for digit in str(x)])
     else:
         assert False, 'num not implemented for anything except integers currently. plans to take in strings or floats with specified precision'
+
+
+def _check_natural_ints(num1, num2):
+    if not isinstance(num1, int) or not isinstance(num2, int):
+        raise ValueError("'num1' and 'num2' should be integers")
+    if num1 < 0 or num2 < 0:
+        raise ValueError("'num1' and 'num2' should be natural numbers, "
+                         "not %d and %d" % (num1, num2))
+
+
+def _digits(value):
+    '''
+    Return the ExprTuple of the decimal digits of a natural number.
+    '''
+    return ExprTuple(*[DIGITS[int(digit)] for digit in str(value)])
+
+
+def _num_digits(value):
+    return num(len(str(value)))
+
+
+# Tables of single-digit theorems indexed by [a][b]: add_a_b, mult_a_b
+# and a < b (from less_a_(a+1) by transitivity).  Each table is loaded
+# in bulk upon first use (after preloading the theory; see
+# _decimal_theorems) rather than via a theory attribute look-up per
+# evaluation, and is forgotten by proveit.reset() (see
+# _clear_remembered_facts).
+_digit_add_facts = None
+_digit_mult_facts = None
+_digit_less_facts = None
+
+
+def _decimal_theorems(names):
+    '''
+    Return the proven truths of the theorems of the decimals theory
+    with the given names, preloading the theory first.
+    '''
+    theory = Theory.get_theory('proveit.numbers.numerals.decimals')
+    theory.preload()
+    return [theory.get_theorem(name).proven_truth for name in names]
+
+
+def _load_digit_facts(prefix):
+    facts = _decimal_theorems(['%s_%d_%d' % (prefix, _a, _b)
+                               for _a in range(10) for _b in range(10)])
+    return [facts[10*_a:10*(_a + 1)] for _a in range(10)]
+
+
+def _table_digit_fact(table, prefix, digit1, digit2):
+    fact = table[digit1][digit2]
+    if not fact.is_possibly_usable():
+        # Theorem usage may be restricted (e.g., while proving a
+        # theorem); defer to the theory for the proper treatment.
+        import proveit.numbers.numerals.decimals
+        return proveit.numbers.numerals.decimals.__getattr__(
+            '%s_%d_%d' % (prefix, digit1, digit2))
+    return fact
+
+
+def digit_add_fact(digit1, digit2):
+    '''
+    Return the add_a_b theorem, a + b = c, for digits a and b given as
+    ints.
+    '''
+    global _digit_add_facts
+    if _digit_add_facts is None:
+        _digit_add_facts = _load_digit_facts('add')
+    return _table_digit_fact(_digit_add_facts, 'add', digit1, digit2)
+
+
+def digit_mult_fact(digit1, digit2):
+    '''
+    Return the mult_a_b theorem, a * b = c, for digits a and b given as
+    ints.
+    '''
+    global _digit_mult_facts
+    if _digit_mult_facts is None:
+        _digit_mult_facts = _load_digit_facts('mult')
+    return _table_digit_fact(_digit_mult_facts, 'mult', digit1, digit2)
+
+
+def digit_less_fact(digit1, digit2):
+    '''
+    Return a proof of a < b for digits a < b given as ints, from the
+    less_a_(a+1) theorems by transitivity.
+    '''
+    global _digit_less_facts
+    if not 0 <= digit1 < digit2 <= 9:
+        raise ValueError("Cannot prove %d < %d for digits"
+                         % (digit1, digit2))
+    if _digit_less_facts is None:
+        _digit_less_facts = [[None]*10 for _ in range(10)]
+        for _a, fact in enumerate(_decimal_theorems(
+                ['less_%d_%d' % (_a, _a + 1) for _a in range(9)])):
+            _digit_less_facts[_a][_a + 1] = fact
+    fact = _digit_less_facts[digit1][digit2]
+    if fact is None or not fact.is_applicable():
+        fact = digit_less_fact(digit1, digit2 - 1).apply_transitivity(
+            digit_less_fact(digit2 - 1, digit2))
+        _digit_less_facts[digit1][digit2] = fact
+    return fact
+
+
+# The multi-digit column theorems used by _add_step, _mult_digit_step,
+# _mult_shift_step and _less_eval.  Evaluations only use them once
+# they are all fully proven so that proofs of arithmetic don't rest on
+# conjectures.
+_column_theorem_names = (
+    'md_add_digit_no_carry', 'md_add_digit_with_carry',
+    'md_add_no_carry', 'md_add_with_carry',
+    'md_mult_digit_no_carry', 'md_mult_digit_with_carry',
+    'md_mult_shift', 'md_mult_shift_add',
+    'md_less_by_length', 'md_less_same_length')
+# Whether they are fully proven (None until checked).
+_column_theorems_are_proven = None
+
+
+def _column_theorems_proven():
+    '''
+    Return True iff all of the multi-digit column theorems are fully
+    proven.  The answer is remembered (either way) until
+    proveit.reset() (see _clear_remembered_facts); the theorems are
+    proven in their own notebooks, each executed after a reset.
+    '''
+    global _column_theorems_are_proven
+    if _column_theorems_are_proven is None:
+        _column_theorems_are_proven = all(
+            theorem.proof().is_fully_proven() for theorem
+            in _decimal_theorems(_column_theorem_names))
+    return _column_theorems_are_proven
+
+
+def _clear_remembered_facts():
+    '''
+    Forget what was remembered about the decimal theorems and the
+    evaluations proven with them (called by proveit.reset()).
+    '''
+    global _column_theorems_are_proven
+    global _digit_add_facts, _digit_mult_facts, _digit_less_facts
+    _column_theorems_are_proven = None
+    _digit_add_facts = _digit_mult_facts = _digit_less_facts = None
+    DecimalSequence.evaluations.clear()
+
+
+def _recall_evaluation(key):
+    '''
+    Return the remembered evaluation for the key if it is still
+    usable (e.g., not disabled); otherwise return None.
+    '''
+    evaluations = DecimalSequence.evaluations
+    judgment = evaluations.get(key)
+    if judgment is None:
+        return None
+    if not judgment.is_applicable():
+        del evaluations[key]
+        return None
+    evaluations.move_to_end(key)
+    return judgment
+
+
+def _remember_evaluation(key, judgment):
+    evaluations = DecimalSequence.evaluations
+    evaluations[key] = judgment
+    evaluations.move_to_end(key)
+    while len(evaluations) > DecimalSequence.evaluations_capacity:
+        evaluations.popitem(last=False)
+    return judgment
+
+
+def _no_side_effects():
+    '''
+    Return a temporary defaults context without side-effect automation
+    for proving intermediate steps.
+    '''
+    temp_defaults = defaults.temporary()
+    temp_defaults.sideeffect_automation = False
+    return temp_defaults
+
+
+def _add_eval(_a, _b):
+    '''
+    Prove num(_a) + num(_b) = num(_a + _b).  The sums of the leading
+    digits (prefixes) are proven first so each step only needs the
+    previous one.
+    '''
+    known = _recall_evaluation(('add', _a, _b))
+    if known is not None:
+        return known
+    if len(str(_a)) < len(str(_b)):
+        # Commute the sum of the longer and shorter numbers.
+        with _no_side_effects():
+            swapped = _add_eval(_b, _a)
+        return _remember_evaluation(
+            ('add', _a, _b), swapped.inner_expr().lhs.commute(0, 1))
+    with _no_side_effects():
+        for shift in range(len(str(_b)) - 1, 0, -1):
+            _add_step(_a // 10**shift, _b // 10**shift)
+    return _add_step(_a, _b)
+
+
+def _add_one(_a):
+    '''
+    Prove num(_a) + 1 = num(_a + 1) in a single step for any number of
+    trailing nines.
+    '''
+    from . import md_only_nine_add_one, md_nine_add_one
+    known = _recall_evaluation(('add', _a, 1))
+    if known is not None:
+        return known
+    if _a < 10:
+        return _remember_evaluation(('add', _a, 1),
+                                    digit_add_fact(_a, 1))
+    digits = _digits(_a)
+    str_a = str(_a)
+    count = len(str_a) - len(str_a.rstrip('9'))
+    if count == len(str_a):
+        # every digit is 9
+        judgment = md_only_nine_add_one.instantiate(
+            {k: num(count)})
+    else:
+        _m = num(len(str_a) - count - 1)
+        _a_digits = digits[:-(count + 1)]
+        _b = digits[-(count + 1)]
+        judgment = md_nine_add_one.instantiate(
+            {m: _m, k: num(count), a: _a_digits, b: _b})
+        if count == 0:
+            # The last digit is not nine; evaluate it plus one.
+            judgment = judgment.inner_expr().rhs.operands[-1].evaluate()
+    return _remember_evaluation(('add', _a, 1), judgment)
+
+
+def _add_step(_a, _b):
+    '''
+    Prove num(_a) + num(_b) = num(_a + _b) where _b has no more digits
+    than _a, given the sum of their prefixes without their last
+    digits.
+    '''
+    from proveit.numbers import Add
+    from . import (md_add_digit_no_carry, md_add_digit_with_carry,
+                   md_add_no_carry, md_add_with_carry)
+    key = ('add', _a, _b)
+    known = _recall_evaluation(key)
+    if known is not None:
+        return known
+    if _a < 10:
+        return _remember_evaluation(key, digit_add_fact(_a, _b))
+    if _b == 1:
+        return _add_one(_a)
+    _u, _x = divmod(_a, 10)
+    _v, _y = divmod(_b, 10)
+    digit_add_fact(_x, _y)
+    lhs = Add(num(_a), num(_b))
+    carry, _z = divmod(_x + _y, 10)
+    repl_map = {m: _num_digits(_u), a: _digits(_u),
+                x: num(_x), y: num(_y), z: num(_z)}
+    if _b < 10:
+        if carry == 0:
+            thm = md_add_digit_no_carry
+        else:
+            with _no_side_effects():
+                _add_one(_u)
+            thm = md_add_digit_with_carry
+            repl_map.update({k: _num_digits(_u + 1), c: _digits(_u + 1)})
+    else:
+        with _no_side_effects():
+            # proven in the previous step (see _add_eval)
+            _add_step(_u, _v)
+        repl_map.update({n: _num_digits(_v), b: _digits(_v),
+                         k: _num_digits(_u + _v), c: _digits(_u + _v)})
+        if carry == 0:
+            thm = md_add_no_carry
+        else:
+            with _no_side_effects():
+                _add_one(_u + _v)
+            thm = md_add_with_carry
+            repl_map.update({j: _num_digits(_u + _v + 1),
+                             d: _digits(_u + _v + 1)})
+    judgment = thm.instantiate(repl_map, preserved_exprs={lhs})
+    return _remember_evaluation(key, judgment)
+
+
+def _mult_eval(_a, _b):
+    '''
+    Prove num(_a) * num(_b) = num(_a * _b) for positive naturals.
+    '''
+    known = _recall_evaluation(('mult', _a, _b))
+    if known is not None:
+        return known
+    if _a < 10 and _b < 10:
+        return _remember_evaluation(('mult', _a, _b),
+                                    digit_mult_fact(_a, _b))
+    if len(str(_a)) < len(str(_b)):
+        # Use the shorter number as the multiplier and commute.
+        with _no_side_effects():
+            swapped = _mult_eval(_b, _a)
+        return _remember_evaluation(
+            ('mult', _a, _b), swapped.inner_expr().lhs.commute(0, 1))
+    if _b < 10:
+        return _mult_digit(_a, _b)
+    with _no_side_effects():
+        # The shortest multiplier prefix has two digits (see
+        # _mult_shift_step).
+        for shift in range(len(str(_b)) - 2, 0, -1):
+            _mult_shift_step(_a, _b // 10**shift)
+    return _mult_shift_step(_a, _b)
+
+
+def _mult_digit(_p, _y):
+    '''
+    Prove num(_p) * _y = num(_p * _y) for a single digit _y > 0,
+    digit by digit from the leading digits of _p.
+    '''
+    from proveit.numbers import Mult, one
+    key = ('mult', _p, _y)
+    known = _recall_evaluation(key)
+    if known is not None:
+        return known
+    if _y == 1:
+        return _remember_evaluation(
+            key, Mult(num(_p), one).one_elimination(1))
+    with _no_side_effects():
+        for shift in range(len(str(_p)) - 1, 0, -1):
+            _mult_digit_step(_p // 10**shift, _y)
+    return _mult_digit_step(_p, _y)
+
+
+def _mult_digit_step(_p, _y):
+    '''
+    Prove num(_p) * _y = num(_p * _y) for a single digit _y > 1 given
+    the product of the prefix of _p without its last digit.
+    '''
+    from proveit.numbers import Mult
+    from . import md_mult_digit_no_carry, md_mult_digit_with_carry
+    key = ('mult', _p, _y)
+    known = _recall_evaluation(key)
+    if known is not None:
+        return known
+    if _p < 10:
+        return _remember_evaluation(key, digit_mult_fact(_p, _y))
+    _u, _x = divmod(_p, 10)
+    digit_mult_fact(_x, _y)
+    carry, _z = divmod(_x * _y, 10)
+    _q = _u * _y
+    with _no_side_effects():
+        # proven in the previous step (see _mult_digit)
+        _mult_digit_step(_u, _y)
+    repl_map = {m: _num_digits(_u), a: _digits(_u),
+                x: num(_x), y: num(_y), z: num(_z)}
+    if carry == 0:
+        thm = md_mult_digit_no_carry
+        repl_map.update({k: _num_digits(_q), c: _digits(_q)})
+    else:
+        with _no_side_effects():
+            _add_eval(_q, carry)
+        thm = md_mult_digit_with_carry
+        repl_map.update({k: _num_digits(_q + carry),
+                         c: _digits(_q + carry),
+                         d: num(carry), q: num(_q)})
+    judgment = thm.instantiate(
+        repl_map, preserved_exprs={Mult(num(_p), num(_y))})
+    return _remember_evaluation(key, judgment)
+
+
+def _mult_shift_step(_p, _b):
+    '''
+    Prove num(_p) * num(_b) = num(_p * _b) for a multi-digit _b given
+    the product with the prefix of _b without its last digit: shift
+    that product by a digit and add the partial product of _p and the
+    last digit of _b (partial products are remembered, so each digit
+    value is only multiplied once).
+    '''
+    from proveit.numbers import Mult
+    from . import md_mult_shift, md_mult_shift_add
+    key = ('mult', _p, _b)
+    known = _recall_evaluation(key)
+    if known is not None:
+        return known
+    _v, _y = divmod(_b, 10)
+    _c = _p * _v
+    with _no_side_effects():
+        if _v < 10:
+            _mult_digit(_p, _v)
+        else:
+            # proven in the previous step (see _mult_eval)
+            _mult_shift_step(_p, _v)
+    repl_map = {n: _num_digits(_v), b: _digits(_v),
+                k: _num_digits(_c), c: _digits(_c), p: num(_p)}
+    if _y == 0:
+        thm = md_mult_shift
+    else:
+        _r = _p * _y
+        with _no_side_effects():
+            _mult_digit(_p, _y)
+            _add_eval(_c * 10, _r)
+        thm = md_mult_shift_add
+        repl_map.update({y: num(_y), r: num(_r), s: num(_c * 10 + _r)})
+    judgment = thm.instantiate(
+        repl_map, preserved_exprs={Mult(num(_p), num(_b))})
+    return _remember_evaluation(key, judgment)
+
+
+def _less_eval(_a, _b):
+    '''
+    Prove num(_a) < num(_b) given _a < _b.
+    '''
+    from proveit.numbers import Less
+    from . import md_less_by_length, md_less_same_length
+    key = ('less', _a, _b)
+    known = _recall_evaluation(key)
+    if known is not None:
+        return known
+    if _a < 10 and _b < 10:
+        return _remember_evaluation(key, digit_less_fact(_a, _b))
+    relation = Less(num(_a), num(_b))
+    a_digits, b_digits = _digits(_a), _digits(_b)
+    len_a, len_b = len(str(_a)), len(str(_b))
+    if len_a < len_b:
+        judgment = md_less_by_length.instantiate(
+            {m: num(len_a), k: num(len_b - len_a - 1),
+             a: a_digits, b: b_digits[0],
+             c: b_digits[1:len_a + 1], d: b_digits[len_a + 1:]},
+            preserved_exprs={relation})
+    else:
+        # Same length; compare the first differing digits.
+        _i = next(_i for _i, (digit1, digit2) in
+                  enumerate(zip(str(_a), str(_b))) if digit1 != digit2)
+        with _no_side_effects():
+            _less_eval(int(str(_a)[_i]), int(str(_b)[_i]))
+        judgment = md_less_same_length.instantiate(
+            {k: num(_i), m: num(len_a - _i - 1), a: a_digits[:_i],
+             x: a_digits[_i], y: b_digits[_i],
+             b: a_digits[_i + 1:], c: b_digits[_i + 1:]},
+            preserved_exprs={relation})
+    return _remember_evaluation(key, judgment)
@@ -79,9 +79,27 @@ class Less(NumberOrderingRelation):
         from proveit.numbers import (Add, Real, RealPos, RealNeg,
                                      RealNonPos, RealNonNeg,
                                      readily_provable_number_set,
-                                     deduce_number_set)
+                                     deduce_number_set, is_numeric_natural)
+        from proveit.numbers.numerals.decimals import (
+            DecimalSequence, DIGITS, digit_less_fact)
         
         lower, upper = self.lower, self.upper
+        if (lower in DIGITS and upper in DIGITS and
+                lower.as_int() < upper.as_int()):
+            # Use the preloaded ordering of digits.
+            return digit_less_fact(lower.as_int(), upper.as_int())
+        if (all(operand in DIGITS or (isinstance(operand, DecimalSequence)
+                                      and is_numeric_natural(operand))
+                for operand in (lower, upper)) and
+                not (lower in DIGITS and upper in DIGITS) and
+                lower.as_int() < upper.as_int()):
+            # Compare multi-digit numerals digit by digit (when the
+            # multi-digit column theorems are proven).
+            try:
+                return DecimalSequence.less_eval(lower.as_int(),
+                                                 upper.as_int())
+            except NotImplementedError:
+                pass
         lower_ns = readily_provable_number_set(
                 lower, _check_order_against_zero=False, default=Real)
         upper_ns = readily_provable_number_set(
@@ -0,0 +1,211 @@
+'''
+A reachability index over the known (proven) TransitiveRelation
+judgments.  Each proven relation (e.g., a < b, b <= c, or c = d) is
+recorded as an edge from its normal left side to its normal right side
+labeled by its relation class (equivalences are recorded in both
+directions).  For a TransitiveRelation class (e.g., Less or LessEq),
+TransitiveClosureIndex.find_chain returns a chain of known judgments
+relating two expressions (e.g., a < b, b <= c, c = d for a < d) which
+may be passed directly to TransitiveRelation.apply_transitivities.
+
+The closure of all of the expressions reachable from a given
+expression is computed once (breadth-first, for shortest chains) for
+each relation family and set of assumptions and remembered; queries
+from the same expression are then answered by following parent
+pointers.  A remembered closure is forgotten as soon as a new edge
+starts from any expression that it reached, and the least recently
+used closures are forgotten beyond _closures_capacity.  Edges are
+added via a
+KnowledgeRegistry subscription for TransitiveRelation judgments (see
+the bottom of transitivity.py).
+'''
+
+from collections import OrderedDict
+from proveit import defaults
+
+
+class TransitiveClosureIndex:
+    '''
+    The reachability index, as class-level state.
+    '''
+
+    # Map each expression to a list of (other expression, relation
+    # class, judgment) edges from it.
+    _edges = dict()
+
+    # Map (relation family, source, sorted assumptions) keys to
+    # closures.  A closure maps (expression, is_strong) states that
+    # are reachable from the source to the (previous state, judgment)
+    # of the last step of a shortest chain reaching it.  The relation
+    # family is the (strong, weak, equivalence) relation classes.
+    # Ordered from least to most recently used for eviction beyond
+    # _closures_capacity.
+    _closures = OrderedDict()
+    _closures_capacity = 10000
+
+    # Map each expression to the keys of the remembered closures that
+    # reach it.
+    _reached_by = dict()
+
+    # Incremented with each new edge.
+    _num_edges = 0
+
+    @staticmethod
+    def _clear_():
+        '''
+        Forget all edges and closures when the known facts are cleared.
+        '''
+        TransitiveClosureIndex._edges.clear()
+        TransitiveClosureIndex._closures.clear()
+        TransitiveClosureIndex._reached_by.clear()
+
+    @staticmethod
+    def record_relation(judgment):
+        '''
+        Add an edge for the newly proven TransitiveRelation judgment,
+        forgetting the closures that this may extend.
+        '''
+        from .equiv_relation import EquivRelation
+        relation = judgment.expr
+        lhs, rhs = relation.normal_lhs, relation.normal_rhs
+        if lhs == rhs:
+            return # reflexive relations don't help
+        edges = TransitiveClosureIndex._edges
+        TransitiveClosureIndex._num_edges += 1
+        edges.setdefault(lhs, []).append((rhs, type(relation), judgment))
+        TransitiveClosureIndex._forget_closures_reaching(lhs)
+        if isinstance(relation, EquivRelation):
+            edges.setdefault(rhs, []).append((lhs, type(relation),
+                                              judgment))
+            TransitiveClosureIndex._forget_closures_reaching(rhs)
+
+    @staticmethod
+    def _forget_closures_reaching(expr):
+        for key in list(TransitiveClosureIndex._reached_by.get(expr, ())):
+            TransitiveClosureIndex._forget_closure(key)
+
+    @staticmethod
+    def _forget_closure(key):
+        '''
+        Forget the closure of the given key, if it is remembered, along
+        with its _reached_by entries.
+        '''
+        closure = TransitiveClosureIndex._closures.pop(key, None)
+        if closure is None:
+            return
+        reached_by = TransitiveClosureIndex._reached_by
+        for expr, _ in closure:
+            keys = reached_by.get(expr)
+            if keys is not None:
+                keys.discard(key)
+                if len(keys) == 0:
+                    del reached_by[expr]
+
+    @staticmethod
+    def _is_applicable(judgment, assumptions):
+        '''
+        Return True iff the judgment is possibly usable and applicable
+        under the given assumptions.  Unlike Judgment.is_applicable,
+        this doesn't derive side-effects (which could add edges while
+        computing a closure).
+        '''
+        return (judgment.is_possibly_usable() and
+                judgment.assumptions.issubset(assumptions))
+
+    @staticmethod
+    def find_chain(relation_class, lhs, rhs):
+        '''
+        Return a list of known judgments, applicable under the default
+        assumptions, that form a shortest chain relating lhs to rhs
+        through the relations of the given TransitiveRelation class
+        family (its strong, weak, and equivalence classes).  If the
+        relation_class is the strong relation class, the chain must
+        contain a strong relation.  Otherwise, a chain with a strong
+        relation is preferred.  Return None if there is no such chain
+        (or the relation family isn't fully defined).
+        '''
+        if lhs == rhs:
+            return None
+        assumptions = defaults.assumptions
+        try:
+            family = (relation_class._checkedStrongRelationClass(),
+                      relation_class._checkedWeakRelationClass(),
+                      relation_class.EquivalenceClass())
+        except NotImplementedError:
+            return None
+        key = (family, lhs, defaults.sorted_assumptions)
+        closures = TransitiveClosureIndex._closures
+        closure = closures.get(key)
+        if closure is None:
+            closure = TransitiveClosureIndex._compute_closure(
+                key, assumptions)
+        else:
+            closures.move_to_end(key)
+        states = [(rhs, True)]
+        if relation_class is not family[0]:
+            states.append((rhs, False))
+        for state in states:
+            if state not in closure:
+                continue
+            chain = []
+            prev_state, judgment = closure[state]
+            while judgment is not None:
+                chain.append(judgment)
+                prev_state, judgment = closure[prev_state]
+            chain.reverse()
+            if all(TransitiveClosureIndex._is_applicable(judgment,
+                                                         assumptions)
+                   for judgment in chain):
+                # Derive any side-effects of the judgments being used
+                # (see Judgment.is_applicable).
+                for judgment in chain:
+                    judgment.is_applicable(assumptions)
+                return chain
+            # Something became unusable; start over.
+            TransitiveClosureIndex._forget_closure(key)
+            return TransitiveClosureIndex.find_chain(
+                relation_class, lhs, rhs)
+        return None
+
+    @staticmethod
+    def _compute_closure(key, assumptions):
+        '''
+        Compute, remember, and return the closure for the given key via
+        a breadth-first search over the applicable edges.
+        '''
+        (strong_class, weak_class, equiv_class), source, _ = key
+        num_edges = TransitiveClosureIndex._num_edges
+        edges = TransitiveClosureIndex._edges
+        is_applicable = TransitiveClosureIndex._is_applicable
+        start = (source, False)
+        closure = {start: (None, None)}
+        frontier = [start]
+        while len(frontier) > 0:
+            next_frontier = []
+            for state in frontier:
+                expr, is_strong = state
+                for other, rel_class, judgment in edges.get(expr, ()):
+                    if rel_class is strong_class:
+                        next_state = (other, True)
+                    elif rel_class is weak_class or rel_class is equiv_class:
+                        next_state = (other, is_strong)
+                    else:
+                        continue
+                    if next_state in closure:
+                        continue
+                    if not is_applicable(judgment, assumptions):
+                        continue
+                    closure[next_state] = (state, judgment)
+                    next_frontier.append(next_state)
+            frontier = next_frontier
+        if num_edges == TransitiveClosureIndex._num_edges:
+            # Not remembered if edges were added along the way (e.g.,
+            # via side-effects of checking usability).
+            closures = TransitiveClosureIndex._closures
+            reached_by = TransitiveClosureIndex._reached_by
+            closures[key] = closure
+            for expr, _ in closure:
+                reached_by.setdefault(expr, set()).add(key)
+            while len(closures) > TransitiveClosureIndex._closures_capacity:
+                TransitiveClosureIndex._forget_closure(next(iter(closures)))
+        return closure
@@ -19,10 +19,12 @@ The default version handles the case when the "other" relation
 is an equality (in which case, substitution may simply be performed).
 """
 
-from proveit import defaults, USE_DEFAULTS, Judgment, ProofFailure
+from proveit import (defaults, USE_DEFAULTS, Judgment, ProofFailure,
+                     KnowledgeRegistry)
 from proveit.decorators import prover
 from proveit.util import OrderedSet
 from .sorter import TransitivitySorter
+from .transitive_closure import TransitiveClosureIndex
 from .relation import Relation
 
 
@@ -61,9 +63,13 @@ class TransitiveRelation(Relation):
         of relations that is a transitive decomposition of this 
         relation.  For example, for "a < c" it may return
         (a < b, b < c) as a transitive decomposition if one is known
-        and the other is provable.
+        and the other is provable.  First, check for a chain of known
+        relations via the TransitiveClosureIndex.
         '''
         if check_transitive_pair:
+            if TransitiveClosureIndex.find_chain(
+                    type(self), self.normal_lhs, self.normal_rhs) is not None:
+                return True
             transitive_pair = self.known_plus_provable_transitive_pair()
             if transitive_pair is not None:
                 return True
@@ -78,6 +84,10 @@ class TransitiveRelation(Relation):
         truths (under the given assumptions), we can conclude that
         a<d (under these assumptions).
         '''
+        if TransitiveClosureIndex.find_chain(
+                type(self), self.normal_lhs, self.normal_rhs) is not None:
+            # There is a chain of known relations.
+            return self.conclude_via_transitivity()
         if check_transitive_pair:
             transitive_pair = self.known_plus_provable_transitive_pair()
             if transitive_pair is not None:
@@ -739,6 +749,12 @@ class TransitiveRelation(Relation):
                    ' known proven relations.')
             raise TransitivityException(relation, defaults.assumptions, msg)
 
+        # Use the chain of known relations from the
+        # TransitiveClosureIndex if there is one.
+        chain = TransitiveClosureIndex.find_chain(cls, left_item, right_item)
+        if chain is not None:
+            return TransitiveRelation.apply_transitivities(chain)
+
         sorter = TransitivitySorter(cls, [left_item, right_item],
                                     skip_exact_reps=False,
                                     skip_equiv_reps=False,
@@ -771,6 +787,11 @@ class TransitiveRelation(Relation):
         return total_ordering(*relations, prove=True)
 
 
+# Maintain the TransitiveClosureIndex as relations are proven.
+KnowledgeRegistry.subscribe(TransitiveClosureIndex.record_relation,
+                            TransitiveRelation)
+
+
 class TransitivityException(ProofFailure):
     def __init__(self, expr, assumptions, message):
         ProofFailure.__init__(self, expr, assumptions, message)
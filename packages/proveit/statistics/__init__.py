@@ -1,5 +1,4 @@
-from .prob import Prob
-from .prob_of_all import ProbOfAll
+# Expression classes are imported upon first access (see lazy_attrs).
 
 # KEEP THE FOLLOWING IN __init__.py FOR THEORY PACKAGES.
 #  Make additions above, or add to sys.modules[__name__].__dict__ below.
@@ -7,4 +6,6 @@ from .prob_of_all import ProbOfAll
 # the theory package directly from the package.
 import sys
 from proveit._core_.theory import TheoryPackage
-sys.modules[__name__] = TheoryPackage(__name__, __file__, locals())
+sys.modules[__name__] = TheoryPackage(
+    __name__, __file__, locals(),
+    lazy_attrs={'Prob': '.prob', 'ProbOfAll': '.prob_of_all'})
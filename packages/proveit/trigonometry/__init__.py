@@ -1,6 +1,4 @@
-from .sine import Sin
-from .cosine import Cos
-
+# Expression classes are imported upon first access (see lazy_attrs).
 
 # KEEP THE FOLLOWING IN __init__.py FOR THEORY PACKAGES.
 #  Make additions above, or add to sys.modules[__name__].__dict__ below.
@@ -8,4 +6,6 @@ from .cosine import Cos
 # the theory package directly from the package.
 import sys
 from proveit._core_.theory import TheoryPackage
-sys.modules[__name__] = TheoryPackage(__name__, __file__, locals())
+sys.modules[__name__] = TheoryPackage(
+    __name__, __file__, locals(),
+    lazy_attrs={'Sin': '.sine', 'Cos': '.cosine'})